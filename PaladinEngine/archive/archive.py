@@ -4,18 +4,21 @@
     :author: Oren Afek
     :since: 05/04/2019
 """
-import dataclasses
 import re
+import weakref
 from ast import *
 from collections import deque
-from dataclasses import dataclass
 from enum import Enum
-from typing import Optional, Iterable, Dict, List, Tuple, Union, Any, Type
+from pathlib import Path
+from types import FrameType
+from typing import Optional, Iterable, Dict, List, Tuple, Union, Any, Type, Sequence, Set
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, ContainerId, Rk, Rv, Rvf, \
     ObjectId
+from archive.record_store.record_store import RecordStore, RecordValueView
+from archive.trace_file.trace_file import TraceWriter, MappedRecordStore, SpillingRecordStore, DEFAULT_SEGMENT_SIZE
 from ast_common.ast_common import split_attr
-from common.common import ISP, IS_ITERABLE
+from common.common import ISP, IS_ITERABLE, POID
 from module_transformer.global_map import GlobalMap
 
 
@@ -57,6 +60,8 @@ def represent(o: object):
 
 class Archive(object):
     GLOBAL_PALADIN_CONTAINER_ID = 1337
+    # The ids that are given to objects that take the ids of dead objects, above the addresses of python objects.
+    FIRST_NEW_OBJECT_ID = 1 << 62
 
     class Filters(object):
         AS_OR_BMFCS_FILTER = lambda vv: vv.key.stub_name in {'__AS__', '__BMFCS__'}
@@ -122,6 +127,9 @@ class Archive(object):
             EVENT = 9, object
             FUNCTION_CALL = 10, object
             DEQUE_ITEM = 11, deque
+            # The contents of a container that are stored anew, for an object that might have taken its id (see
+            # Archive.new_object).
+            NEW_OBJECT = 12, object
 
             @property
             def value(self) -> int:
@@ -149,42 +157,95 @@ class Archive(object):
                     return Archive.Record.StoreKind.DEQUE_ITEM
                 return Archive.Record.StoreKind.VAR
 
+            @classmethod
+            def kind_by_value(cls, v: int) -> 'Archive.Record.StoreKind':
+                return next(k for k in cls if k.value == v)
+
             @classmethod
             def type_by_kind(cls, k: 'Archive.Record.StoreKind') -> Type:
                 return list(filter(lambda _k: _k == k, cls))[0].type
 
-        @dataclass
         class RecordKey(object):
-            container_id: int
-            field: str
-            stub_name: str
-            kind: 'Archive.Record.StoreKind' = dataclasses.field(default_factory=lambda: Archive.Record.StoreKind.VAR)
+            """
+                The key of the records of a field of a container, that were stored by a stub.
+                Keys are immutable, so their hash is computed once.
+            """
+            __slots__ = ('container_id', 'field', 'stub_name', 'kind', '_hash')
+
+            FIELDS = ('container_id', 'field', 'stub_name', 'kind')
+
+            def __init__(self, container_id: int, field: str, stub_name: str,
+                         kind: Optional['Archive.Record.StoreKind'] = None):
+                _set = object.__setattr__
+                _set(self, 'container_id', container_id)
+                _set(self, 'field', field)
+                _set(self, 'stub_name', stub_name)
+                _set(self, 'kind', Archive.Record.StoreKind.VAR if kind is None else kind)
+                _set(self, '_hash', None)
+
+            def __setattr__(self, name: str, value: Any) -> None:
+                raise AttributeError(f'{type(self).__name__} is immutable')
 
             def __hash__(self) -> int:
-                return hash(hash(self.container_id) + hash(self.field) + hash(self.kind))
+                if self._hash is None:
+                    object.__setattr__(self, '_hash', hash(hash(self.container_id) + hash(self.field) + hash(self.kind)))
+
+                return self._hash
 
             def __eq__(self, o: object) -> bool:
-                return isinstance(o, Archive.Record.RecordKey) \
+                # The records share a single key object per key, so keys are mostly compared to themselves.
+                return o is self or isinstance(o, Archive.Record.RecordKey) \
                     and o.field == self.field \
                     and o.container_id == self.container_id \
                     and o.stub_name == self.stub_name \
                     and o.kind == self.kind
 
+            def __reduce__(self):
+                return type(self), (self.container_id, self.field, self.stub_name, self.kind)
+
             def __str__(self) -> str:
                 return f'{self.field}(c:{self.container_id})'
 
+            def __repr__(self) -> str:
+                return f'{type(self).__qualname__}(container_id={self.container_id!r}, field={self.field!r}, ' \
+                       f'stub_name={self.stub_name!r}, kind={self.kind!r})'
+
             def to_json(self):
                 return self.container_id, self.field, self.stub_name, self.kind
 
-        @dataclass
         class RecordValue(object):
-            key: 'Archive.Record.RecordKey'
-            rtype: type
-            value: object
-            expression: str
-            line_no: int
-            time: int = -1
-            extra: str = ''
+            """
+                A record that is not kept by the archive (see RecordValueView for the records that are).
+                Records are immutable.
+            """
+            __slots__ = ('key', 'rtype', 'value', 'expression', 'line_no', 'time', 'extra')
+
+            FIELDS = ('key', 'rtype', 'value', 'expression', 'line_no', 'time', 'extra')
+
+            def __init__(self, key: 'Archive.Record.RecordKey', rtype: type, value: object, expression: str,
+                         line_no: int, time: int = -1, extra: str = ''):
+                _set = object.__setattr__
+                _set(self, 'key', key)
+                _set(self, 'rtype', rtype)
+                _set(self, 'value', value)
+                _set(self, 'expression', expression)
+                _set(self, 'line_no', line_no)
+                _set(self, 'time', time)
+                _set(self, 'extra', extra)
+
+            def __setattr__(self, name: str, value: Any) -> None:
+                raise AttributeError(f'{type(self).__name__} is immutable')
+
+            def __eq__(self, o: object) -> bool:
+                return o is self or isinstance(o, Archive.Record.RecordValue) \
+                    and all(getattr(o, f) == getattr(self, f) for f in Archive.Record.RecordValue.FIELDS)
+
+            def __hash__(self) -> int:
+                # The value may be unhashable, a record is identified by its key and time.
+                return hash((self.key, self.time))
+
+            def __reduce__(self):
+                return type(self), tuple(getattr(self, f) for f in Archive.Record.RecordValue.FIELDS)
 
             def __str__(self) -> str:
                 return f'({self.time}): {self.expression}({self.rtype.__name__}) = {self._stringify_value(self.value)} ' \
@@ -202,14 +263,112 @@ class Archive(object):
             def __repr__(self):
                 return self.__str__()
 
-            def __hash__(self):
-                return sum([hash(v) for v in self.__dict__.values()])
+    class RecordBuilder(object):
+        """
+            Stores a record in two steps: archive.store_new.key(...).value(...).
+            The archive keeps a single builder, and every key step creates one small (slotted) object, so storing a
+            record does not create key or value objects (the records are kept as rows of the archive's records).
+        """
+        __slots__ = ('_archive',)
+
+        def __init__(self, archive: 'Archive'):
+            self._archive = archive
+
+        def key(self, container_id: int, field: str, stub_name: str,
+                kind: Optional['Archive.Record.StoreKind'] = None) -> 'Archive.KeyedRecordBuilder':
+            return Archive.KeyedRecordBuilder(self._archive, container_id, field, stub_name,
+                                              Archive.Record.StoreKind.VAR if kind is None else kind)
+
+    class KeyedRecordBuilder(object):
+        __slots__ = ('_archive', '_container_id', '_field', '_stub_name', '_kind')
+
+        def __init__(self, archive: 'Archive', container_id: int, field: str, stub_name: str,
+                     kind: 'Archive.Record.StoreKind'):
+            self._archive = archive
+            self._container_id = container_id
+            self._field = field
+            self._stub_name = stub_name
+            self._kind = kind
+
+        def value(self, rtype: type, value: object, expression: str, line_no: int, time: int = -1,
+                  extra: str = '') -> Union['Archive.Record.RecordValue', RecordValueView]:
+            archive = self._archive
+            if not archive.should_record:
+                return Archive.Record.RecordValue(
+                    Archive.Record.RecordKey(self._container_id, self._field, self._stub_name, self._kind), rtype,
+                    value, expression, line_no, time, extra)
+
+            if time == -1:
+                time = archive.time
+
+            index = archive._append(self._container_id, self._field, self._stub_name, self._kind, rtype, value,
+                                    expression, line_no, time, extra)
+            return archive.records.view(index)
 
     def __init__(self) -> None:
-        self.records: Dict[Archive.Record.RecordKey, List[Archive.Record.RecordValue]] = {}
+        self.records: RecordStore = RecordStore(Archive.Record.RecordKey)
+        self._stored_object_ids: Set[ObjectId] = set()
+        self._container_ids: Set[ContainerId] = set()
+        # Python reuses the ids of dead objects, so an object (or a frame) that takes an id that is in use by the
+        # archive gets a new id (see _append).
+        self._object_ids: Dict[ObjectId, ObjectId] = {}
+        self._next_object_id: ObjectId = Archive.FIRST_NEW_OBJECT_ID
+        # The objects that have been stored by their (python) ids, to tell them from the objects that take their ids
+        # once they are dead: a weak reference to an object, or the type of an object that can't be weakly referred and
+        # the fingerprint of its contents (see _fingerprint), until they are changed.
+        self._object_refs: Dict[ObjectId, weakref.ref] = {}
+        self._object_types: Dict[ObjectId, type] = {}
+        self._object_fingerprints: Dict[ObjectId, int] = {}
         self._time: Time = -1
         self.should_record: bool = True
         self.global_map: Optional[GlobalMap] = None
+        self.trace_writer: Optional[TraceWriter] = None
+        self._record_builder: Archive.RecordBuilder = Archive.RecordBuilder(self)
+
+    @classmethod
+    def from_trace(cls, trace_path: Union[str, Path]) -> 'Archive':
+        """
+            Load an archive from a trace file (that has been written by record_to).
+            The records are memory mapped from the file, so the loaded archive is read only.
+        :param trace_path: The path of the trace file.
+        :return: An archive with the records of the trace.
+        """
+        archive = cls()
+        archive.records = MappedRecordStore(trace_path, Archive.Record.RecordKey,
+                                            Archive.Record.StoreKind.kind_by_value)
+        archive._stored_object_ids = archive.records.stored_object_ids
+        archive._time = archive.records.last_time
+        archive.should_record = False
+        return archive
+
+    def record_to(self, trace_path: Union[str, Path], segment_size: int = DEFAULT_SEGMENT_SIZE,
+                  spill: bool = False) -> None:
+        """
+            Write the records of the archive to a trace file, a segment at a time, as they are stored.
+            The trace is completed by close_trace.
+        :param trace_path: The path of the trace file.
+        :param segment_size: The number of records in a segment.
+        :param spill: Whether to drop the records from memory once they are written (from a background thread).
+                      The records of a spilled archive are reloaded from the trace when it is closed.
+        """
+        if spill:
+            if len(self.records) > 0:
+                raise ValueError('Only the records of an empty archive can be spilled')
+
+            self.records = SpillingRecordStore(Archive.Record.RecordKey)
+
+        self.trace_writer = TraceWriter(trace_path, segment_size, background=spill)
+
+    def close_trace(self) -> None:
+        if self.trace_writer is None:
+            return
+
+        trace_writer, self.trace_writer = self.trace_writer, None
+        trace_writer.close(self.records, self._time, self._stored_object_ids)
+
+        if isinstance(self.records, SpillingRecordStore):
+            self.records = MappedRecordStore(trace_writer.path, Archive.Record.RecordKey,
+                                             Archive.Record.StoreKind.kind_by_value)
 
     @property
     def time(self):
@@ -220,28 +379,69 @@ class Archive(object):
         if not self.should_record:
             return self
 
-        if record_key not in self.records:
-            self.records[record_key] = []
-
-        # Set time.
-        if time == -1:
-            record_value.time = self.time
-
         # Add to records.
-        self.records[record_key].append(record_value)
+        self._append(record_key.container_id, record_key.field, record_key.stub_name, record_key.kind,
+                     record_value.rtype, record_value.value, record_value.expression, record_value.line_no,
+                     self.time if time == -1 else record_value.time, record_value.extra)
 
         return self
 
-    def retrieve(self, record_key: Record.RecordKey) -> Optional[Record]:
-        return self.records[record_key]
+    def _append(self, container_id: ContainerId, field: Any, stub_name: str, kind: Record.StoreKind, rtype: type,
+                value: object, expression: str, line_no: int, time: Time, extra: str) -> int:
+        if self._object_fingerprints:
+            # The contents of the container might have been changed.
+            self._object_fingerprints.pop(container_id, None)
+
+        if self._object_ids:
+            container_id, field, value = self._archive_ids(container_id, field, kind, rtype, value)
+
+        # Keep track of the objects that have been stored (by their id).
+        if type(value) is int and not ISP(rtype[1] if isinstance(rtype, tuple) else rtype):
+            self._stored_object_ids.add(value)
+
+        self._container_ids.add(container_id)
+
+        index = self.records.append(container_id, field, stub_name, kind, rtype, value, expression, line_no, time,
+                                    extra)
+
+        if self.trace_writer is not None:
+            self.trace_writer.on_append(self.records)
+
+        return index
+
+    def _archive_ids(self, container_id: ContainerId, field: Any, kind: Record.StoreKind, rtype: type,
+                     value: object) -> Tuple[ContainerId, Any, object]:
+        """
+            The ids of the archive for the (python) ids of the objects in a record.
+        """
+        object_ids = self._object_ids
+        container_id = object_ids.get(container_id, container_id)
+        if isinstance(rtype, tuple):
+            key_type, rtype = rtype
+            if kind == Archive.Record.StoreKind.DICT_ITEM and type(field) is int and not ISP(key_type):
+                field = object_ids.get(field, field)
+
+        if type(value) is int and not ISP(rtype):
+            value = object_ids.get(value, value)
+
+        elif kind == Archive.Record.StoreKind.BUILTIN_MANIP and type(value[1]) is int and not ISP(value[0]):
+            value = (value[0], object_ids.get(value[1], value[1]))
+
+        return container_id, field, value
+
+    def retrieve(self, record_key: Record.RecordKey) -> Optional[List[Rv]]:
+        indices = self.records.records_of(record_key)
+        if indices is None:
+            raise KeyError(record_key)
+
+        return self.records.views(indices)
 
     def reset(self):
         self.__init__()
 
     def to_table(self):
         try:
-            header_row = list(Archive.Record.RecordKey.__dataclass_fields__) + \
-                         list(Archive.Record.RecordValue.__dataclass_fields__)
+            header_row = list(Archive.Record.RecordKey.FIELDS) + list(Archive.Record.RecordValue.FIELDS)
 
             flat_records = [
                 (
@@ -258,7 +458,7 @@ class Archive(object):
                     v.time,
                     v.extra
                 )
-                for k, vv in list(self.records.items()) for v in vv
+                for k, vv in self.records.items() for v in vv
             ]
 
             return header_row, sorted(flat_records, key=lambda r: r[len(r) - 2])
@@ -267,8 +467,7 @@ class Archive(object):
             print(e)
 
     def flat_and_sort_by_time(self):
-        return sorted([(rk, rv) for rk in self.records for rv in self.records[rk]],
-                      key=lambda r: r[1].time)
+        return sorted(self.flatten(), key=lambda r: r[1].time)
 
     def to_pickle(self):
         import pickle
@@ -278,28 +477,8 @@ class Archive(object):
         raise NotImplementedError()
 
     @property
-    def store_new(self):
-        @dataclass
-        class Builder_Key(object):
-            _key: Archive.Record.RecordKey = None
-
-            def key(self, container_id: int, field: str, stub_name: str,
-                    kind: Archive.Record.StoreKind = Archive.Record.StoreKind.VAR):
-                self._key = Archive.Record.RecordKey(container_id, field, stub_name, kind)
-                return Builder(self._key)
-
-        @dataclass
-        class Builder(object):
-            _key: Archive.Record.RecordKey
-            _value: Archive.Record.RecordValue = None
-
-            def value(_self, rtype: type, value: object, expression: str, line_no: int, time: int = -1,
-                      extra: str = '') -> 'Archive.Record.RecordValue':
-                _self._value = Archive.Record.RecordValue(_self._key, rtype, value, expression, line_no, time, extra)
-                self.store(_self._key, _self._value, time)
-                return _self._value
-
-        return Builder_Key()
+    def store_new(self) -> RecordBuilder:
+        return self._record_builder
 
     def pause_record(self):
         self.should_record = False
@@ -307,38 +486,77 @@ class Archive(object):
     def resume_record(self):
         self.should_record = True
 
+    @staticmethod
+    def _as_predicate(filters: Union[Rvf, Iterable[Rvf]]) -> Rvf:
+        if IS_ITERABLE(filters):
+            return lambda vv: all(f(vv) for f in filters)
+
+        return filters
+
     def filter(self, filters: Union[Rvf, Iterable[Rvf]]) -> Dict[Rk, List[Rv]]:
-        return {k: v for (k, v) in self.records.items() for vv in v
-                if
-                (IS_ITERABLE(filters) and all([f(vv) for f in filters])) or (not IS_ITERABLE(filters) and filters(vv))}
+        predicate = self._as_predicate(filters)
+        return {k: v for (k, v) in self.records.items() if any(predicate(vv) for vv in v)}
 
     def flatten_and_filter(self, filters: Union[Rvf, Iterable[Rvf]]) -> List[Tuple[Rk, Rv]]:
-        return [(k, vv) for (k, v) in self.records.items() for vv in v
-                if
-                (IS_ITERABLE(filters) and all([f(vv) for f in filters])) or (not IS_ITERABLE(filters) and filters(vv))]
+        predicate = self._as_predicate(filters)
+        return [(vv.key, vv) for vv in self.records if predicate(vv)]
+
+    def _entries(self, rows: Iterable[int]) -> List[Tuple[Rk, Rv]]:
+        """
+            Materialize rows of the records store, by the same order flatten_and_filter would have returned them.
+        """
+        records = self.records
+        return [(records.key_of(i), records.view(i)) for i in records.ordered(rows)]
+
+    def _rows_in_time_range(self, rows: Optional[Sequence[int]], time_range: Optional[Iterable[int]]) -> Sequence[int]:
+        if rows is None:
+            rows = range(len(self.records))
+
+        # Same as Filters.TIME_RANGE_FILTER, an empty time range doesn't filter anything.
+        if not time_range:
+            return rows
+
+        if isinstance(time_range, range) and time_range.step == 1:
+            return self.records.rows_in_time_range(rows, time_range.start, time_range.stop)
+
+        times = self.records.times
+        return [i for i in rows if times[i] in time_range]
 
     def get_by_line_no(self, line_no: int) -> Dict[Rk, List[Rv]]:
-        return self.filter(Archive.Filters.LINE_NO_FILTER(line_no))
+        return self.records.grouped(self.records.rows_by_line_no(line_no))
 
     def get_loop_iterations(self, loop_line_no: int) -> List[Tuple[Rk, Rv]]:
-        return self.flatten_and_filter(
-            [lambda vv: vv.key.stub_name in {'__SOLI__', '__EOLI__'},
-             Archive.Filters.VALUE_FILTER(loop_line_no)])
+        return self._entries(self.records.with_stubs(self.records.rows_by_value(loop_line_no), '__SOLI__', '__EOLI__'))
 
     def get_loop_starts(self, loop_line_no: int) -> List[Tuple[Rk, Rv]]:
-        return self.flatten_and_filter(
-            [lambda vv: vv.key.stub_name == '__SOL__',
-             Archive.Filters.VALUE_FILTER(loop_line_no)])
+        return self._entries(self.records.with_stubs(self.records.rows_by_value(loop_line_no), '__SOL__'))
 
     def get_by_container_id(self, container_id: int):
-        return self.filter([lambda vv: vv.key.container_id == container_id, lambda vv: vv.key.stub_name == '__AS__'])
+        return self.records.grouped(self.records.with_stubs(self.records.rows_by_container_id(container_id), '__AS__'))
+
+    def get_by_container_id_and_stubs(self, container_id: int, *stub_names: str) -> List[Tuple[Rk, Rv]]:
+        return self._entries(self.records.with_stubs(self.records.rows_by_container_id(container_id), *stub_names))
+
+    def get_by_expression_and_stubs(self, expression: str, *stub_names: str) -> List[Tuple[Rk, Rv]]:
+        return self._entries(self.records.with_stubs(self.records.rows_by_expression(expression), *stub_names))
 
     def _all_assignments_for_object_until_time(self, object_id: int, time: int = -1):
-        time_filter = (lambda t: t <= time) if time >= 0 else (lambda t: True)
-        return sorted(self.flatten_and_filter([lambda vv: time_filter(vv.time),
-                                               lambda vv: vv.key.container_id == object_id,
-                                               lambda vv: vv.key.stub_name == '__AS__']),
-                      key=lambda r: r[1].time)
+        rows = self.records.with_stubs(self.records.rows_by_container_id(object_id), '__AS__')
+        if time >= 0:
+            rows = self.records.rows_in_time_range(rows, 0, time + 1)
+
+        return Archive.of_last_object(sorted(self._entries(rows), key=lambda r: r[1].time))
+
+    @staticmethod
+    def of_last_object(entries: List[Tuple[Rk, Rv]]) -> List[Tuple[Rk, Rv]]:
+        """
+            The entries of a container (sorted by time) of the last object that has taken its id (see new_object).
+        """
+        for i in range(len(entries) - 1, -1, -1):
+            if entries[i][0].kind == Archive.Record.StoreKind.NEW_OBJECT:
+                return entries[i + 1:]
+
+        return entries
 
     def retrieve_value(self, object_value: Union[int, object, List, Dict], object_type: type, time: int = -1):
         """
@@ -376,56 +594,41 @@ class Archive(object):
         return {t: self.retrieve_value(object_id, object, t) for t in assignments_time}
 
     def get_assignments(self, time_range: range = None, line_nos: Iterable[int] = None) -> List[Tuple[Rk, Rv]]:
-        return self.flatten_and_filter(
-            [
-                Archive.Filters.AS_OR_BMFCS_FILTER,
-                Archive.Filters.TIME_RANGE_FILTER(time_range),
-                Archive.Filters.LINE_NOS_FILTER(line_nos),
-                lambda vv: vv.key.kind in {Archive.Record.StoreKind.VAR, Archive.Record.StoreKind.BUILTIN_MANIP, Archive.Record.StoreKind.OBJ_ITEM}
-            ])
+        records = self.records
+        kinds = {Archive.Record.StoreKind.VAR.value, Archive.Record.StoreKind.BUILTIN_MANIP.value,
+                 Archive.Record.StoreKind.OBJ_ITEM.value}
+        rows = self._rows_in_time_range(records.rows_by_stub('__AS__', '__BMFCS__'), time_range)
+        return self._entries(i for i in rows
+                             if records.kinds[i] in kinds and (not line_nos or records.line_nos[i] in line_nos))
 
     def get_function_entries(self, func_name: str, line_no: Optional[int] = -1, entrances: bool = True,
                              in_func: bool = True, exits: bool = True, ass_and_bmfcs_only: bool = False):
 
-        def_or_undef = Archive.Filters.OR(Archive.Filters.DEF_FILTER, Archive.Filters.UNDEF_FILTER)
-        split_func_name = split_attr(func_name)
-        if len(split_func_name) > 1:
-            filters = [Archive.Filters.VALUE_FILTER(func_name)]
-        else:
-            filters = [Archive.Filters.REGEX_VALUE_FILTER(r"(?:\b\w+\.)?" + re.escape(func_name) + r"\b")]
-
-        if line_no is not None and line_no > 0:
-            filters.append(Archive.Filters.LINE_NO_FILTER(line_no))
+        records = self.records
+        rows = self._function_entries_rows(func_name, line_no, in_func or entrances, in_func or exits)
 
         if not in_func:
-            if entrances and not exits:
-                filters.append(Archive.Filters.DEF_FILTER)
-
-            if not entrances and exits:
-                filters.append(Archive.Filters.UNDEF_FILTER)
-
-            if entrances and exits:
-                filters.append(def_or_undef)
-
-            return self.flatten_and_filter(filters)
+            return self._entries(rows)
 
         # in_func == True
-        filters.append(def_or_undef)
-        function_entrances_and_exits = sorted(self.flatten_and_filter(filters), key=lambda r: r[1].time)
+        function_entrances_and_exits = sorted(self._entries(rows), key=lambda r: r[1].time)
         if len(function_entrances_and_exits) % 2 == 1:
             # noinspection PyTypeChecker
             function_entrances_and_exits.append(None)
 
         entries = function_entrances_and_exits
         for func_entrance, func_exit in zip(function_entrances_and_exits[::2], function_entrances_and_exits[1::2]):
-            filters = [self.Filters.LINE_NOS_FILTER(range(*self.global_map.functions[func_entrance[1].value]))] + \
-                      [Archive.Filters.AS_OR_BMFCS_FILTER] if ass_and_bmfcs_only else []
+            func_rows = records.rows_by_stub('__AS__', '__BMFCS__') if ass_and_bmfcs_only else None
             if func_exit is not None:
-                filters.append(self.Filters.TIME_RANGE_FILTER(range(func_entrance[1].time + 1, func_exit[1].time)))
+                func_rows = self._rows_in_time_range(func_rows, range(func_entrance[1].time + 1, func_exit[1].time))
             else:
-                filters.append(self.Filters.TIME_EQUAL_OR_LATER_FILTER(func_entrance[1].time))
+                func_rows = records.rows_in_time_range(func_rows, func_entrance[1].time)
+
+            if ass_and_bmfcs_only:
+                func_line_nos = range(*self.global_map.functions[func_entrance[1].value])
+                func_rows = [i for i in func_rows if records.line_nos[i] in func_line_nos]
 
-            entries.extend(self.flatten_and_filter(filters))
+            entries.extend(self._entries(func_rows))
 
         entries = list(filter(lambda e: e is not None, entries))
         if not entrances:
@@ -436,28 +639,88 @@ class Archive(object):
 
         return sorted(entries, key=lambda r: r[1].time)
 
-    def find_events(self, line_no: int = -1, time_range: Iterable[int] = None) -> List[Tuple[Rk, Rv]]:
-        filters = [lambda vv: vv.key.stub_name not in {'__SOLI__', '__EOLI__'}]
-        if line_no > -1:
-            filters.append(Archive.Filters.LINE_NO_FILTER(line_no))
+    def get_function_times(self, func_name: str, line_no: Optional[int] = -1) -> List[range]:
+        """
+            The times of get_function_entries(func_name, line_no) (in which the code of the function has run), as sorted,
+            disjoint ranges, straight from the indexes of the records.
+        """
+        records = self.records
+        rows = self._function_entries_rows(func_name, line_no, True, True)
+        # The entrances and the exits are paired by their order (an entrance without an exit is still running).
+        times = sorted(records.times[i] for i in rows)
+        ranges = records.time_ranges(rows)
+        for i in range(0, len(times), 2):
+            stop = times[i + 1] if i + 1 < len(times) else None
+            ranges.extend(records.time_ranges(records.rows_in_time_range(None, times[i] + 1, stop)))
+
+        return Archive._united(ranges)
+
+    def _function_entries_rows(self, func_name: str, line_no: Optional[int], entrances: bool,
+                               exits: bool) -> Sequence[int]:
+        records = self.records
+        split_func_name = split_attr(func_name)
+        if len(split_func_name) > 1:
+            value_filter = Archive.Filters.VALUE_FILTER(func_name)
+        else:
+            value_filter = Archive.Filters.REGEX_VALUE_FILTER(r"(?:\b\w+\.)?" + re.escape(func_name) + r"\b")
+
+        if entrances and exits:
+            rows = records.rows_by_stub('__DEF__', '__UNDEF__')
+        elif entrances:
+            rows = records.rows_by_stub('__DEF__')
+        elif exits:
+            rows = records.rows_by_stub('__UNDEF__')
+        else:
+            rows = range(len(records))
 
-        if time_range is not None:
-            filters.append(Archive.Filters.TIME_RANGE_FILTER(time_range))
+        if line_no is not None and line_no > 0:
+            rows = [i for i in rows if records.line_nos[i] == line_no]
+
+        return [i for i in rows if value_filter(records.view(i))]
+
+    @staticmethod
+    def _united(ranges: Iterable[range]) -> List[range]:
+        united = []
+        for r in sorted(ranges, key=lambda r: r.start):
+            if united and r.start <= united[-1].stop:
+                united[-1] = range(united[-1].start, max(united[-1].stop, r.stop))
+            else:
+                united.append(r)
 
-        return self.flatten_and_filter(filters)
+        return united
+
+    def find_event_times(self, line_no: int) -> List[range]:
+        """
+            The times of find_events(line_no), as sorted, disjoint ranges, straight from the indexes of the records.
+        """
+        return self.records.time_ranges(self.records.without_stubs(self.records.rows_by_line_no(line_no),
+                                                                   '__SOLI__', '__EOLI__'))
+
+    def find_events(self, line_no: int = -1, time_range: Iterable[int] = None) -> List[Tuple[Rk, Rv]]:
+        rows = self.records.rows_by_line_no(line_no) if line_no > -1 else None
+        rows = self._rows_in_time_range(rows, time_range)
+        kinds, new_object = self.records.kinds, Archive.Record.StoreKind.NEW_OBJECT.value
+        return self._entries(i for i in self.records.without_stubs(rows, '__SOLI__', '__EOLI__')
+                             if kinds[i] != new_object)
 
     def get_print_events(self, output: str) -> List[Tuple[Rk, Rv]]:
-        return self.flatten_and_filter(lambda vv: vv.key.stub_name == '__PRINT__' and vv.value == output)
+        return self._entries(self.records.with_stubs(self.records.rows_by_value(output), '__PRINT__'))
+
+    def get_print_times(self, output: str) -> List[range]:
+        """
+            The times of get_print_events(output), as sorted, disjoint ranges, straight from the indexes of the records.
+        """
+        return self.records.time_ranges(self.records.with_stubs(self.records.rows_by_value(output), '__PRINT__'))
 
     @property
     def last_time(self) -> int:
         return self._time
 
     def flatten(self) -> Iterable[Tuple[Rk, Rv]]:
-        return [(rk, vv) for rk, rv in self.records.items() for vv in rv]
+        return [(vv.key, vv) for vv in self.records]
 
     def get_line_nos_for_time(self, time: int) -> Iterable[int]:
-        return {rv.line_no for _, rv in self.flatten() if rv.time == time}
+        return {self.records.line_nos[i] for i in self.records.rows_in_time_range(None, time, time + 1)}
 
     def get_function_line_nos(self, func_name: str) -> Tuple[int, int]:
         func_entries = self.get_function_entries(func_name)
@@ -474,11 +737,9 @@ class Archive(object):
         out_format = lambda rv: (rv.extra, rv.expression)
         if include_builtin:
             return {rv.time: out_format(rv) for rk, rv in
-                    sorted(self.flatten_and_filter(self.Filters.FC_FILTER), key=lambda t: t[1].time)}
+                    sorted(self._entries(self.records.rows_by_stub('__FC__')), key=lambda t: t[1].time)}
 
-        records = sorted(
-            self.flatten_and_filter(self.Filters.OR(self.Filters.FC_FILTER, self.Filters.DEF_FILTER)),
-            key=lambda t: t[1].time)
+        records = sorted(self._entries(self.records.rows_by_stub('__FC__', '__DEF__')), key=lambda t: t[1].time)
 
         if len(records) == 0:
             return {}
@@ -508,4 +769,135 @@ class Archive(object):
         return {rv.time: (rv.extra, rv.expression) for rk, rv in local_func_records}
 
     def exists(self, value: ObjectId):
-        return len(self.filter(Archive.Filters.VALUE_FILTER(value))) > 0
+        return self.records.has_value(value)
+
+    def new_frame(self, frame: FrameType) -> None:
+        """
+            Start the records of a function's frame (before its first record).
+            A frame might take the id of a frame that has returned (or of a dead object), so its records are kept apart
+            from theirs.
+        """
+        if not self.should_record:
+            return
+
+        if self._in_use(id(frame)):
+            self._renew_id(id(frame))
+
+        self._remember_type(frame)
+
+    def init_object(self, o: object) -> None:
+        """
+            Start the records of an object that is initialized (before its first record).
+            It might take the id of a dead object, so its records are kept apart from theirs, unless it is known to be
+            the same object (e.g.: for super().__init__()).
+        """
+        if not self.should_record:
+            return
+
+        if self._in_use(id(o)) and self._identify(o) is not None:
+            self._renew_id(id(o))
+
+        self.remember(o)
+
+    def new_object(self, o: object, line_no: int, time: Time) -> None:
+        """
+            Start the records of an object whose contents are stored in time (before its first record in time).
+            If o has taken the id of a dead object, its records are kept apart from theirs. If it isn't known whether it
+            has (e.g.: a list whose contents have been changed since they have been stored), the contents of its id are
+            stored anew, from a NEW_OBJECT record.
+        """
+        if not self.should_record or not self._in_use(id(o)):
+            return
+
+        identity = self._identify(o)
+        if identity is True:
+            self._renew_id(id(o))
+
+        elif identity is False and self._object_ids.get(id(o), id(o)) in self._container_ids:
+            self._append(id(o), '', '__AS__', Archive.Record.StoreKind.NEW_OBJECT, type(o), None, '', line_no, time, '')
+
+    def remember(self, o: object) -> None:
+        """
+            Remember an object whose contents have been stored (see is_stored_object).
+        """
+        object_id = id(o)
+        try:
+            self._object_refs[object_id] = weakref.ref(o)
+            self._object_types.pop(object_id, None)
+            self._object_fingerprints.pop(object_id, None)
+
+        except TypeError:
+            # E.g.: lists, dicts and frames.
+            self._remember_type(o)
+            fingerprint = Archive._fingerprint(o)
+            if fingerprint is not None:
+                self._object_fingerprints[object_id] = fingerprint
+
+    def is_stored_object(self, o: object) -> bool:
+        """
+            Check if the contents of an object have been stored, and are still the contents that the archive has for
+            its id: it's the same object (rather than a dead object whose id it has taken), and for an object that
+            can't be weakly referred, its contents haven't been changed since.
+        """
+        return self._object_ids.get(id(o), id(o)) in self._stored_object_ids and self._identify(o) is None
+
+    def _in_use(self, object_id: ObjectId) -> bool:
+        object_id = self._object_ids.get(object_id, object_id)
+        return object_id in self._container_ids or object_id in self._stored_object_ids
+
+    def _renew_id(self, object_id: ObjectId) -> None:
+        self._object_ids[object_id] = self._next_object_id
+        self._next_object_id += 1
+
+    def _remember_type(self, o: object) -> None:
+        self._object_refs.pop(id(o), None)
+        self._object_types[id(o)] = type(o)
+        self._object_fingerprints.pop(id(o), None)
+
+    def _identify(self, o: object) -> Optional[bool]:
+        """
+            Tell an object from the object that has been stored by its id: None if it is the same object, True if it
+            is another object, and False if it isn't known.
+        """
+        ref = self._object_refs.get(id(o))
+        if ref is not None:
+            return None if ref() is o else True
+
+        known_type = self._object_types.get(id(o))
+        if known_type is None:
+            return False
+
+        if known_type is not type(o):
+            return True
+
+        fingerprint = self._object_fingerprints.get(id(o))
+        return None if fingerprint is not None and fingerprint == Archive._fingerprint(o) else False
+
+    @staticmethod
+    def _fingerprint(o: object) -> Optional[int]:
+        """
+            A hash of the (first level) contents of an object, as they are stored.
+            Objects with the same fingerprint have the same records, so an object that has taken the id of an object with
+            the same fingerprint isn't told apart from it.
+        """
+        if isinstance(o, dict):
+            items = o.items()
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            items = ((i, v) for i, v in enumerate(o))
+        elif hasattr(o, '__dict__'):
+            items = vars(o).items()
+        else:
+            return None
+
+        try:
+            return hash((type(o), tuple((type(k), POID(k), type(v), POID(v)) for k, v in items)))
+        except (TypeError, RuntimeError):
+            return None
+
+    def is_stored(self, object_id: ObjectId) -> bool:
+        """
+            Check if an object has already been stored in the archive (as a value of some record).
+        :param object_id: The Python's Id number of the object.
+        :return: True if the object has been stored, False otherwise.
+        """
+        return object_id in self._stored_object_ids
@@ -1,12 +1,14 @@
 import math
 import os
+from bisect import bisect_left, bisect_right
 import re
+import sys
 from asyncio import as_completed
 from collections import OrderedDict
 from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from functools import reduce
+from itertools import chain
 from typing import *
 from typing import Callable
 
@@ -14,6 +16,7 @@ import frozendict
 
 from archive.archive_evaluator.paladin_dsl_config.paladin_dsl_config import SCOPE_SIGN
 from common.attributed_dict import AttributedDict
+from utils.lru_cache import LRUCache
 from utils.range_dict import RangeDict
 
 ExpressionMapper = Mapping[str, Dict[int, object]]
@@ -44,9 +47,12 @@ BAD_JSON_VALUES = {'-Infinity': '"-∞"', 'Infinity': '"∞"', 'NaN': '"NaN"'}
 class Scope(object):
     line_no: LineNo
     data: Dict[ContainerId, RangeDict] = field(default_factory=lambda: {})
+    # The (first range start, order of addition, container id) of the scope's data, sorted (see get_data_by_time).
+    _starts: Optional[List[Tuple[Time, int, ContainerId]]] = field(default=None, repr=False, compare=False)
 
     def add_data(self, container_id: ContainerId, data: RangeDict):
         self.data[container_id] = data
+        self._starts = None
         return data
 
     def __hash__(self) -> int:
@@ -62,29 +68,37 @@ class Scope(object):
         return item in self.data
 
     def get_data_by_time(self, time: Time):
-        proximity_list = filter(lambda i: i[0] is not None,
-                                [(rd.get_closest(time)[1], rd) for rd in self.data.values()])
-        min_diff = math.inf
-        closest = None
-        for t, data in proximity_list:
-            diff = abs(t - time)
-            if diff < min_diff:
-                closest = data
-                min_diff = diff
-
-        if closest is None:
-            return None
+        """
+            Find the data of the container that has started the latest by time (the first one added, for ties).
+        """
+        return self.get_data_and_range_by_time(time)[0]
+
+    def get_data_and_range_by_time(self, time: Time) -> Tuple[Optional[RangeDict], Time, Time]:
+        """
+            Find the data of the container that has started the latest by time (see get_data_by_time), with the range
+            of times [start, end) in which it is the data that is found.
+        """
+        if self._starts is None:
+            self._starts = sorted((rd.first_range_start, order, container_id)
+                                  for order, (container_id, rd) in enumerate(self.data.items())
+                                  if rd.first_range_start is not None)
+
+        starts = self._starts
+        i = bisect_right(starts, (time, math.inf))
+        if time < 0:
+            return None, time, time + 1
 
-        return closest
-        # for rd in self.data.values():
-        #     closest_value, closest_time = rd.get_closest(time)
-        #     if closest_time is not None:
-        #         return rd
-        # for min_time, max_time in sorted(self.time_mapping.keys()):
-        #     if min_time <= time <= max_time:
-        #         return self.data[self.time_mapping[(min_time, max_time)]]
-        # else:
-        #     return None
+        end = starts[i][0] if i < len(starts) else math.inf
+        if i == 0:
+            return None, 0, end
+
+        # The first container that has started at the latest start.
+        start = starts[i - 1][0]
+        closest = self.data[starts[bisect_left(starts, (start, -1))][2]]
+        if time >= closest.max_time:
+            return None, time, time + 1
+
+        return closest, start, min(end, closest.max_time)
 
     @property
     def container_ids(self) -> List[ContainerId]:
@@ -103,72 +117,154 @@ class EvalResultPair(object):
         return isinstance(other, EvalResultPair) and self.key == other.key and self.value == other.value
 
 
-class EvalResultEntry(OrderedDict):
+class EvalResultSchema(object):
+    """
+        The keys of an EvalResultEntry, with the index of each key (and of each attribute, see EvalResultEntry) in the
+        entry's values. Entries with the same keys share the same schema (see of).
+    """
+    __slots__ = ('keys', 'unique_keys', 'index', 'attributes', '_joins')
+
+    _interned: LRUCache = LRUCache(4096)
+
+    def __init__(self, keys: Tuple[str, ...]):
+        self.keys: Tuple[str, ...] = keys
+        # The index of the first value of each key.
+        self.index: Dict[str, int] = {}
+        self.attributes: Dict[str, int] = {}
+        for i, k in enumerate(keys):
+            self.index.setdefault(k, i)
+            if SCOPE_SIGN in k:
+                var_without_scope, scope = k.split(SCOPE_SIGN, maxsplit=1)
+                self.attributes[var_without_scope + "_" + scope] = i
+                self.attributes[var_without_scope] = i
+            else:
+                self.attributes[k] = i
+
+        self.unique_keys: Tuple[str, ...] = tuple(self.index)
+        self._joins: Dict['EvalResultSchema', Tuple['EvalResultSchema', List[Tuple[Optional[int], Optional[int]]]]] = {}
+
+    @classmethod
+    def of(cls, keys: Iterable[str]) -> 'EvalResultSchema':
+        keys = tuple(keys)
+        schema = cls._interned.get(keys)
+        if schema is None:
+            schema = cls(keys)
+            cls._interned.put(keys, schema)
+
+        return schema
+
+    def join(self, other: 'EvalResultSchema') -> Tuple['EvalResultSchema', List[Tuple[Optional[int], Optional[int]]]]:
+        """
+            The schema of joining entries of this schema with entries of other (see EvalResultEntry.join), with the
+            indices of each of its keys in both (None where a key is missing).
+        """
+        joined = self._joins.get(other)
+        if joined is None:
+            # Keys only from self, then keys only from other, then mutual keys.
+            keys = [*(k for k in self.index if k not in other.index), *(k for k in other.index if k not in self.index),
+                    *(k for k in self.index if k in other.index)]
+            joined = self._joins[other] = EvalResultSchema.of(keys), [(self.index.get(k), other.index.get(k))
+                                                                      for k in keys]
+
+        return joined
+
+    def __reduce__(self):
+        # Unpickled schemas are shared as well.
+        return EvalResultSchema.of, (self.keys,)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.keys})'
+
+
+class EvalResultEntry(object):
+    """
+        The results of an operator in a time: a tuple of values, with a (shared) schema of their keys.
+        e[key] is the EvalResultPair of key, and the values are also accessible as attributes (for a key of a scope
+        'x@scope', as both x and x_scope).
+    """
+    __slots__ = ('time', 'schema', '_values', 'replacements')
 
     def __init__(self, time: Time, results: List[EvalResultPair],
                  replacements: Optional[List[Replacement]] = None) -> None:
         self.time = time
-        self.evaled_results = results
+        self.schema: EvalResultSchema = EvalResultSchema.of(p.key for p in results)
+        self._values: Tuple = tuple(p.value for p in results)
         self.replacements = replacements
-        attributes = self.populate(results)
 
-        dict.__init__(self, **attributes)
+    @classmethod
+    def of(cls, time: Time, schema: EvalResultSchema, values: Tuple,
+           replacements: Optional[List[Replacement]] = None) -> 'EvalResultEntry':
+        entry = cls.__new__(cls)
+        entry.time, entry.schema, entry._values, entry.replacements = time, schema, values, replacements
+        return entry
 
-    def populate(self, results):
-        attributes = {}
-        for p in results:
-            if SCOPE_SIGN in p.key:
-                var_without_scope, scope = p.key.split(SCOPE_SIGN, maxsplit=1)
-                attributes[var_without_scope + "_" + scope] = p.value
-                attributes[var_without_scope] = p.value
-            else:
-                attributes[p.key] = p.value
-        for attr_k, attr_v in attributes.items():
-            self.__setattr__(attr_k, attr_v)
+    def __getattr__(self, name: str):
+        # Called only for names that aren't the entry's slots (or class attributes), i.e., its results.
+        if name in EvalResultEntry.__slots__:
+            raise AttributeError(name)
+
+        i = self.schema.attributes.get(name)
+        if i is None:
+            raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{name}'")
+
+        return self._values[i]
+
+    @property
+    def evaled_results(self) -> List[EvalResultPair]:
+        return [EvalResultPair(k, v) for k, v in zip(self.schema.keys, self._values)]
 
-        return attributes
+    def at(self, t: Time) -> 'EvalResultEntry':
+        """
+            A copy of this entry for time t.
+        """
+        return EvalResultEntry.of(t, self.schema, self._values, self.replacements)
 
     def create_const_copy(self, c: object):
         """
         :param c: A const value
         """
-        return EvalResultEntry(self.time, [EvalResultPair(rr.key, c) for rr in self.evaled_results], self.replacements)
+        return EvalResultEntry.of(self.time, self.schema, (c,) * len(self._values), self.replacements)
 
     @classmethod
     def create_const(cls, t: Time, k: str, c: object):
-        return EvalResultEntry(t, [EvalResultPair(k, c)], [])
+        return EvalResultEntry.of(t, EvalResultSchema.of((k,)), (c,), [])
 
     @property
     def keys(self) -> List[str]:
-        return list(dict.fromkeys(map(lambda rr: rr.key, self.evaled_results)))
+        return list(self.schema.unique_keys)
 
     @property
     def values(self) -> List[Optional[object]]:
-        return [rr.value for rr in self.evaled_results]
+        return list(self._values)
 
     @property
     def items(self) -> List[Tuple[Any, Any]]:
-        return [(rr.key, rr.value) for rr in self.evaled_results]
+        return list(zip(self.schema.keys, self._values))
 
     @property
     def items_no_scope_signs(self) -> 'AttributedDict':
         return AttributedDict([(re.sub(r'\b(.+?)@\d+\b', r'\1', rr[0]), rr[1]) for rr in self.items])
 
+    def as_dict(self) -> Dict[str, Any]:
+        """
+            The entry's attributes and their values.
+        """
+        return {a: self._values[i] for a, i in self.schema.attributes.items()}
+
     def satisfies(self) -> bool:
-        return all([r.value is not None and r.value is not False and r.value != [None] for r in self.evaled_results])
+        return all([v is not None and v is not False and v != [None] for v in self._values])
 
     def extend_with_empty_keys(self, keys: Iterable[str]):
-        return EvalResultEntry(self.time, EvalResultEntry.join_evaled_results(self,
-                                                                              EvalResultEntry.empty_with_keys(self.time,
-                                                                                                              keys)))
+        return EvalResultEntry._join(self.time, self, EvalResultEntry.empty_with_keys(self.time, keys), None)
 
     @classmethod
     def empty(cls, t: Time = -1) -> 'EvalResultEntry':
-        return EvalResultEntry(t, [], [])
+        return EvalResultEntry.of(t, EvalResultSchema.of(()), (), [])
 
     @classmethod
     def empty_with_keys(cls, t: Time = -1, keys: Optional[Iterable[str]] = None):
-        return EvalResultEntry(t, [EvalResultPair(k, None) for k in keys], [])
+        schema = EvalResultSchema.of(keys)
+        return EvalResultEntry.of(t, schema, (None,) * len(schema.keys), [])
 
     @staticmethod
     def join(e1: 'EvalResultEntry', e2: 'EvalResultEntry') -> 'EvalResultEntry':
@@ -181,178 +277,307 @@ class EvalResultEntry(OrderedDict):
         if e1.time != e2.time:
             return EvalResultEntry.empty()
 
-        return EvalResultEntry(e1.time, EvalResultEntry.join_evaled_results(e1, e2), [])
+        return EvalResultEntry._join(e1.time, e1, e2, [])
+
+    @staticmethod
+    def _join(time: Time, e1: 'EvalResultEntry', e2: 'EvalResultEntry',
+              replacements: Optional[List[Replacement]]) -> 'EvalResultEntry':
+        schema, indices = e1.schema.join(e2.schema)
+        v1, v2 = e1._values, e2._values
+
+        # For mutual keys, prefer the value of e1, unless only the value of e2 isn't None.
+        # TODO: What should be done when both aren't None? For now, choose e1 randomly...
+        return EvalResultEntry.of(time, schema, tuple(
+            v2[i2] if i1 is None or i2 is not None and v1[i1] is None and v2[i2] is not None else v1[i1]
+            for i1, i2 in indices), replacements)
 
     @staticmethod
     def join_evaled_results(e1: 'EvalResultEntry', e2: 'EvalResultEntry') -> List[EvalResultPair]:
+        return EvalResultEntry._join(e1.time, e1, e2, []).evaled_results
 
-        res = []
-        all_keys = OrderedDict.fromkeys([*e1.keys, *e2.keys])
+    def __getitem__(self, key) -> Optional[EvalResultPair]:
+        i = self.schema.index.get(key)
+        if i is None:
+            return None
 
-        # Add keys only from e1.
-        res.extend([e1[k] for k in all_keys.keys() if k not in e2.keys])
+        return EvalResultPair(key, self._values[i])
 
-        # Add keys only from e2.
-        res.extend([e2[k] for k in all_keys.keys() if k not in e1.keys])
+    def __contains__(self, attribute) -> bool:
+        return attribute in self.schema.attributes
 
-        # Add values from mutual keys.
-        for k in filter(lambda k: k in e1.keys and k in e2.keys, all_keys.keys()):
-            if e1[k].value is e2[k].value is None:
-                pair = e1[k]
-            elif e1[k].value is not None and e2[k].value is None:
-                pair = e1[k]
-            elif e1[k].value is None and e2[k].value is not None:
-                pair = e2[k]
-            else:
-                # TODO: What should be done here? For now, choose e1 randomly...
-                pair = e1[k]
+    def replace_key(self, key: str, new_key: str) -> 'EvalResultEntry':
+        i = self.schema.index.get(key)
+        if i is None:
+            raise RuntimeError(f'{key} is not a valid key.')
 
-            res.append(pair)
+        keys, values = list(self.schema.keys), list(self._values)
+        del keys[i]
+        value = values.pop(i)
 
-        return res
+        self.schema = EvalResultSchema.of([*keys, new_key])
+        self._values = (*values, value)
+        return self
 
-    def __getitem__(self, key) -> Optional[EvalResultPair]:
-        filtered = list(filter(lambda p: p.key == key, self.evaled_results))
-        if not filtered:
-            return None
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.schema.attributes)
 
-        return filtered[0]
+    def __len__(self) -> int:
+        return len(self.schema.attributes)
 
-    def replace_key(self, key: str, new_key: str) -> 'EvalResultEntry':
-        item = self[key]
-        if not item:
-            raise RuntimeError(f'{key} is not a valid key.')
+    def __eq__(self, other) -> bool:
+        if isinstance(other, EvalResultEntry):
+            return list(self.as_dict().items()) == list(other.as_dict().items())
 
-        self.evaled_results.remove(item)
-        self.evaled_results.append(EvalResultPair(new_key, item.value))
+        if isinstance(other, Mapping):
+            return self.as_dict() == dict(other)
 
-        del self[key]
-        self[new_key] = item.value
+        return NotImplemented
 
-        delattr(self, key)
-        setattr(self, new_key, item.value)
-        return self
+    __hash__ = None
 
-    def __iter__(self) -> Iterator[EvalResultPair]:
-        return super().__iter__()
+    def __reduce__(self):
+        return EvalResultEntry.of, (self.time, self.schema, self._values, self.replacements)
 
     def __repr__(self):
         return repr(self.items)
 
 
-class EvalResult(List[EvalResultEntry]):
+class EvalResult(object):
+    """
+        The results of an operator along the time, as runs: ranges of consecutive times [start, end) that have the same
+        results, each kept as a single entry (of the run's start).
+        Iterating over a result expands its runs to an entry for each time, so operators that can work on the ranges
+        use the runs directly (see runs).
+    """
+
+    def __init__(self, seq: Iterable[EvalResultEntry] = ()):
+        self._starts: List[Time] = []
+        self._ends: List[Time] = []
+        self._entries: List[EvalResultEntry] = []
+        self._len = 0
+        self._all_keys: Optional[Iterable[str]] = None
+        # The index of the run of each time (see _run_index).
+        self._index: Optional[Union[List[int], Dict[Time, int]]] = None
+
+        if isinstance(seq, EvalResult):
+            self._starts, self._ends, self._entries = list(seq._starts), list(seq._ends), list(seq._entries)
+            self._len = seq._len
+            return
+
+        for e in sorted(seq, key=lambda _e: _e.time):
+            if self._entries and self._ends[-1] == e.time and EvalResult._same_results(self._entries[-1], e):
+                self._ends[-1] += 1
+                self._len += 1
+            else:
+                self._add_run(e.time, e.time + 1, e)
+
+    @classmethod
+    def from_runs(cls, runs: Iterable[Tuple[Time, Time, EvalResultEntry]]) -> 'EvalResult':
+        """
+            Create a result from runs (start, end, entry), where entry is the entry of start.
+        """
+        runs = list(runs)
+        if any(runs[i][0] > runs[i + 1][0] for i in range(len(runs) - 1)):
+            runs.sort(key=lambda r: r[0])
+
+        result = cls()
+        for start, end, entry in runs:
+            if start < end:
+                result._add_run(start, end, entry)
+        return result
+
+    def _add_run(self, start: Time, end: Time, entry: EvalResultEntry) -> None:
+        self._starts.append(start)
+        self._ends.append(end)
+        self._entries.append(entry)
+        self._len += end - start
+        self._all_keys = None
+        self._index = None
+
+    @staticmethod
+    def _same_results(e1: EvalResultEntry, e2: EvalResultEntry) -> bool:
+        v1, v2 = e1._values, e2._values
+        return (e1.schema is e2.schema or e1.schema.keys == e2.schema.keys) and \
+            (v1 is v2 or len(v1) == len(v2) and all(x1 is x2 for x1, x2 in zip(v1, v2))) and \
+            (e1.replacements is e2.replacements or not e1.replacements and not e2.replacements)
 
-    def __init__(self, seq=()):
-        super().__init__(seq)
-        self._last_hash = -1
-        self._all_keys = []
+    def runs(self) -> Iterator[Tuple[Time, Time, EvalResultEntry]]:
+        return zip(self._starts, self._ends, self._entries)
+
+    @staticmethod
+    def _runs_of_times(times: Iterable[Time]) -> Iterator[Tuple[Time, Time]]:
+        if isinstance(times, range) and times.step == 1:
+            if times:
+                yield times.start, times.stop
+            return
+
+        start = end = None
+        for t in times:
+            if t == end:
+                end += 1
+                continue
+            if start is not None:
+                yield start, end
+            start, end = t, t + 1
+
+        if start is not None:
+            yield start, end
+
+    @staticmethod
+    def segments(times: Iterable[Time], *results: 'EvalResult') -> Iterator[Tuple[Time, Time]]:
+        """
+            Split times to ranges of consecutive times [start, end) in which none of results changes.
+        """
+        edges = sorted({t for r in results for t in chain(r._starts, r._ends)})
+        for start, end in EvalResult._runs_of_times(times):
+            for edge in edges[bisect_right(edges, start):bisect_left(edges, end)]:
+                yield start, edge
+                start = edge
+            yield start, end
+
+    @staticmethod
+    def zip_runs(r1: 'EvalResult', r2: 'EvalResult') -> Iterator[Tuple[Time, Time, EvalResultEntry, EvalResultEntry]]:
+        """
+            Zip the entries of r1 and r2 (by their order), as ranges [start, end) of r1's times, with the entries of
+            r1 and r2 at the beginning of the range.
+        """
+        runs1, runs2 = iter(r1.runs()), iter(r2.runs())
+        (start1, end1, e1), (start2, end2, e2) = next(runs1, (0, 0, None)), next(runs2, (0, 0, None))
+        while start1 < end1 and start2 < end2:
+            length = min(end1 - start1, end2 - start2)
+            yield start1, start1 + length, e1 if e1.time == start1 else e1.at(start1), \
+                e2 if e2.time == start2 else e2.at(start2)
+            start1, start2 = start1 + length, start2 + length
+            if start1 == end1:
+                start1, end1, e1 = next(runs1, (0, 0, None))
+            if start2 == end2:
+                start2, end2, e2 = next(runs2, (0, 0, None))
+
+    def __iter__(self) -> Iterator[EvalResultEntry]:
+        for start, end, entry in self.runs():
+            yield entry
+            for t in range(start + 1, end):
+                yield entry.at(t)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (EvalResult, list)):
+            return list(self) == list(other)
+        return NotImplemented
 
     def __hash__(self) -> int:
-        return hash(sum([hash(x for x in self)]))
+        # Equal results have the same number of entries, which are compared by value (and aren't hashable).
+        return hash(len(self))
+
+    def __reduce__(self):
+        return EvalResult.from_runs, (list(self.runs()),)
 
     @classmethod
     def create_const_copy(cls, r: 'EvalResult', c: object):
-        return EvalResult([EvalResultEntry.create_const_copy(e, c) for e in r])
+        return EvalResult.from_runs((start, end, EvalResultEntry.create_const_copy(e, c)) for start, end, e in r.runs())
 
     @classmethod
     def create_const(cls, times: Iterable[Time], k: str, c: object):
-        return EvalResult([EvalResultEntry.create_const(t, k, c) for t in times])
+        return EvalResult.from_runs((start, end, EvalResultEntry.create_const(start, k, c))
+                                    for start, end in EvalResult._runs_of_times(times))
 
     def all_satisfies(self):
-        return all([e.satisfies() for e in self])
+        return all([e.satisfies() for e in self._entries])
 
     def satisfies_iterator(self) -> Iterator['EvalResultEntry']:
         return filter(lambda e: e.satisfies(), self)
 
     def first_satisfaction(self) -> EvalResultEntry:
-        try:
-            return next(self.satisfies_iterator())
-        except StopIteration:
-            return EvalResultEntry.empty(-1)
+        for start, end, entry in self.runs():
+            if entry.satisfies():
+                return entry
+
+        return EvalResultEntry.empty(-1)
 
     def last_satisfaction(self) -> EvalResultEntry:
-        it = list(self.satisfies_iterator())
-        if not it:
-            return EvalResultEntry.empty()
-        return it[::-1][0]
+        for start, end, entry in reversed(list(self.runs())):
+            if entry.satisfies():
+                return entry.at(end - 1)
 
-    def satisfaction_ranges(self, all_times: Iterable[Time]) -> Collection[range]:
-        def create_range(times: List[Time]) -> range:
-            return range(times[::-1][0], times[0] + 1)
+        return EvalResultEntry.empty()
 
-        ranges = []
-        satisfaction_times = self.satisfaction_times()
-        rng = []
-        for t, res in [(t, t in satisfaction_times) for t in all_times]:
-            if not rng and not res:
+    def satisfaction_ranges(self, all_times: Optional[Iterable[Time]] = None) -> List[range]:
+        """
+            The sorted, disjoint ranges of the times of all_times (all the times of the result, by default) in which
+            the result is satisfied, by its runs.
+        """
+        satisfied = []
+        for start, end, e in self.runs():
+            if not e.satisfies():
                 continue
 
-            elif not rng and res:
-                rng = [t]
-
-            elif res and t == rng[0] + 1:
-                # Extend range.
-                rng.insert(0, t)
+            if satisfied and satisfied[-1][1] == start:
+                satisfied[-1][1] = end
+            else:
+                satisfied.append([start, end])
 
-            elif res and t != rng[0] + 1:
-                # The range should be completed, start a new range with t
-                ranges.append(create_range(rng))
-                rng = [t]
+        if all_times is None:
+            return [range(start, end) for start, end in satisfied]
 
-            else:  # not res and rng != [].
-                # The last range should be completed.
-                ranges.append(create_range(rng))
-                rng = []
+        # Intersect with the (sorted) runs of all_times.
+        ranges = []
+        i = 0
+        for start, end in EvalResult._runs_of_times(all_times):
+            while i < len(satisfied) and satisfied[i][1] <= start:
+                i += 1
+
+            j = i
+            while j < len(satisfied) and satisfied[j][0] < end:
+                rng = range(max(start, satisfied[j][0]), min(end, satisfied[j][1]))
+                if ranges and ranges[-1].stop == rng.start:
+                    ranges[-1] = range(ranges[-1].start, rng.stop)
+                else:
+                    ranges.append(rng)
+                j += 1
 
-        if rng:
-            ranges.append(create_range(rng))
         return ranges
 
     def satisfaction_times(self) -> Iterable[Time]:
-        return list(map(lambda e: e.time, self.satisfies_iterator()))
+        return [t for start, end, e in self.runs() if e.satisfies() for t in range(start, end)]
 
     @staticmethod
     def _create_key(entries: Iterable[int]):
         return str((min(entries), max(entries)))
 
     def all_keys(self) -> Iterable[str]:
-        if hash(self) == self._last_hash:
-            return self._all_keys
-
-        self._last_hash = hash(self)
-        self._all_keys = reduce(lambda acc, new_keys: OrderedDict.fromkeys([*acc.keys(), *new_keys]),
-                                map(lambda e: list(OrderedDict.fromkeys(e.keys)), self), OrderedDict()).keys()
+        if self._all_keys is None:
+            all_keys = OrderedDict()
+            for schema in dict.fromkeys(e.schema for e in self._entries):
+                all_keys.update(dict.fromkeys(schema.unique_keys))
+            self._all_keys = all_keys.keys()
         return self._all_keys
 
     def create_results_dict(self, e: EvalResultEntry) -> Dict[str, Optional[object]]:
         return {k: e[k].value if e[k] else None for k in self.all_keys()}
 
     def group(self) -> ParseResults:
-        if len(self) == 0:
+        if len(self) == 0 or not self.all_keys():
             return {}
 
         res = {}
 
         rng = []
         vals = None
-        for e in sorted(self, key=lambda e: e.time):
-            if not vals:
-                # New range.
-                vals = self.create_results_dict(e)
-                rng.append(e.time)
-                continue
-
+        for start, end, e in self.runs():
             new_vals = self.create_results_dict(e)
 
             # If the same as the value before, extend the range.
-            if new_vals == vals:
-                rng.append(e.time)
+            if vals is not None and new_vals == vals:
+                rng.append(end - 1)
                 continue
 
             # Otherwise, the range is complete, add it to res.
-            res[EvalResult._create_key(rng)] = vals
+            if vals is not None:
+                res[EvalResult._create_key(rng)] = vals
             vals = new_vals
-            rng = [e.time]
+            rng = [start, end - 1]
 
         # Add last range if such exist.
         if rng and vals:
@@ -366,73 +591,187 @@ class EvalResult(List[EvalResultEntry]):
         return len(self) == 0
 
     def times(self):
-        return sorted([e.time for e in self])
-
+        return [t for start, end in zip(self._starts, self._ends) for t in range(start, end)]
 
     @classmethod
     def join(cls, r1: 'EvalResult', r2: 'EvalResult'):
+        return EvalResult.join_all((r1, r2))
 
-        if not r1:
-            return r2
-
-        if not r2:
-            return r1
-
-        results = []
-        r1_times = r1.times()
-        r2_times = r2.times()
-
-        r1_time_mapped: Dict[Time, EvalResultEntry] = {e.time: e for e in r1}
-        r2_time_mapped: Dict[Time, EvalResultEntry] = {e.time: e for e in r2}
-
-        r1_keys = r1.all_keys()
-        r2_keys = r2.all_keys()
-
-        for t in range(min(r1_times + r2_times), max(r1_times + r2_times) + 1):
-            if t not in r1_time_mapped and t not in r2_time_mapped:
+    @classmethod
+    def join_all(cls, results: Iterable['EvalResult']) -> 'EvalResult':
+        """
+            Outer join results by time: the same as joining them one after the other (r1.join(r2).join(r3)...), by
+            merging the runs of all of them at once.
+            In each time, the entries of the results in that time are joined (see EvalResultEntry.join), and an entry of
+            a result that is missing in other results is extended with their keys (as empty).
+        """
+        results = [r for r in results if r]
+        if len(results) <= 1:
+            return results[0] if results else EvalResult()
+
+        # Split the union of the results' times to segments in which none of them changes.
+        edges = sorted({t for r in results for t in chain(r._starts, r._ends)})
+        segments = [(start, end) for start, end in zip(edges, edges[1:]) if any(r._run_of(start) >= 0 for r in results)]
+
+        joined: List[Optional[EvalResultEntry]] = [None] * len(segments)
+        joined_keys: Iterable[str] = ()
+        for n, r in enumerate(results):
+            keys = r.all_keys()
+            for j, (start, _) in enumerate(segments):
+                i = r._run_of(start)
+                e = r._entries[i] if i >= 0 else None
+                if e is not None and e.time != start:
+                    e = e.at(start)
+
+                acc = joined[j]
+                if n == 0 or acc is None and e is None:
+                    joined[j] = e
+                elif acc is None:
+                    joined[j] = e.extend_with_empty_keys(joined_keys)
+                elif e is None:
+                    joined[j] = acc.extend_with_empty_keys(keys)
+                else:
+                    joined[j] = EvalResultEntry.join(acc, e)
+
+            joined_schemas = dict.fromkeys(e.schema for e in joined if e is not None)
+            joined_keys = list(OrderedDict.fromkeys(k for schema in joined_schemas for k in schema.unique_keys))
+
+        result = EvalResult()
+        for (start, end), e in zip(segments, joined):
+            if e is None:
                 continue
-            elif t in r1_time_mapped and t in r2_time_mapped:
-                results.append(EvalResultEntry.join(r1_time_mapped[t], r2_time_mapped[t]))
-            elif t not in r2_time_mapped:
-                results.append(r1_time_mapped[t].extend_with_empty_keys(r2_keys))
-            elif t not in r1_time_mapped:
-                results.append(r2_time_mapped[t].extend_with_empty_keys(r1_keys))
 
-        return EvalResult(results)
+            if result._entries and result._ends[-1] == start and EvalResult._same_results(result._entries[-1], e):
+                result._ends[-1] = end
+                result._len += end - start
+            else:
+                result._add_run(start, end, e)
+
+        return result
 
     def __add__(self, other: 'EvalResult') -> 'EvalResult':
         return EvalResult.join(self, other)
 
+    def _run_index(self) -> Union[List[int], Dict[Time, int]]:
+        """
+            Map each time to the index of its run (the first one, for times that are in several runs): a list indexed by
+            the offset of the time from the first start when the times are dense, otherwise a dict.
+        """
+        if self._index is None:
+            first = self._starts[0] if self._starts else 0
+            span = max(self._ends, default=first) - first
+            dense = span <= 2 * self._len
+            index = [-1] * span if dense else {}
+            # Fill from the last run, so the earlier runs win.
+            for i in range(len(self._starts) - 1, -1, -1):
+                if dense:
+                    index[self._starts[i] - first:self._ends[i] - first] = [i] * (self._ends[i] - self._starts[i])
+                else:
+                    index.update(dict.fromkeys(range(self._starts[i], self._ends[i]), i))
+            self._index = index
+
+        return self._index
+
+    def _run_of(self, t: Time) -> int:
+        index = self._run_index()
+        if isinstance(index, dict):
+            return index.get(t, -1)
+
+        offset = t - self._starts[0] if self._starts else -1
+        return index[offset] if 0 <= offset < len(index) else -1
+
     def __getitem__(self, t: Time):
-        matches_time = list(filter(lambda e: e and e.time == t, self))
-        if not matches_time:
+        i = self._run_of(t)
+        if i < 0 or not self._entries[i]:
             return EvalResultEntry.empty_with_keys(t, self.all_keys())
 
-        return matches_time[0]
+        entry = self._entries[i]
+        return entry if t == self._starts[i] else entry.at(t)
+
+    def latest(self, t: Time) -> Tuple[Optional[EvalResultEntry], Time]:
+        """
+            Find the entry of the latest time that is not after t (None if there isn't such), with the next time in which
+            the results of the latest entry change.
+        """
+        j = bisect_right(self._starts, t)
+        next_start = self._starts[j] if j < len(self._starts) else math.inf
+        i = j - 1
+        while i > 0 and self._starts[i - 1] == self._starts[i]:
+            i -= 1
+        if i < 0:
+            return None, next_start
+
+        if t < self._ends[i]:
+            return self[t], self._ends[i]
+
+        return self[self._ends[i] - 1], next_start
+
+    def sliced(self, start: Time, end: Time) -> 'EvalResult':
+        """
+            The results of the times in [start, end).
+        """
+        return EvalResult.from_runs(
+            (max(s, start), min(e, end), entry if s >= start else entry.at(start))
+            for s, e, entry in self.runs() if s < end and start < e)
+
+    def size_in_memory(self) -> int:
+        """
+            The approximate size in bytes of the runs and of the values they refer to.
+        """
+        size = sum(map(sys.getsizeof, (self._starts, self._ends, self._entries)))
+        seen = set()
+        pending: List[object] = list(self._entries)
+        while pending:
+            o = pending.pop()
+            if id(o) in seen:
+                continue
+            seen.add(id(o))
+
+            size += sys.getsizeof(o)
+            if isinstance(o, EvalResultEntry):
+                pending.append(o._values)
+            elif isinstance(o, dict):
+                pending.extend(o.keys())
+                pending.extend(o.values())
+            elif isinstance(o, (list, tuple, set, frozenset)):
+                pending.extend(o)
+            elif hasattr(o, '__dict__'):
+                pending.append(vars(o))
+
+        return size
 
     def __repr__(self):
         return [_ for _ in self].__repr__()
 
     @classmethod
     def empty(cls, time_range: Iterable[Time]) -> 'EvalResult':
-        return EvalResult([EvalResultEntry.empty(t) for t in time_range])
+        return EvalResult.from_runs((start, end, EvalResultEntry.empty(start))
+                                    for start, end in EvalResult._runs_of_times(time_range))
 
     def rename_key(self, new: str, old: str):
-        for e in self:
-            for k in e.keys:
-                if old in k:
-                    e.replace_key(k, k.replace(old, new))
+        # The renamed keys move to the end (see EvalResultEntry.replace_key), so reorder the values accordingly.
+        renamed: Dict[EvalResultSchema, Tuple[EvalResultSchema, List[int]]] = {}
+        for i, e in enumerate(self._entries):
+            if e.schema not in renamed:
+                keys = e.schema.keys
+                order = [j for j, k in enumerate(keys) if old not in k] + [j for j, k in enumerate(keys) if old in k]
+                renamed[e.schema] = EvalResultSchema.of(keys[j].replace(old, new) for j in order), order
+
+            schema, order = renamed[e.schema]
+            if schema is not e.schema:
+                self._entries[i] = EvalResultEntry.of(e.time, schema, tuple(e._values[j] for j in order),
+                                                      e.replacements)
 
-        self._last_hash = -1
+        self._all_keys = None
 
     def by_key(self, key: str) -> 'EvalResult':
         if key not in self.all_keys():
             return EvalResult.empty(range(0, len(self)))
 
-        return EvalResult([
-            EvalResultEntry(time=e.time, results=[EvalResultPair(key, e[key])], replacements=e.replacements)
-            for e in self
-        ])
+        return EvalResult.from_runs(
+            (start, end, EvalResultEntry(time=e.time, results=[EvalResultPair(key, e[key])], replacements=e.replacements))
+            for start, end, e in self.runs()
+        )
 
 
 EvalFunction = Callable[[int, int, int, int], EvalResult]
@@ -0,0 +1,241 @@
+import io
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, asdict
+from itertools import chain
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar, Union
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# The function and items of the map that the workers are forked for, and the builder of the function (they inherit
+# them, so they aren't pickled).
+_forked_task: Optional[Tuple[Callable, Sequence, Any]] = None
+
+# Taken by the map that forks the workers (and inherited taken by them), so a map that is nested in it doesn't fork
+# workers of its own: there are no more worker processes than the workers of a single scheduler at any time.
+_fork_lock = threading.Lock()
+
+
+def _run_forked_task(i: int, submit_time: float) -> Tuple[float, Optional[bytes]]:
+    """
+        The result of an item, with the work of the builder in evaluating it (see ObjectBuilder.take_work), pickled.
+        None if they can't be pickled, or if the function raises an error that can't be, for the calling process to
+        evaluate the item.
+    """
+    function, items, builder = _forked_task
+    # The monotonic clock is the same in all processes.
+    queue_wait = time.monotonic() - submit_time
+    if builder is not None:
+        builder.track_work()
+
+    try:
+        result = function(items[i])
+    except Exception as e:
+        if _dumps(e) is None:
+            return queue_wait, None
+        raise
+
+    work = builder.take_work() if builder is not None else None
+    pickled = _dumps((result, work), builder)
+    if pickled is None and work is not None:
+        # The result is sent back without the work of the builder.
+        pickled = _dumps((result, None), builder)
+
+    return queue_wait, pickled
+
+
+class _Pickler(pickle.Pickler):
+    """
+        Pickles the types that the archive has interned by their ids in the archive, which the workers share with the
+        calling process (e.g., the classes of the recorded program, which can't be pickled by their names).
+    """
+
+    def __init__(self, file, builder: Any):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._interned = builder.archive.records.interned if builder is not None else None
+
+    def persistent_id(self, o: object) -> Optional[int]:
+        if self._interned is not None and isinstance(o, type):
+            return self._interned.id_of(o)
+
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file, builder: Any):
+        super().__init__(file)
+        self._interned = builder.archive.records.interned if builder is not None else None
+
+    def persistent_load(self, pid: int) -> type:
+        return self._interned[pid]
+
+
+def _dumps(o: object, builder: Any = None) -> Optional[bytes]:
+    file = io.BytesIO()
+    try:
+        _Pickler(file, builder).dump(o)
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError):
+        return None
+
+    return file.getvalue()
+
+
+@dataclass
+class EvalMetrics(object):
+    """
+        The work of a scheduler in evaluating a query.
+    """
+    # The items that have been evaluated by workers.
+    tasks: int = 0
+    # The maps that have forked workers, and the maps that have run in the calling process.
+    forked_maps: int = 0
+    serial_maps: int = 0
+    # The items of forked maps that have been evaluated in the calling process, since their results couldn't be sent
+    # back, or the workers have failed.
+    fallbacks: int = 0
+    # The total time (in seconds) the tasks have waited for a worker.
+    queue_wait: float = 0.0
+    # The time (in seconds) of evaluating the query.
+    wall_time: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class EvalScheduler(object):
+    """
+        Evaluates parts of a query (e.g., chunks of its times, or the arguments of an operator) in a pool of processes.
+        The workers are forked for each map, so they share the archive, the builder and anything else the evaluated
+        function refers to as they are (read-only), and send back the results, with the work of the builder (e.g., the
+        objects it has constructed, see ObjectBuilder.take_work) for the calling process to keep.
+        Workers are forked only by a process that has no other threads (which might hold locks that the workers would
+        wait for forever, e.g., the threads of a server), otherwise a map runs in the calling process. So does a map
+        that is smaller than min_parallel_size, or nested in another map, and (for each of its items) a map whose
+        results can't be sent back.
+        The workers take the items of a map one by one as they become free, so chunks are made smaller than a worker's
+        share (see CHUNKS_PER_WORKER) for the workers that are done early to take chunks of the others.
+    """
+
+    DEFAULT_MIN_PARALLEL_SIZE = 2048
+    CHUNKS_PER_WORKER = 4
+
+    def __init__(self, workers: Optional[int] = None, min_parallel_size: int = DEFAULT_MIN_PARALLEL_SIZE,
+                 builder: Optional[Any] = None):
+        """
+            :param builder: The ObjectBuilder of the evaluated functions, which keeps the work of its copies in the
+                            workers.
+        """
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.min_parallel_size = min_parallel_size
+        self.builder = builder
+        # The metrics are kept for each thread, since threads (e.g., of a server) evaluate queries concurrently.
+        self._local = threading.local()
+
+    @property
+    def metrics(self) -> EvalMetrics:
+        """
+            The metrics of the maps of the current thread.
+        """
+        if not hasattr(self._local, 'metrics'):
+            self._local.metrics = EvalMetrics()
+        return self._local.metrics
+
+    @metrics.setter
+    def metrics(self, metrics: EvalMetrics) -> None:
+        self._local.metrics = metrics
+
+    @classmethod
+    def create(cls, parallel: Union[bool, int], builder: Optional[Any] = None) -> 'EvalScheduler':
+        """
+            A scheduler by the parallel option of a parser: True for a worker for each CPU, or the number of workers.
+        """
+        return cls(os.cpu_count() if parallel is True else max(int(parallel), 1), builder=builder)
+
+    @property
+    def is_parallel(self) -> bool:
+        return self.workers > 1 and 'fork' in multiprocessing.get_all_start_methods()
+
+    @property
+    def can_fork(self) -> bool:
+        """
+            Whether workers can be forked now: by a parallel scheduler, in a process that has no other threads, and not
+            in a map that has forked workers.
+        """
+        return self.is_parallel and threading.active_count() == 1 and not _fork_lock.locked()
+
+    def map(self, function: Callable[[T], R], items: Sequence[T], size: Optional[int] = None) -> List[R]:
+        """
+            The results of function for each of items, in order.
+            :param size: The amount of work of the map (e.g., the number of times to evaluate), by default the number
+                         of items.
+        """
+        items = list(items)
+        if not self._should_fork(len(items), len(items) if size is None else size) or \
+                not _fork_lock.acquire(blocking=False):
+            self.metrics.serial_maps += 1
+            return [function(item) for item in items]
+
+        try:
+            self.metrics.forked_maps += 1
+            return self._map_forked(function, items)
+        finally:
+            _fork_lock.release()
+
+    def map_chunks(self, function: Callable[[List[T]], List[R]], items: Sequence[T]) -> List[R]:
+        """
+            Split items to consecutive chunks (see CHUNKS_PER_WORKER), and concatenate the results of function for each
+            of the chunks, in order.
+        """
+        items = list(items)
+        if not self._should_fork(self.workers, len(items)):
+            self.metrics.serial_maps += 1
+            return function(items)
+
+        chunk_size = math.ceil(len(items) / (self.workers * self.CHUNKS_PER_WORKER))
+        return list(chain.from_iterable(self.map(function, [items[i:i + chunk_size]
+                                                            for i in range(0, len(items), chunk_size)], len(items))))
+
+    def _should_fork(self, count: int, size: int) -> bool:
+        return count > 1 and size >= self.min_parallel_size and self.can_fork
+
+    def _map_forked(self, function: Callable[[T], R], items: List[T]) -> List[R]:
+        global _forked_task
+        _forked_task = function, items, self.builder
+        try:
+            with ProcessPoolExecutor(min(self.workers, len(items)),
+                                     mp_context=multiprocessing.get_context('fork')) as executor:
+                futures = [executor.submit(_run_forked_task, i, time.monotonic()) for i in range(len(items))]
+                return [self._result(function, item, future) for item, future in zip(items, futures)]
+        finally:
+            _forked_task = None
+
+    def _result(self, function: Callable[[T], R], item: T, future) -> R:
+        try:
+            queue_wait, pickled = future.result()
+        except BrokenProcessPool:
+            pickled = None
+        else:
+            self.metrics.tasks += 1
+            self.metrics.queue_wait += queue_wait
+
+        if pickled is None:
+            # The result can't be sent back (e.g., it refers to objects that can't be pickled), or the worker has
+            # failed: evaluate here (which raises the error of function again, if there's one).
+            self.metrics.fallbacks += 1
+            return function(item)
+
+        result, work = _Unpickler(io.BytesIO(pickled), self.builder).load()
+        if work is not None:
+            self.builder.adopt_work(work)
+
+        return result
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(workers={self.workers}, min_parallel_size={self.min_parallel_size})'
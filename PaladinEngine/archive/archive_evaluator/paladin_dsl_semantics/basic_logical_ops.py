@@ -1,9 +1,9 @@
-import os
-from typing import Iterable, Optional, Dict, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterable, Optional, Dict, Callable, List
+
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, EvalResult
 from archive.archive_evaluator.paladin_dsl_semantics import BiTimeOperator, Operator, TimeOperator, Whenever
 from archive.archive_evaluator.paladin_dsl_semantics.operator import UniLateralOperator
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import SemanticsUtils
 from archive.object_builder.object_builder import ObjectBuilder
 
 
@@ -11,24 +11,41 @@ class And(BiTimeOperator):
     """
         And(o1, o2): Satisfied for each time that satisfies both o1 and o2.
     """
+    short_circuit = False
 
     def __init__(self, times: Iterable[Time], first: Operator, second: Operator, parallel: bool = False):
         super().__init__(times, first, second, lambda r1, r2: r1 and r2, parallel)
 
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        first, second = self.first.time_bounds(builder), self.second.time_bounds(builder)
+        if first is None or second is None:
+            return first if second is None else second
+
+        return SemanticsUtils.intersect_ranges(first, second)
+
 
 class Or(BiTimeOperator):
     """
         Or(o1, o2): Satisfies for each time that satisfies either o1 or o2.
     """
+    short_circuit = True
+
+    def __init__(self, times: Iterable[Time], first: Operator, second: Operator, parallel: bool = False):
+        super().__init__(times, first, second, lambda r1, r2: r1 or r2, parallel)
+
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        first, second = self.first.time_bounds(builder), self.second.time_bounds(builder)
+        if first is None or second is None:
+            return None
 
-    def __init__(self, times: Iterable[Time], first: Operator, second: Operator):
-        super().__init__(times, first, second, lambda r1, r2: r1 or r2)
+        return SemanticsUtils.unite_ranges(first, second)
 
 
 class Not(UniLateralOperator, TimeOperator):
     """
         Not(o): Satisfies for each time that doesn't satisfy o.
     """
+    pointwise = True
 
     def __init__(self, times: Iterable[Time], first: Operator, parallel: bool = False):
         UniLateralOperator.__init__(self, times, first, parallel)
@@ -43,13 +60,8 @@ class Not(UniLateralOperator, TimeOperator):
             first = Whenever(self.times, self.first).eval(builder, query_locals, user_aux)
             logical_not = lambda e: not e.satisfies()
 
-        process_entry = lambda e, log_not: TimeOperator.create_time_eval_result_entry(e.time, log_not(e))
-
-        with ThreadPoolExecutor(os.cpu_count()) as executor:
-            futures = [executor.submit(process_entry, e, logical_not) for e in first]
-            results = [future.result() for future in as_completed(futures)]
-
-        return EvalResult(results)
+        return EvalResult.from_runs((start, end, TimeOperator.create_time_eval_result_entry(start, logical_not(e)))
+                                    for start, end, e in first.runs())
 
 
 
@@ -6,6 +6,7 @@ from archive.archive_evaluator.paladin_dsl_config.paladin_dsl_config import FUNC
 from archive.archive_evaluator.paladin_dsl_semantics.operator import UniLateralOperator
 from archive.archive_evaluator.paladin_dsl_semantics.raw import Raw
 from archive.archive_evaluator.paladin_dsl_semantics.selector_op import Selector
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import SemanticsUtils
 from archive.archive_evaluator.paladin_dsl_semantics.time_operator import TimeOperator
 from archive.object_builder.object_builder import ObjectBuilder
 from ast_common.ast_common import str2ast
@@ -27,23 +28,23 @@ class Changed(UniLateralOperator, TimeOperator):
             return EvalResult.empty(self.times)
 
         res = self.first.eval(builder, query_locals, user_aux)
-        not_none_times = [i.time for i in res if not all(x is None for x in i.values)]
 
-        if len(res) == 0 or not not_none_times:
-            return EvalResult.empty(self.times)
+        # The entries of a run are the same, so e changes only in the starts of runs.
+        change_times = []
+        last = None
+        for start, end, entry in res.runs():
+            if all(x is None for x in entry.values):
+                continue
+
+            if last is None or entry.items != last.items:
+                change_times.append(start)
 
-        res_iter = iter(filter(lambda i: i.time in not_none_times, res))
-        last = next(res_iter)
-        change_times = [not_none_times[0]]
-        for curr in res_iter:
-            if curr.items != last.items:
-                change_times.append(curr.time)
+            last = entry
 
-            last = curr
+        if not change_times:
+            return EvalResult.empty(self.times)
 
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(t, t in change_times, []) for t in self.times
-        ])
+        return TimeOperator.create_time_eval_result(self.times, SemanticsUtils.ranges_of_times(change_times))
 
     @staticmethod
     def separate(expr: str):
@@ -5,6 +5,7 @@ from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types i
 from archive.archive_evaluator.paladin_dsl_semantics.changed import Changed
 from archive.archive_evaluator.paladin_dsl_semantics.operator import BiLateralOperator
 from archive.archive_evaluator.paladin_dsl_semantics.raw import Raw
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import SemanticsUtils
 from archive.archive_evaluator.paladin_dsl_semantics.time_operator import TimeOperator
 from archive.object_builder.object_builder import ObjectBuilder
 
@@ -17,17 +18,17 @@ class ChangedInto(BiLateralOperator, TimeOperator):
                             the first time it had that value rather on every time since.
     """
 
-    def __init__(self, times: Iterable[Time], target: Raw, value: typing.Union[Raw, typing.Any]):
+    def __init__(self, times: Iterable[Time], target: Raw, value: typing.Union[Raw, typing.Any],
+                 parallel: bool = False):
         value = value.query if isinstance(value, Raw) else value
         BiLateralOperator.__init__(self, times, Raw(f'{target.query} == {value}', target.line_no, times),
                                    Changed(times, target))
-        TimeOperator.__init__(self, times)
+        TimeOperator.__init__(self, times, parallel)
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        target_with_value = self.first.eval(builder, query_locals, user_aux).satisfaction_times()
-        changed = self.second.eval(builder, query_locals, user_aux).satisfaction_times()
+        target_with_value = self.first.eval(builder, query_locals, user_aux).satisfaction_ranges()
+        changed = self.second.eval(builder, query_locals, user_aux).satisfaction_ranges()
 
-        return EvalResult(
-            [TimeOperator.create_time_eval_result_entry(t, t in target_with_value and t in changed) for t in
-             self.times])
+        return TimeOperator.create_time_eval_result(self.times,
+                                                    SemanticsUtils.intersect_ranges(target_with_value, changed))
@@ -1,12 +1,13 @@
 from typing import Iterable, Optional, Dict, Collection, Any as AnyT, Callable
 
-from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, EvalResultEntry, \
-    EvalResultPair, Time
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, Time
 from archive.archive_evaluator.paladin_dsl_semantics.operator import Operator
 from archive.object_builder.object_builder import ObjectBuilder
 
 
 class Const(Operator):
+    pointwise = True
+
     CONST_KEY = 'CONST'
 
     def __init__(self, const, times: Iterable[Time] = None, parallel: bool = False):
@@ -15,7 +16,7 @@ class Const(Operator):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        return EvalResult([EvalResultEntry(t, [EvalResultPair(Const.CONST_KEY, self.const)], []) for t in self.times])
+        return EvalResult.create_const(self.times, Const.CONST_KEY, self.const)
 
     def _get_args(self) -> Collection['Operator']:
         return []
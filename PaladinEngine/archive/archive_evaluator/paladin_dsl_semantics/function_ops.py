@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, Dict, Callable
+from typing import Iterable, Optional, Dict, Callable, List
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, EvalResult, LineNo
 from archive.archive_evaluator.paladin_dsl_semantics.const import Const
@@ -25,11 +25,10 @@ class InFunction(UniLateralOperator, TimeOperator):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None) -> EvalResult:
-        func_entries_times = list(map(lambda r: r[1].time, builder.get_function_entries(self.func_name, self.line_no)))
+        return TimeOperator.create_time_eval_result(self.times, self.time_bounds(builder))
 
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(t, t in func_entries_times, []) for t in self.times
-        ])
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        return builder.get_function_times(self.func_name, self.line_no)
 
 
 class FunctionSummary(UniLateralOperator, SummaryOp):
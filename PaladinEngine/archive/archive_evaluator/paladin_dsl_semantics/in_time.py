@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, Dict, Callable
+from typing import Iterable, Optional, Dict, Callable, List
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult
 from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import Time
@@ -17,10 +17,19 @@ class InTime(TimeOperator):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(t, t == self.const_time, [])
-            for t in self.times
-        ])
+        if not isinstance(self.const_time, int):
+            return EvalResult([
+                TimeOperator.create_time_eval_result_entry(t, t == self.const_time, [])
+                for t in self.times
+            ])
+
+        return TimeOperator.create_time_eval_result(self.times, self.time_bounds(builder))
+
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        if not isinstance(self.const_time, int):
+            return None
+
+        return [range(self.const_time, self.const_time + 1)]
 
 
 class InTimeRange(TimeOperator):
@@ -34,6 +43,7 @@ class InTimeRange(TimeOperator):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(t, t in self.const_time_range, []) for t in self.times
-        ])
+        return TimeOperator.create_time_eval_result(self.times, self.time_bounds(builder))
+
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        return [self.const_time_range] if self.const_time_range else []
@@ -1,6 +1,5 @@
-import os
 from typing import Optional, Dict, Callable
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, EvalResultEntry, \
     EvalResultPair
 from archive.archive_evaluator.paladin_dsl_semantics import TimeOperator
@@ -23,8 +22,6 @@ class Inv(BiLateralOperator, TimeOperator):
 
         first_values = {n.time: (o, n) for o, n in zip(first_entries, first_entries[1::])}
 
-        results = []
-
         def process_time_point(t, first_values, query_locals, key, builder, user_aux, second):
             if t not in first_values:
                 return TimeOperator.create_time_eval_result_entry(t, True)
@@ -36,13 +33,11 @@ class Inv(BiLateralOperator, TimeOperator):
                 second_res = second.eval(builder, inv_locals, user_aux)[n.time]
                 return TimeOperator.create_time_eval_result_entry(n.time, second_res.values[0])
 
-        with ThreadPoolExecutor(os.cpu_count()) as executor:
-            futures = {executor.submit(process_time_point, t, first_values, query_locals, key, builder, user_aux,
-                                       self.second): t for t in self.times}
-            for future in as_completed(futures):
-                results.append(future.result())
+        results = self._map_chunks(lambda times: [process_time_point(t, first_values, query_locals, key, builder,
+                                                                     user_aux, self.second) for t in times],
+                                   self.times)
 
-        return EvalResult(sorted(results, key=lambda e: e.time))
+        return EvalResult(results)
 
 
     # def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
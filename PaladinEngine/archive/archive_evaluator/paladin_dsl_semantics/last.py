@@ -17,7 +17,5 @@ class Last(UniLateralOperator, TimeOperator):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        first = self.first.eval(builder, query_locals, user_aux)
-        return EvalResult(
-            [TimeOperator.create_time_eval_result_entry(t, t == first.last_satisfaction().time, []) for t in
-             self.times])
+        last_satisfaction = self.first.eval(builder, query_locals, user_aux).last_satisfaction().time
+        return TimeOperator.create_time_eval_result(self.times, [range(last_satisfaction, last_satisfaction + 1)])
@@ -11,6 +11,7 @@ class Let(VariadicLateralOperator, AuxOp):
         Let(a1:=e1, a2:=e2, ...an:=en, o): Runs o with a1,...an as aliases to e1,...en respectfully.
     """
     LET_BOUNDED_KEY = 'BOUNDED'
+    pointwise = True
 
     def __init__(self, times: Iterable[Time], *args: Operator, **kwargs: Operator):
         if len(args) != 1:
@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, Dict, Collection, Callable
+from typing import Iterable, Optional, Dict, Callable, List
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult
 from archive.archive_evaluator.paladin_dsl_semantics.const import Const
@@ -18,9 +18,12 @@ class LineHit(UniLateralOperator, TimeOperator):
         TimeOperator.__init__(self, times)
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None, user_aux: Optional[Dict[str, Callable]] = None):
-        line_no: int = self.first.eval(builder, query_locals, user_aux)[0].values[0]
+        line_no: int = self.first.eval_const_value(builder, query_locals, user_aux)
+        return TimeOperator.create_time_eval_result(self.times, builder.find_event_times(line_no))
 
-        events: Collection[Time] = list(
-            map(lambda t: t[1].time, sorted(builder.find_events(line_no), key=lambda t: t[1].time)))
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        line_no = self.first.const if isinstance(self.first, Const) else None
+        if not isinstance(line_no, int):
+            return None
 
-        return EvalResult([TimeOperator.create_time_eval_result_entry(t, t in events, []) for t in self.times])
+        return builder.find_event_times(line_no)
@@ -1,6 +1,4 @@
-import os
 import time
-from concurrent.futures import ThreadPoolExecutor
 from math import floor
 from typing import Iterable, Optional, Dict, List, Tuple, Callable
 
@@ -11,7 +9,7 @@ from archive.archive_evaluator.paladin_dsl_semantics.in_time import InTime
 from archive.archive_evaluator.paladin_dsl_semantics.operator import BiLateralOperator, UniLateralOperator
 from archive.archive_evaluator.paladin_dsl_semantics.range import Range
 from archive.archive_evaluator.paladin_dsl_semantics.raw import Raw
-from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import Time
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import Time, SemanticsUtils
 from archive.archive_evaluator.paladin_dsl_semantics.summary_op import SummaryOp
 from archive.archive_evaluator.paladin_dsl_semantics.time_operator import TimeOperator
 from archive.archive_evaluator.paladin_dsl_semantics.union import Union
@@ -44,7 +42,8 @@ class LoopIteration(BiLateralOperator, SummaryOp):
             times = [i for r in rngs for i in r]
             ops.append(Raw(expr, line_no, times=times, parallel=True))
 
-        return Union(self.times, *ops, parallel=self.parallel).eval(builder, query_locals, user_aux)
+        return Union(self.times, *ops, parallel=self.parallel).use_scheduler(self.scheduler).eval(builder, query_locals,
+                                                                                                   user_aux)
 
     @classmethod
     def _create_iteration_operators(cls, times: Iterable[time], time_range_operator: Range, builder: ObjectBuilder,
@@ -107,11 +106,9 @@ class LoopSummary(UniLateralOperator, SummaryOp):
         iterations = builder.get_loop_iterations(line_no)
         iterations_count = floor(len(iterations) / 2)
 
-        with ThreadPoolExecutor(os.cpu_count()) as executor:
-            loop_iterations = list(executor.map(
-                lambda i: LoopIteration.create_iteration(self.times, line_no, i, builder, query_locals, user_aux),
-                range(iterations_count)
-            ))
+        loop_iterations = self._map(
+            lambda i: LoopIteration.create_iteration(self.times, line_no, i, builder, query_locals, user_aux),
+            range(iterations_count), iterations_count * len(self.times))
 
         dd = {}
         for d in loop_iterations:
@@ -125,30 +122,25 @@ class LoopSummary(UniLateralOperator, SummaryOp):
             times = [i for r in rngs for i in r]
             ops.append(Raw(expr, line_no, times=times, parallel=True))
 
-        union_result = Union(self.times, *ops, parallel=True).eval(builder, query_locals, user_aux)
+        union_result = Union(self.times, *ops, parallel=True).use_scheduler(self.scheduler).eval(builder, query_locals,
+                                                                                                  user_aux)
         iteration_number_result = self.__create_iteration_number_result(iterations, builder.get_loop_starts(line_no))
 
         return union_result + iteration_number_result
 
     @staticmethod
     def __create_iteration_number_result(iterations: List[Tuple[Rk, Rv]], loop_starts: List[Tuple[Rk, Rv]]):
+        # The iterations are counted by their order, from each start of the loop.
         results = []
-
-        def process_iteration(rk_vv):
-            rk, vv = rk_vv
-            nonlocal i
+        i = -1
+        for rk, vv in sorted(iterations + loop_starts, key=lambda t: t[1].time):
             if rk.stub_name == __SOL__.__name__:
                 i = -1
             if rk.stub_name != __SOLI__.__name__:
-                return None
+                continue
             i += 1
-            return EvalResultEntry(vv.time, [EvalResultPair(LoopSummary.ITERATION_KEY, i)], [])
+            results.append(EvalResultEntry(vv.time, [EvalResultPair(LoopSummary.ITERATION_KEY, i)], []))
 
-        i = -1
-        with ThreadPoolExecutor(os.cpu_count()) as executor:
-            futures = list(executor.map(process_iteration, sorted(iterations + loop_starts, key=lambda t: t[1].time)))
-
-        results.extend(filter(None, futures))
         return EvalResult(results)
 
 
@@ -157,35 +149,34 @@ class LoopIterationsTimes(UniLateralOperator, TimeOperator):
         LoopIterationsTimes(<ln>): Shows the time ranges in which the iterations of the loop in line <ln> have taken place.
     """
 
-    def __init__(self, times: Iterable[Time], line_no: int):
-        UniLateralOperator.__init__(self, times, Const(line_no, times))
-        TimeOperator.__init__(self, times)
+    def __init__(self, times: Iterable[Time], line_no: int, parallel: bool = False):
+        UniLateralOperator.__init__(self, times, Const(line_no, times), parallel)
+        TimeOperator.__init__(self, times, parallel)
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        line_no: int = self.first.eval(builder, query_locals, user_aux)[0].values[0]
-
-        # Retrieve loop iterations in parallel
-        with ThreadPoolExecutor(os.cpu_count()) as executor:
-            loop_iterations = list(executor.map(
-                lambda t: t[1].time,
-                sorted(builder.get_loop_iterations(line_no), key=lambda t: t[1].time)
-            ))
-
-        if len(loop_iterations) % 2 != 0:
+        iteration_ranges = self._iteration_ranges(builder, self.first.eval_const_value(builder, query_locals, user_aux))
+        if iteration_ranges is None:
             return EvalResult.empty(self.times)
 
-        loop_iteration_ranges = list(zip(loop_iterations[::2], loop_iterations[1::2]))
+        return TimeOperator.create_time_eval_result(self.times, iteration_ranges)
+
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        line_no = self.first.const if isinstance(self.first, Const) else None
+        if not isinstance(line_no, int):
+            return None
 
-        # Process time evaluation in parallel
-        def create_time_eval_result_entry(t):
-            return TimeOperator.create_time_eval_result_entry(
-                t,
-                any(start <= t <= end for start, end in loop_iteration_ranges),
-                []
-            )
+        return self._iteration_ranges(builder, line_no) or []
 
-        with ThreadPoolExecutor(os.cpu_count()) as executor:
-            eval_results = list(executor.map(create_time_eval_result_entry, self.times))
+    @staticmethod
+    def _iteration_ranges(builder: ObjectBuilder, line_no: int) -> Optional[List[range]]:
+        """
+            The times of the iterations of the loop in line_no, as sorted, disjoint ranges (None if they can't be
+            paired).
+        """
+        loop_iterations = sorted(t[1].time for t in builder.get_loop_iterations(line_no))
+        if len(loop_iterations) % 2 != 0:
+            return None
 
-        return EvalResult(eval_results)
+        return SemanticsUtils.unite_ranges([range(start, end + 1)
+                                            for start, end in zip(loop_iterations[::2], loop_iterations[1::2])])
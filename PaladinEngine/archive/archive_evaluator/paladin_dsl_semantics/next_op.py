@@ -17,15 +17,13 @@ class Next(UniLateralOperator, TimeOperator):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        results: EvalResult = self.first.eval(builder)
+        results: EvalResult = self.first.eval(builder, query_locals, user_aux)
 
-        satisfaction_iterator = results.satisfies_iterator()
-        next(satisfaction_iterator)
-        try:
-            next_satisfaction_times = list(map(lambda e: e.time, satisfaction_iterator))
-        except StopIteration:
+        satisfaction_ranges = results.satisfaction_ranges()
+        if not satisfaction_ranges:
             return EvalResult.empty(self.times)
 
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(t, t in next_satisfaction_times, []) for t in self.times
-        ])
+        # All the satisfactions but the first.
+        first = satisfaction_ranges[0].start
+        return TimeOperator.create_time_eval_result(self.times, [range(first + 1, satisfaction_ranges[0].stop),
+                                                                 *satisfaction_ranges[1:]])
@@ -1,23 +1,198 @@
 from abc import ABC
 from dataclasses import dataclass
-from typing import Optional, Iterable, Dict, Collection, List, Type, Callable, Any
+from functools import wraps
+from typing import Optional, Iterable, Dict, Collection, List, Type, Callable, Any, Hashable, Set, Iterator, \
+    Sequence, TypeVar
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, Time
+from archive.archive_evaluator.eval_scheduler import EvalScheduler
 from archive.object_builder.object_builder import ObjectBuilder
+from utils.lru_cache import LRUCache
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+class _Identity(object):
+    """
+        A key of an object by its identity, that keeps the object (so its id isn't reused while the key is kept).
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value: object):
+        self.value = value
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, _Identity) and self.value is other.value
+
+    def __hash__(self) -> int:
+        return id(self.value)
 
 
 @dataclass
 class Operator(ABC):
+    # The attributes that don't change the results of an operator.
+    _UNSIGNED_ATTRIBUTES = frozenset({'standalone', 'parallel', 'results_cache', 'scheduler'})
+
+    # A cache of the results of evaluating operators by their signatures (see use_results_cache).
+    results_cache = None
+
+    # The scheduler of the parallel parts of evaluating operators (see use_scheduler).
+    scheduler: Optional[EvalScheduler] = None
+
+    # Whether the results of the operator in each time depend only on that time (and not on the rest of its times), so
+    # its results in a range of times are a slice of its results in any wider range (see is_pointwise).
+    pointwise = False
 
     def __init__(self, times: Optional[Iterable[Time]] = None, parallel: bool = False):
         self._times = times
         self.parallel = parallel
         self.standalone = True
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'eval' in cls.__dict__:
+            cls.eval = Operator._eval_with_results_cache(cls.__dict__['eval'])
+
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None) -> EvalResult:
         raise NotImplementedError()
 
+    @staticmethod
+    def _eval_with_results_cache(eval_function: Callable) -> Callable:
+        @wraps(eval_function)
+        def _eval(self: 'Operator', builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
+                  user_aux: Optional[Dict[str, Callable]] = None) -> EvalResult:
+            results_cache: Optional[LRUCache] = self.results_cache
+            key = self._results_key(query_locals) if results_cache is not None else None
+            if key is None:
+                return eval_function(self, builder, query_locals, user_aux)
+
+            result = results_cache.get(key)
+            if result is None:
+                result = eval_function(self, builder, query_locals, user_aux)
+                if not isinstance(result, EvalResult):
+                    return result
+
+                results_cache.put(key, EvalResult(result))
+
+            # The users of a result might change it (e.g., rename its keys), so they get a copy of the cached one.
+            return EvalResult(result)
+
+        return _eval
+
+    def use_results_cache(self, results_cache: Optional[LRUCache]) -> 'Operator':
+        """
+            Cache the results of evaluating this operator and the operators in it by their signatures, so operators
+            that are the same (e.g., a sub query that appears twice in a query) are evaluated once.
+        """
+        for op in self._operators():
+            op.results_cache = results_cache
+
+        return self
+
+    def use_scheduler(self, scheduler: Optional[EvalScheduler]) -> 'Operator':
+        """
+            Evaluate the parallel parts of this operator and the operators in it with scheduler.
+        """
+        for op in self._operators():
+            op.scheduler = scheduler
+
+        return self
+
+    def _map(self, function: Callable[[T], R], items: Sequence[T], size: Optional[int] = None) -> List[R]:
+        """
+            The results of function for each of items, in order: by the scheduler if the operator is parallel.
+        """
+        if self.parallel and self.scheduler is not None:
+            return self.scheduler.map(function, items, size)
+
+        return [function(item) for item in items]
+
+    def _map_chunks(self, function: Callable[[List[T]], List[R]], items: Sequence[T]) -> List[R]:
+        """
+            The results of function for items, which are split to chunks by the scheduler if the operator is parallel.
+        """
+        if self.parallel and self.scheduler is not None:
+            return self.scheduler.map_chunks(function, items)
+
+        return function(list(items))
+
+    def is_pointwise(self) -> bool:
+        """
+            Whether this operator and all the operators in it are pointwise.
+        """
+        return all(op.pointwise for op in self._operators())
+
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        """
+            Sorted, disjoint ranges of times out of which this operator is never satisfied, if they can be found without
+            evaluating it (e.g., the times in which a line has been hit), or None otherwise (see QueryPlanner).
+        """
+        return None
+
+    def _operators(self) -> Iterator['Operator']:
+        yield self
+        values = list(vars(self).values())
+        while values:
+            value = values.pop()
+            if isinstance(value, Operator):
+                yield from value._operators()
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                values.extend(value)
+            elif isinstance(value, dict):
+                values.extend(value.values())
+
+    def _results_key(self, query_locals: Optional[Dict[str, EvalResult]]) -> Optional[Hashable]:
+        """
+            The key of the results of evaluating the operator with query_locals: its signature with the query locals
+            it refers to (by their identity, the results of a query aren't compared by their values), or None if the
+            operator has no signature.
+        """
+        names = set()
+        try:
+            key = Operator._signature(self, names), tuple((name, _Identity(query_locals[name])) for name in
+                                                          sorted(names) if query_locals and name in query_locals)
+            hash(key)
+        except (TypeError, SyntaxError):
+            return None
+
+        return key
+
+    @staticmethod
+    def _signature(value: Any, names: Set[str]) -> Hashable:
+        """
+            A canonical (hashable) form of value: for an operator, its class with the signatures of its attributes
+            (times, arguments, line no, etc.). The names the operators refer to are added to names.
+        """
+        if isinstance(value, Operator):
+            names.update(value._referred_names())
+            return type(value), tuple((k, Operator._signature(v, names)) for k, v in sorted(vars(value).items())
+                                      if k not in Operator._UNSIGNED_ATTRIBUTES)
+
+        if isinstance(value, (set, frozenset)):
+            return type(value), frozenset(Operator._signature(v, names) for v in value)
+
+        if isinstance(value, (list, tuple)):
+            return type(value), tuple(Operator._signature(v, names) for v in value)
+
+        if isinstance(value, dict):
+            return dict, tuple((k, Operator._signature(v, names)) for k, v in value.items())
+
+        if callable(value) and getattr(value, '__closure__', True) is None:
+            # A function that refers to nothing but its arguments (e.g., a lambda made in __init__) is signed by its
+            # code, so the operators that make their own copy of it have the same signature.
+            return type(value), value.__code__
+
+        hash(value)
+        return type(value), value
+
+    def _referred_names(self) -> Iterable[str]:
+        """
+            The names (of query locals) that the operator refers to (by itself, without its arguments).
+        """
+        return ()
+
     @classmethod
     def name(cls) -> str:
         return cls.__name__
@@ -67,7 +242,7 @@ class Operator(ABC):
         for subclass in subclasses:
             subclasses.extend(subclass.all())
 
-        return list(filter(lambda sc: not sc.is_deprecated(), set(subclasses)))
+        return list(filter(lambda sc: not sc.is_deprecated() and not sc.is_internal(), set(subclasses)))
 
     @classmethod
     def _all(cls):
@@ -81,6 +256,11 @@ class Operator(ABC):
     def is_deprecated(cls) -> bool:
         return hasattr(cls, 'deprecated')
 
+    @classmethod
+    def is_internal(cls) -> bool:
+        # The operators that the engine makes by itself (e.g., for the plan of a query), which queries can't use.
+        return cls.__name__.startswith('_')
+
     def __str__(self):
         return f'{self.name()}({", ".join(str(self._get_args()))}'
 
@@ -5,6 +5,7 @@ from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types i
 from archive.archive_evaluator.paladin_dsl_semantics.const import Const
 from archive.archive_evaluator.paladin_dsl_semantics.operator import UniLateralOperator, Operator
 from archive.object_builder.object_builder import ObjectBuilder
+from ast_common.ast_common import compile_expression
 
 
 class _PureEvalOnce(UniLateralOperator):
@@ -17,4 +18,4 @@ class _PureEvalOnce(UniLateralOperator):
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None) -> EvalResult:
         return EvalResult(
-            [EvalResultEntry(0, [EvalResultPair(_PureEvalOnce.RESULT_KEY, eval(self.query, EVAL_BUILTIN_CLOSURE))])])
+            [EvalResultEntry(0, [EvalResultPair(_PureEvalOnce.RESULT_KEY, eval(compile_expression(self.query), EVAL_BUILTIN_CLOSURE))])])
@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, Dict, Callable
+from typing import Iterable, Optional, Dict, Callable, List
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult
 from archive.archive_evaluator.paladin_dsl_semantics.operator import BiLateralOperator, Operator
@@ -12,9 +12,9 @@ class Range(BiLateralOperator, TimeOperator):
         Range(o1, o2): Satisfies on each time in between the first satisfaction of o1 and the last satisfaction of o2.
     """
 
-    def __init__(self, times: Iterable[Time], first: Operator, second: Operator):
-        BiLateralOperator.__init__(self, times, first, second)
-        TimeOperator.__init__(self, times)
+    def __init__(self, times: Iterable[Time], first: Operator, second: Operator, parallel: bool = False):
+        BiLateralOperator.__init__(self, times, first, second, parallel)
+        TimeOperator.__init__(self, times, parallel)
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
@@ -27,6 +27,14 @@ class Range(BiLateralOperator, TimeOperator):
         if first_satisfaction < 0 or last_satisfaction < 0:
             return EvalResult.empty(self.times)
 
-        min_max_times = range(first_satisfaction, min(last_satisfaction + 1, self.times.stop))
+        return TimeOperator.create_time_eval_result(self.times, [range(first_satisfaction, last_satisfaction + 1)])
 
-        return EvalResult([TimeOperator.create_time_eval_result_entry(t, t in min_max_times) for t in self.times])
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        first, second = self.first.time_bounds(builder), self.second.time_bounds(builder)
+        if first is None or second is None:
+            return None
+
+        if not first or not second or first[0].start >= second[-1].stop:
+            return []
+
+        return [range(first[0].start, second[-1].stop)]
@@ -1,6 +1,6 @@
 import ast
-import concurrent.futures
-import os
+import builtins
+import math
 from typing import Optional, Iterable, Dict, Set, Collection, Union, List, Any, Callable, Tuple
 
 from archive.archive_evaluator.archive_evaluator import ArchiveEvaluator
@@ -12,7 +12,8 @@ from archive.archive_evaluator.paladin_dsl_semantics.operator import Operator
 from archive.archive_evaluator.paladin_dsl_semantics.selector_op import Selector
 from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import Time
 from archive.object_builder.object_builder import ObjectBuilder
-from ast_common.ast_common import str2ast, split_tuple
+from ast_common.ast_common import str2ast, split_tuple, compile_expression
+from utils.lru_cache import LRUCache
 
 
 class Raw(Operator, Selector):
@@ -21,7 +22,24 @@ class Raw(Operator, Selector):
                Can be used in an implied form. The expression can be any legal Python expression
                (including list/set/dict comprehensions).
 
+    The expression is evaluated once for each range of times in which the names it refers to stay the same, unless it
+    calls functions that might not be pure (e.g., print, or user aux functions, see _PURE_FUNCTIONS), which are called
+    in every time.
     """
+    pointwise = True
+
+    # The names, sub queries and called functions of each query (see _analyze), shared by all the Raws of the same
+    # query.
+    _analyzed: LRUCache = LRUCache(4096)
+
+    # The functions (without side effects) that are called once for each range of times in which their arguments stay
+    # the same. Any other function (e.g., print, or a user aux function) is called in every time.
+    _PURE_FUNCTIONS = frozenset({
+        'abs', 'all', 'any', 'ascii', 'bin', 'bool', 'bytes', 'callable', 'chr', 'complex', 'dict', 'divmod',
+        'enumerate', 'filter', 'float', 'format', 'frozenset', 'hasattr', 'hash', 'hex', 'int', 'isinstance',
+        'issubclass', 'len', 'list', 'map', 'max', 'min', 'oct', 'ord', 'pow', 'range', 'repr', 'reversed', 'round',
+        'set', 'slice', 'sorted', 'str', 'sum', 'tuple', 'type', 'zip'}) | frozenset(EVAL_BUILTIN_CLOSURE)
+    _BUILTINS = frozenset(vars(builtins))
 
     def __init__(self, query: str, line_no: Optional[LineNo] = -1, times: Optional[Iterable[Time]] = None,
                  parallel: bool = True):
@@ -31,42 +49,72 @@ class Raw(Operator, Selector):
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        # Extract names to resolve from the builder.
-        extractor = ArchiveEvaluator.SymbolExtractor()
-        extractor.visit(str2ast(self.query))
-
-        # Split query into sub queries.
-        queries = split_tuple(self.query)
-
-        # Check for a comprehension.
-        if any([isinstance(str2ast(self.query).value, t) for t in {ast.ListComp, ast.SetComp, ast.DictComp}]):
-            pass
-
-        return self._evaluate_raw_by_time(builder, extractor, queries, query_locals, user_aux)
+        names, queries, called = Raw._analyze(self.query)
+        per_time = bool(called) or (bool(user_aux) and not names.isdisjoint(user_aux))
+        return self._evaluate_raw_by_time(builder, names, queries, query_locals, user_aux, per_time)
 
-    def _evaluate_raw_by_time(self, builder, extractor, queries, query_locals, user_aux: Dict[str, Callable]):
-        def evaluate(t):
+    @staticmethod
+    def _analyze(query: str) -> Tuple[Set[str], List[str], Set[str]]:
+        """
+            The names to resolve from the builder for query (all the names it refers to), its sub queries (of a tuple),
+            and the names of the functions it calls (or passes on) that might not be pure.
+        """
+        analyzed = Raw._analyzed.get(query)
+        if analyzed is None:
+            query_ast = str2ast(query)
+            names = ArchiveEvaluator.SymbolExtractor().visit(query_ast).names
+            # The builtins might also be called by others (e.g., map(print, ...)).
+            called = ({node.func.id for node in ast.walk(query_ast) if isinstance(node, ast.Call) and
+                       isinstance(node.func, ast.Name)} | (names & Raw._BUILTINS)) - Raw._PURE_FUNCTIONS
+            analyzed = names, split_tuple(query_ast), called
+            Raw._analyzed.put(query, analyzed)
+
+        return analyzed
+
+    def _referred_names(self) -> Iterable[str]:
+        # The names of the analysis are all the names of the query (see ArchiveEvaluator.SymbolExtractor).
+        names, _, _ = Raw._analyze(self.query)
+        return names
+
+    def _evaluate_raw_by_time(self, builder, names, queries, query_locals, user_aux: Dict[str, Callable],
+                              per_time: bool = False):
+        def evaluate(t, validity):
             try:
-                result = self._evaluate_for_time(queries, builder, extractor, self.line_no, t, query_locals, user_aux)
+                return self._evaluate_for_time(queries, builder, names, self.line_no, t, query_locals, user_aux,
+                                               validity)
             except TimeoutError as e:
                 raise e
             except BaseException:
-                result = [None] * len(queries) if len(queries) > 1 else None
-            return self._create_evald_result(queries, result, t)
-
-        if self.parallel:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-                future_to_time = {executor.submit(evaluate, t): t for t in self.times}
-                results = [future.result() for future in concurrent.futures.as_completed(future_to_time)]
-        else:
-            results = [evaluate(t) for t in self.times]
-
-        return EvalResult(sorted(results, key=lambda e: e.time))
-
-    def _evaluate_for_time(self, queries, builder, extractor, line_no, t, query_locals, user_aux):
-        resolved_names = self._resolve_names(builder, extractor.names, line_no, t, query_locals, user_aux)
+                validity[0], validity[1] = t, t + 1
+                return [None] * len(queries) if len(queries) > 1 else None
+
+        def evaluate_times(times: List[Time]) -> List[Tuple[Time, Time, EvalResultEntry]]:
+            # The names of the query change only in a few times, so the query is evaluated once for each range of
+            # times in which its names stay the same, that makes a run of the result (or in every time, see per_time).
+            runs = []
+            valid_until, result = -math.inf, None
+            for t in times:
+                if t >= valid_until:
+                    validity = [-math.inf, math.inf]
+                    result = evaluate(t, validity)
+                    valid_until = validity[1] if not per_time else t + 1
+                    runs.append([t, t + 1, self._create_evald_result(queries, result, t)])
+                elif t == runs[-1][1]:
+                    runs[-1][1] += 1
+                else:
+                    # A gap in the times.
+                    runs.append([t, t + 1, self._create_evald_result(queries, result, t)])
+            return runs
+
+        return EvalResult.from_runs(self._map_chunks(evaluate_times, sorted(self.times)))
+
+    def _evaluate_for_time(self, queries, builder, names, line_no, t, query_locals, user_aux,
+                           validity: Optional[List[Time]] = None):
+        resolved_names = self._resolve_names(builder, names, line_no, t, query_locals, user_aux, validity)
+        # The globals are of this evaluation only, since the values of the query (e.g., lambdas) might refer to them.
+        scope = {**resolved_names, **EVAL_BUILTIN_CLOSURE}
         try:
-            result = eval(self.query, {**resolved_names, **EVAL_BUILTIN_CLOSURE})
+            result = eval(compile_expression(self.query), scope)
         except (IndexError, KeyError, NameError, AttributeError, TypeError):
             result = [None] * len(queries) if len(queries) > 1 else None
         return result
@@ -87,39 +135,47 @@ class Raw(Operator, Selector):
 
     @staticmethod
     def _resolve_names(builder: ObjectBuilder, names: Set[str], line_no: int, time: int,
-                       query_locals: Dict[str, EvalResult], user_aux: Dict[str, Callable]) -> ExpressionMapper:
+                       query_locals: Dict[str, EvalResult], user_aux: Dict[str, Callable],
+                       validity: Optional[List[Time]] = None) -> ExpressionMapper:
         """
             Resolves the values of the objects in names from the builder.
         :param names: A set of names to resolve.
         :param line_no: The line no in which to look for the scope of the object.
         :param time: The time in which the object's value should be resolved.
+        :param validity: If given, narrowed to the range of times [start, end) in which the resolved values stay the same.
         :return:
         """
-        resolved = {name: builder.build(name, time, line_no=line_no) for name in names}
+        if validity is None:
+            resolved = {name: builder.build(name, time, line_no=line_no) for name in names}
+        else:
+            resolved = {}
+            for name in names:
+                resolved[name], start, end = builder.build_with_validity(name, time, line_no=line_no)
+                validity[0], validity[1] = max(validity[0], start), min(validity[1], end)
         # Delete empty results (for names that couldn't be found).
         resolved = {name: resolved[name] for name in resolved if resolved[name] is not None}
 
         if query_locals:
             for name in query_locals:
                 if query_locals[name]:
-                    vals_for_name = sorted([e for e in query_locals[name] if e.time <= time], reverse=True,
-                                           key=lambda e: e.time)
-                    if vals_for_name:
-                        val = vals_for_name[0]
+                    val, change_time = query_locals[name].latest(time)
+                    if validity is not None:
+                        validity[1] = min(validity[1], change_time)
+                    if val is not None:
                         if Let.LET_BOUNDED_KEY in val:
                             res = val[Let.LET_BOUNDED_KEY].value
                         elif isinstance(val, EvalResultEntry):
                             if len(val.keys) == 0:
-                                res = EvalResultEntry.empty(time)
+                                res = Raw._empty(time, validity)
                             elif len(val.keys) > 1:
                                 # res = val.items_no_scope_signs
-                                res = val
+                                res = Raw._of_time(val, time, validity)
                             else:
                                 res = val.values[0]
                         else:
                             res = val
                     else:
-                        res = EvalResultEntry.empty(time)
+                        res = Raw._empty(time, validity)
                     resolved.update({name: res})
 
         if user_aux:
@@ -127,6 +183,17 @@ class Raw(Operator, Selector):
 
         return resolved
 
+    @staticmethod
+    def _empty(time: Time, validity: Optional[List[Time]]) -> EvalResultEntry:
+        return Raw._of_time(EvalResultEntry.empty(time), time, validity)
+
+    @staticmethod
+    def _of_time(entry: EvalResultEntry, time: Time, validity: Optional[List[Time]]) -> EvalResultEntry:
+        # The entry is of a specific time.
+        if validity is not None:
+            validity[0], validity[1] = max(validity[0], time), min(validity[1], time + 1)
+        return entry
+
     def _get_args(self) -> Collection['Operator']:
         return []
 
@@ -90,6 +90,80 @@ class SemanticsUtils(object):
     def get_first(times: Iterable[Time], res: EvalResult):
         return res[times[0]].values[0]
 
+    @staticmethod
+    def ranges_of_times(times: Iterable[Time]) -> List[range]:
+        """
+            The sorted, disjoint ranges that make up times.
+        """
+        if isinstance(times, range) and times.step == 1:
+            return [times] if times else []
+
+        ranges = []
+        for t in sorted(set(times)):
+            if ranges and ranges[-1].stop == t:
+                ranges[-1] = range(ranges[-1].start, t + 1)
+            else:
+                ranges.append(range(t, t + 1))
+
+        return ranges
+
+    @staticmethod
+    def intersect_ranges(r1: List[range], r2: List[range]) -> List[range]:
+        """
+            The intersection of two lists of sorted, disjoint ranges (see ranges_of_times).
+        """
+        ranges = []
+        i = j = 0
+        while i < len(r1) and j < len(r2):
+            start, stop = max(r1[i].start, r2[j].start), min(r1[i].stop, r2[j].stop)
+            if start < stop:
+                ranges.append(range(start, stop))
+
+            if r1[i].stop < r2[j].stop:
+                i += 1
+            else:
+                j += 1
+
+        return ranges
+
+    @staticmethod
+    def subtract_ranges(r1: List[range], r2: List[range]) -> List[range]:
+        """
+            The times of r1 that aren't in r2, where both are lists of sorted, disjoint ranges (see ranges_of_times).
+        """
+        ranges = []
+        j = 0
+        for r in r1:
+            start = r.start
+            while j < len(r2) and r2[j].stop <= start:
+                j += 1
+
+            k = j
+            while k < len(r2) and r2[k].start < r.stop:
+                if start < r2[k].start:
+                    ranges.append(range(start, r2[k].start))
+                start = max(start, r2[k].stop)
+                k += 1
+
+            if start < r.stop:
+                ranges.append(range(start, r.stop))
+
+        return ranges
+
+    @staticmethod
+    def unite_ranges(*ranges_lists: List[range]) -> List[range]:
+        """
+            The union of lists of ranges, as sorted, disjoint ranges (see ranges_of_times).
+        """
+        ranges = []
+        for r in sorted((r for rs in ranges_lists for r in rs if r), key=lambda r: r.start):
+            if ranges and r.start <= ranges[-1].stop:
+                ranges[-1] = range(ranges[-1].start, max(ranges[-1].stop, r.stop))
+            else:
+                ranges.append(r)
+
+        return ranges
+
 
 FALSE = lambda times: Const(False, times)
 TRUE = lambda times: Const(True, times)
@@ -5,6 +5,7 @@ from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types i
     EvalResultEntry, EvalResultPair, Time
 from archive.archive_evaluator.paladin_dsl_semantics.operator import Operator, BiLateralOperator, \
     VariadicLateralOperator, UniLateralOperator
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import SemanticsUtils
 from archive.object_builder.object_builder import ObjectBuilder
 
 
@@ -28,15 +29,36 @@ class TimeOperator(Operator, ABC):
         raise NotImplementedError()
 
     def _get_args(self) -> Collection['Operator']:
-        return [self.op]
+        # Time operators without operator arguments (e.g., InTime) have no op.
+        return [self.op] if hasattr(self, 'op') else []
 
     @staticmethod
     def create_time_eval_result_entry(t: Time, res: bool,
                                       rep: Optional[List[Replacement]] = None) -> EvalResultEntry:
         return EvalResultEntry(t, [EvalResultPair(TimeOperator.TIME_KEY, res)], rep if rep else [])
 
+    @staticmethod
+    def create_time_eval_result(times: Iterable[Time], satisfaction_ranges: List[range]) -> EvalResult:
+        """
+            The result in times of a time operator that is satisfied in satisfaction_ranges (sorted, disjoint ranges),
+            with a run for each range of times (rather than an entry for each time).
+        """
+        times = SemanticsUtils.ranges_of_times(times)
+        satisfaction_ranges = [r for r in satisfaction_ranges if r]
+        return EvalResult.from_runs(
+            [(r.start, r.stop, TimeOperator.create_time_eval_result_entry(r.start, True))
+             for r in SemanticsUtils.intersect_ranges(times, satisfaction_ranges)] +
+            [(r.start, r.stop, TimeOperator.create_time_eval_result_entry(r.start, False))
+             for r in SemanticsUtils.subtract_ranges(times, satisfaction_ranges)])
+
 
 class BiTimeOperator(BiLateralOperator, TimeOperator, ABC):
+    pointwise = True
+
+    # A result of the first operator that makes the result by itself whatever the second's is (e.g., False for And), so
+    # the second isn't evaluated if the first has it in all of its times.
+    short_circuit: Optional[bool] = None
+
     def __init__(self, times: Iterable[Time], first: Operator, second: Operator,
                  bi_result_maker: Callable[[bool, bool], bool], parallel: bool = False):
         BiLateralOperator.__init__(self, times, first, second, parallel)
@@ -46,23 +68,34 @@ class BiTimeOperator(BiLateralOperator, TimeOperator, ABC):
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
         first = TimeOperator.make(self.first).eval(builder, query_locals, user_aux)
-        second = TimeOperator.make(self.second).eval(builder, query_locals, user_aux)
+        if self.short_circuit is not None and \
+                all(bool(self._time_value(e)) == self.short_circuit for _, _, e in first.runs()):
+            return EvalResult.from_runs(
+                (start, end, TimeOperator.create_time_eval_result_entry(start, self._time_value(e), e.replacements))
+                for start, end, e in first.runs())
 
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(e1.time, self._make_res(e1, e2),
-                                                       e1.replacements + e2.replacements)
+        second = TimeOperator.make(self.second).eval(builder, query_locals, user_aux)
 
-            for e1, e2 in zip(first, second)])
+        return EvalResult.from_runs(
+            (start, end, TimeOperator.create_time_eval_result_entry(start, self._make_res(e1, e2),
+                                                                    e1.replacements + e2.replacements))
+            for start, end, e1, e2 in EvalResult.zip_runs(first, second))
 
     def _make_res(self, e1: EvalResultEntry, e2: EvalResultEntry) -> bool:
         return self.bi_result_maker(e1[TimeOperator.TIME_KEY].value, e2[TimeOperator.TIME_KEY].value)
 
+    @staticmethod
+    def _time_value(e: EvalResultEntry) -> Optional[bool]:
+        pair = e[TimeOperator.TIME_KEY]
+        return pair.value if pair is not None else None
+
 
 class Whenever(VariadicLateralOperator, TimeOperator):
     """
     Whenever(o): Convert any operator into a TimeOperator, by generating a result with a single output
                  of the satisfaction for each of o's entries.
     """
+    pointwise = True
 
     def __init__(self, times: Iterable[Time], *args: Operator):
         VariadicLateralOperator.__init__(self, times, *args)
@@ -73,10 +106,11 @@ class Whenever(VariadicLateralOperator, TimeOperator):
         evaled_args = list(map(lambda arg: arg.eval(builder, query_locals, user_aux), self.args))
         arg_results = list(map(lambda er: lambda t: er[t].satisfies(), evaled_args))
 
-        return EvalResult([
-            TimeOperator.create_time_eval_result_entry(t, all([arg_res(t) for arg_res in arg_results]), [])
-            for t in self.times
-        ])
+        return EvalResult.from_runs(
+            (start, end, TimeOperator.create_time_eval_result_entry(start, all([arg_res(start)
+                                                                                for arg_res in arg_results]), []))
+            for start, end in EvalResult.segments(self.times, *evaled_args)
+        )
 
 
 class FirstTime(UniLateralOperator, TimeOperator):
@@ -7,6 +7,7 @@ from archive.archive_evaluator.paladin_dsl_semantics import Raw
 from archive.archive_evaluator.paladin_dsl_semantics.operator import UniLateralOperator, Operator
 from archive.archive_evaluator.paladin_dsl_semantics.selector_op import Selector
 from archive.object_builder.object_builder import ObjectBuilder
+from ast_common.ast_common import compile_expression
 from common.common import ISP
 
 
@@ -40,7 +41,7 @@ class Type(UniLateralOperator, Selector):
     def get_type(self, builder: ObjectBuilder, query_locals, user_aux, e: str, t: Time) -> Optional[str]:
         # Try to evaluate in case that name is actually an expression.
         try:
-            return eval(f'type({e}).__name__', EVAL_BUILTIN_CLOSURE)
+            return eval(compile_expression(f'type({e}).__name__'), EVAL_BUILTIN_CLOSURE)
         except NameError:
             pass
 
@@ -1,6 +1,3 @@
-import concurrent.futures
-import os
-from functools import reduce
 from typing import Optional, Dict, Callable
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult
@@ -14,15 +11,12 @@ class Union(VariadicLateralOperator, AuxOp):
     Union(o1, ..., on): Joins any number of operators together.
                         The operator returns the union of all time stamps and outer join of all os' columns.
     """
+    pointwise = True
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-            # Submit evaluation tasks for each argument in self.args
-            futures = [executor.submit(arg.eval, builder, query_locals, user_aux) for arg in self.args]
+        # The results of the arguments, by their order.
+        results = self._map(lambda arg: arg.eval(builder, query_locals, user_aux), self.args, len(self.times))
 
-            # Collect the results of the evaluation
-            results = [future.result() for future in concurrent.futures.as_completed(futures)]
-
-        # Join the results using EvalResult.join
-        return reduce(lambda r1, r2: EvalResult.join(r1, r2), results, EvalResult.empty(self.times))
+        # Join the results all at once using EvalResult.join_all
+        return EvalResult.join_all([EvalResult.empty(self.times), *results])
@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, Dict, Callable
+from typing import Iterable, Optional, Dict, Callable, List
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult
 from archive.archive_evaluator.paladin_dsl_semantics.const import Const
@@ -14,14 +14,15 @@ class WhenPrinted(UniLateralOperator, TimeOperator):
     WhenPrinted(s): Satisfied for each time in which the program has printed s to its standard output.
     """
 
-    def __init__(self, times: Iterable[Time], output: Raw):
-        TimeOperator.__init__(self, times)
-        UniLateralOperator.__init__(self, times, Const(output.query, times))
+    def __init__(self, times: Iterable[Time], output: Raw, parallel: bool = False):
+        TimeOperator.__init__(self, times, parallel)
+        UniLateralOperator.__init__(self, times, Const(output.query if isinstance(output, Raw) else output, times),
+                                    parallel)
 
     def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
              user_aux: Optional[Dict[str, Callable]] = None):
-        str_to_search = self.first.eval(builder, query_locals, user_aux)[self.times[0]].values[0]
+        str_to_search = self.first.eval_const_value(builder, query_locals, user_aux)
+        return TimeOperator.create_time_eval_result(self.times, builder.get_print_times(str_to_search))
 
-        print_event_times = list(map(lambda r: r[1].time, builder.get_print_events(str_to_search)))
-
-        return EvalResult([TimeOperator.create_time_eval_result_entry(t, t in print_event_times) for t in self.times])
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        return builder.get_print_times(self.first.const)
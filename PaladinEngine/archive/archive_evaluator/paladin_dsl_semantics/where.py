@@ -21,9 +21,10 @@ class Where(BiLateralOperator, AuxOp):
 
         # Create a sparse results-list with the original time range.
         first_results = self.first.eval(builder, query_locals, user_aux)
+        first_times = set(self.first.times)
 
         return EvalResult(
-            [first_results[time] if time in self.first.times else EvalResultEntry.empty_with_keys(time, first_results[
+            [first_results[time] if time in first_times else EvalResultEntry.empty_with_keys(time, first_results[
                 time].keys)
              for time in self.times
              ]
@@ -0,0 +1,42 @@
+from typing import Iterable, Optional, Dict, Callable, List
+
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, Time
+from archive.archive_evaluator.paladin_dsl_semantics.operator import UniLateralOperator, Operator
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import SemanticsUtils
+from archive.archive_evaluator.paladin_dsl_semantics.time_operator import TimeOperator
+from archive.object_builder.object_builder import ObjectBuilder
+
+
+class _WithinBounds(UniLateralOperator, TimeOperator):
+    """
+        Satisfied for each time in bounds that satisfies o, which is evaluated only in the times in bounds
+        (see QueryPlanner).
+    """
+    pointwise = True
+
+    def __init__(self, times: Iterable[Time], first: Operator, bounds: List[range]):
+        UniLateralOperator.__init__(self, times, first)
+        TimeOperator.__init__(self, times)
+        self.bounds = bounds
+        self.update_times(times)
+
+    def eval(self, builder: ObjectBuilder, query_locals: Optional[Dict[str, EvalResult]] = None,
+             user_aux: Optional[Dict[str, Callable]] = None):
+        times = SemanticsUtils.ranges_of_times(self.times)
+
+        runs = [(r.start, r.stop, TimeOperator.create_time_eval_result_entry(r.start, False))
+                for r in SemanticsUtils.subtract_ranges(times, self.bounds)]
+        if SemanticsUtils.intersect_ranges(times, self.bounds):
+            runs.extend(TimeOperator.make(self.first).eval(builder, query_locals, user_aux).runs())
+
+        return EvalResult.from_runs(runs)
+
+    def time_bounds(self, builder: ObjectBuilder) -> Optional[List[range]]:
+        bounds = self.first.time_bounds(builder)
+        return self.bounds if bounds is None else SemanticsUtils.intersect_ranges(self.bounds, bounds)
+
+    def update_times(self, times) -> 'Operator':
+        self.times = times
+        self.first.update_times(SemanticsUtils.intersect_ranges(SemanticsUtils.ranges_of_times(self.times),
+                                                                self.bounds))
+        return self
@@ -1,15 +1,18 @@
 import ast
 import json
 import re
+import time
 import traceback
 from _ast import BinOp, AST
 from collections import deque
 from dataclasses import dataclass
+from pathlib import Path
 from typing import *  # DO NOT REMOVE!!!!
 
 from archive.archive import Archive
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, BAD_JSON_VALUES, \
     EVAL_BUILTIN_CLOSURE, BUILTIN_SPECIAL_FLOATS, Time, EvalResultEntry
+from archive.archive_evaluator.eval_scheduler import EvalScheduler, EvalMetrics
 from archive.archive_evaluator.paladin_dsl_config.paladin_dsl_config import FUNCTION_CALL_MAGIC
 from archive.archive_evaluator.paladin_dsl_semantics import Const, TimeOperator
 from archive.archive_evaluator.paladin_dsl_semantics.aux_op import AuxOp
@@ -21,12 +24,14 @@ from archive.archive_evaluator.paladin_dsl_semantics.raw import Raw
 from archive.archive_evaluator.paladin_dsl_semantics.selector_op import Selector
 from archive.archive_evaluator.paladin_dsl_semantics.summary_op import SummaryOp
 from archive.archive_evaluator.paladin_dsl_semantics.type_op import Type as TypeOp
+from archive.archive_evaluator.query_planner import QueryPlanner
 from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
 from archive.object_builder.object_builder import ObjectBuilder
-from ast_common.ast_common import ast2str, str2ast, is_tuple, split_tuple
+from ast_common.ast_common import ast2str, str2ast, is_tuple, split_tuple, compile_expression
 from common.attributed_dict import AttributedDict
 from finders.finders import GenericFinder, StubEntry, ContainerFinder
 from stubbers.stubbers import Stubber
+from utils.lru_cache import LRUCache
 
 
 class PaladinNativeParser(object):
@@ -38,14 +43,29 @@ class PaladinNativeParser(object):
     _FUNCTION_CALL_MAGIC_REPLACE_SYMBOL = '__FC_RET_VAL__'
     _COMPREHENSION_MAGIC_REPLACE_SYMBOL = '__COMP_SYMBOL__'
 
+    DEFAULT_RESULTS_CACHE_SIZE = 256
+
     def __init__(self, archive: Archive, object_builder_type: Type = DiffObjectBuilder,
-                 should_time_builder_construction: bool = False, parallel: bool = True):
+                 should_time_builder_construction: bool = False, parallel: Union[bool, int] = True,
+                 results_cache_size: Optional[int] = DEFAULT_RESULTS_CACHE_SIZE):
         self.archive: Archive = archive
         self._line_no: int = -1
         self.builder: ObjectBuilder = object_builder_type(archive, should_time_builder_construction)
         self.construction_time = self.builder.construction_time
         self.user_aux: Dict[str, Any] = {}
+        # True for a worker for each CPU, or the number of workers (see EvalScheduler).
         self.parallel = parallel
+        self.scheduler: EvalScheduler = EvalScheduler.create(parallel, self.builder)
+        # The results of the operators that have been evaluated, by their signatures (see Operator.use_results_cache).
+        self.results_cache: Optional[LRUCache] = LRUCache(results_cache_size) if results_cache_size != 0 else None
+        self._results_cache_records: Optional[Tuple[object, int]] = None
+
+    @classmethod
+    def from_trace(cls, trace_path: Union[str, Path], **kwargs) -> 'PaladinNativeParser':
+        """
+            Create a parser over the records of a trace file (see Archive.from_trace).
+        """
+        return cls(Archive.from_trace(trace_path), **kwargs)
 
     class HasOperatorVisitor(ast.NodeVisitor):
         def visit(self, node: ast.AST):
@@ -399,6 +419,12 @@ class PaladinNativeParser(object):
                 if isinstance(o, range):
                     return str(o)
 
+                if isinstance(o, EvalResult):
+                    return list(o)
+
+                if isinstance(o, EvalResultEntry):
+                    return o.as_dict()
+
                 return super().default(o)
 
             def iterencode(_self, o: Any, _one_shot=False) -> Iterator[str]:
@@ -429,69 +455,177 @@ class PaladinNativeParser(object):
 
     def parse(self, query: str, start_time: int, end_time: int, jsonify: bool = True) -> Union[str, EvalResult]:
         try:
-            times = range(start_time, end_time + 1)
+            results = self.evaluate(query, start_time, end_time)
+            if not jsonify:
+                return results if results is not None else EvalResult.empty(range(start_time, end_time + 1))
 
-            # Handle function call magic symbols.
-            query = PaladinNativeParser.__replace_function_call_magic(query)
+            return self.to_json(results, range(start_time, end_time + 1))
 
-            # Handle special syntax.
-            query = PaladinNativeParser.__handle_special_syntax(query)
+        except BaseException as e:
+            traceback.print_exc()
+            if jsonify:
+                return PaladinNativeParser.error_json(e)
 
-            query_ast = str2ast(query.strip().replace('\n', ' '))
+            raise e
 
-            # Propagate line numbers indicated by "@" scope.
-            line_no_replacer = PaladinNativeParser.LineNumberReplacer()
-            line_no_replacer.visit(query_ast)
+    def evaluate(self, query: str, start_time: int, end_time: int) -> Optional[EvalResult]:
+        """
+            Evaluate query in the times [start_time, end_time] (None if the query has no results).
+            The work of the scheduler in evaluating it is kept in metrics.
+        """
+        self.scheduler.metrics = metrics = EvalMetrics()
+        evaluation_start = time.monotonic()
+        try:
+            return self._evaluate(query, start_time, end_time)
+        finally:
+            metrics.wall_time = time.monotonic() - evaluation_start
 
-            # Replace calling to operator with lambdas.
-            visitor = PaladinNativeParser.OperatorLambdaReplacer(times, parallel=self.parallel)
-            query_ast = visitor.visit(query_ast)
+    @property
+    def metrics(self) -> EvalMetrics:
+        """
+            The metrics of evaluating the last query of the current thread (see evaluate).
+        """
+        return self.scheduler.metrics
 
-            # Evaluate operators.
-            operator_results = self._eval_operators(visitor)
+    def explain(self, query: str, start_time: int, end_time: int) -> str:
+        """
+            The plan of evaluating query in the times [start_time, end_time] (see QueryPlanner), without evaluating it.
+        """
+        query_ast, visitor, planner = self._plan(query, start_time, end_time)
+        return planner.explain(visitor.operators, query_ast)
 
-            # Evaluate the query.
-            query_result = eval(ast2str(query_ast), operator_results)
+    def _plan(self, query: str, start_time: int, end_time: int) -> \
+            Tuple[ast.AST, 'PaladinNativeParser.OperatorLambdaReplacer', QueryPlanner]:
+        times = range(start_time, end_time + 1)
 
-            if isinstance(query_result, EvalResult):
-                query, results = PaladinNativeParser._restore_original_operator_keys(query_ast, visitor, query_result)
+        query_ast = PaladinNativeParser._query_ast(query)
 
-            elif not query_result:
-                if jsonify:
-                    return self.json_dumps(EvalResult.empty(times))
-                return EvalResult.empty(times)
+        # Replace calling to operator with lambdas.
+        visitor = PaladinNativeParser.OperatorLambdaReplacer(times, parallel=self.parallel)
+        query_ast = visitor.visit(query_ast)
 
-            results = EvalResult(results)
-            if not jsonify:
-                return results
+        # Narrow the times of the operators by each other.
+        planner = QueryPlanner(self.builder)
+        planner.plan(visitor.operators, query_ast)
 
-            grouped = results.group()
+        return query_ast, visitor, planner
 
-            # Add the keys in the first row.
-            # noinspection PyTypeChecker
-            grouped['keys'] = list(results.all_keys())
+    def _evaluate(self, query: str, start_time: int, end_time: int) -> Optional[EvalResult]:
+        query_ast, visitor, _ = self._plan(query, start_time, end_time)
 
-            # Remove bad JSON values.
-            return self.json_dumps(grouped)
+        # Evaluate operators.
+        operator_results = self._eval_operators(visitor)
 
-        except BaseException as e:
-            traceback.print_exc()
-            if jsonify:
-                return json.dumps(
-                    {'error': 'Syntax Error: ' + (str(e.msg) if e.msg else '') if isinstance(e,
-                                                                                             SyntaxError) else 'Internal Error'})
+        # Evaluate the query.
+        query_result = eval(compile_expression(ast2str(query_ast)), operator_results)
 
-            raise e
+        if isinstance(query_result, EvalResult):
+            query, results = PaladinNativeParser._restore_original_operator_keys(query_ast, visitor, query_result)
+
+        elif not query_result:
+            return None
+
+        return EvalResult(results)
+
+    def to_json(self, results: Optional[EvalResult], times: Iterable[Time]) -> str:
+        """
+            The JSON of the results of a query in times (see evaluate).
+        """
+        if results is None:
+            return self.json_dumps(EvalResult.empty(times))
+
+        grouped = results.group()
+
+        # Add the keys in the first row.
+        # noinspection PyTypeChecker
+        grouped['keys'] = list(results.all_keys())
+
+        # Remove bad JSON values.
+        return self.json_dumps(grouped)
+
+    @staticmethod
+    def error_json(e: BaseException) -> str:
+        return json.dumps({'error': 'Syntax Error: ' + (str(e.msg) if e.msg else '') if isinstance(e, SyntaxError)
+                           else 'Internal Error'})
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+            A canonical form of query (e.g., without redundant spaces), which is the same for queries that are the same.
+            A query that can't be parsed is its own form.
+        """
+        try:
+            return ast2str(str2ast(PaladinNativeParser._preprocess(query)))
+        except (SyntaxError, RuntimeError):
+            return query
+
+    def is_pointwise(self, query: str) -> bool:
+        """
+            Whether the results of query in each time depend only on that time (see Operator.pointwise), so its results
+            in a range of times are the results in any wider range, sliced.
+        """
+        try:
+            visitor = PaladinNativeParser.OperatorLambdaReplacer(range(0), parallel=self.parallel)
+            visitor.visit(PaladinNativeParser._query_ast(query))
+        except (SyntaxError, RuntimeError):
+            return False
+
+        return all(operator.is_pointwise() for operator, _ in visitor.operators.values())
+
+    @staticmethod
+    def _preprocess(query: str) -> str:
+        # Handle function call magic symbols.
+        query = PaladinNativeParser.__replace_function_call_magic(query)
+
+        # Handle special syntax.
+        query = PaladinNativeParser.__handle_special_syntax(query)
+
+        return query.strip().replace('\n', ' ')
+
+    @staticmethod
+    def _query_ast(query: str) -> ast.AST:
+        query_ast = str2ast(PaladinNativeParser._preprocess(query))
+
+        # Propagate line numbers indicated by "@" scope.
+        line_no_replacer = PaladinNativeParser.LineNumberReplacer()
+        line_no_replacer.visit(query_ast)
+
+        return query_ast
 
     def add_user_aux(self, f_content: str | bytes):
         exec(f_content, self.user_aux)
+        self.clear_results_cache()
 
     def remove_user_aux(self):
         self.user_aux.clear()
+        self.clear_results_cache()
+
+    def clear_results_cache(self):
+        if self.results_cache is not None:
+            self.results_cache.clear()
+
+    def _validate_results_cache(self):
+        """
+            Clear the cached results if records have been added to the archive (or its records have been replaced) since
+            they were cached.
+        """
+        records = self.archive.records
+        if self._results_cache_records is None or self._results_cache_records[0] is not records or \
+                self._results_cache_records[1] != len(records):
+            self.clear_results_cache()
+            self._results_cache_records = records, len(records)
 
     def _eval_operators(self, visitor):
+        self._validate_results_cache()
+
+        if self.scheduler.can_fork:
+            # The names are constructed once, rather than by each of the workers.
+            self.builder.prepare({name for operator, _ in visitor.operators.values() for op in operator._operators()
+                                  for name in op._referred_names()})
+
         operator_results = {}
         for var_name, (operator, operator_original_name) in visitor.operators.items():
+            operator.use_results_cache(self.results_cache).use_scheduler(self.scheduler)
             if operator.standalone:
                 eval_result = operator.eval(self.builder, operator_results, self.user_aux)
                 if is_tuple(var_name):
@@ -0,0 +1,133 @@
+import ast
+import copy
+from typing import Dict, Tuple, List, Optional, Set, Iterable
+
+from archive.archive_evaluator.paladin_dsl_semantics import And, Const, Raw
+from archive.archive_evaluator.paladin_dsl_semantics.operator import Operator
+from archive.archive_evaluator.paladin_dsl_semantics.semantic_utils import SemanticsUtils
+from archive.archive_evaluator.paladin_dsl_semantics.within_bounds import _WithinBounds
+from archive.object_builder.object_builder import ObjectBuilder
+from ast_common.ast_common import ast2str
+
+
+class QueryPlanner(object):
+    """
+        Rewrites the operators of a query before they are evaluated, by the time bounds of its time operators that are
+        found without evaluating them (see Operator.time_bounds), e.g., the times in which a line has been hit:
+        - A side of an And is evaluated only in the bounds of the other side (out of which the And isn't satisfied
+          anyway), if its results in each time don't depend on its other times (see Operator.pointwise).
+        - A side of an And isn't evaluated at all if the other side is never satisfied in the times of the And.
+        - An operator that is a part of another one, and isn't referred by its name, isn't evaluated by itself.
+        The steps of the plan are kept for explaining it (see explain).
+    """
+
+    def __init__(self, builder: ObjectBuilder):
+        self.builder = builder
+        self.steps: List[str] = []
+
+    def plan(self, operators: Dict[str, Tuple[Operator, str]], query_ast: ast.AST) -> None:
+        """
+            Rewrite operators (the operators of query_ast by their vars, see OperatorLambdaReplacer) in place.
+        """
+        self._evaluate_standalone_only_if_referred(operators, query_ast)
+
+        # The inner operators are planned first, so an operator that is evaluated only in some of the times is planned
+        # with the plans of the operators in it.
+        ands = {id(op): op for operator, _ in operators.values() for op in reversed(list(operator._operators()))
+                if isinstance(op, And)}
+        for op in ands.values():
+            self._plan_and(op)
+
+    def explain(self, operators: Dict[str, Tuple[Operator, str]], query_ast: ast.AST) -> str:
+        """
+            The plan of query_ast: the steps of the planner and the operators that are evaluated, with their times.
+        """
+        lines = [f'Query: {ast2str(query_ast)}', 'Plan:']
+        if self.steps:
+            lines.extend(f'  - {step}' for step in self.steps)
+        else:
+            lines.append('  (as is)')
+
+        lines.append('Operators:')
+        for var_name, (operator, original) in operators.items():
+            if operator.standalone:
+                lines.append(f'  {var_name} = {original}')
+                lines.extend(QueryPlanner._describe(operator, 2))
+
+        return '\n'.join(lines)
+
+    def _evaluate_standalone_only_if_referred(self, operators: Dict[str, Tuple[Operator, str]],
+                                              query_ast: ast.AST) -> None:
+        inner = {id(op) for operator, _ in operators.values() for op in list(operator._operators())[1:]}
+        referred = QueryPlanner._referred_names(operators, query_ast)
+        for var_name, (operator, original) in operators.items():
+            if operator.standalone and id(operator) in inner and var_name not in referred:
+                operator.standalone = False
+                self.steps.append(f'{original} is evaluated only as a part of the operators it is in')
+
+    @staticmethod
+    def _referred_names(operators: Dict[str, Tuple[Operator, str]], query_ast: ast.AST) -> Set[str]:
+        names = {node.id for node in ast.walk(query_ast) if isinstance(node, ast.Name)}
+        for operator, _ in operators.values():
+            for op in operator._operators():
+                names.update(op._referred_names())
+
+        return names
+
+    def _plan_and(self, op: And) -> None:
+        times = SemanticsUtils.ranges_of_times(op.times)
+        first_bounds, second_bounds = (self._bounds(side, times) for side in (op.first, op.second))
+        if (first_bounds is None) == (second_bounds is None):
+            return
+
+        bounds, side_name = (first_bounds, 'second') if first_bounds is not None else (second_bounds, 'first')
+        side = getattr(op, side_name)
+        if bounds == times:
+            return
+
+        if not bounds:
+            self.steps.append(f'{QueryPlanner._name(side)} is not evaluated, as the other side of {op.name()} is never '
+                              f'satisfied in {QueryPlanner._format_ranges(times)}')
+        elif side.is_pointwise():
+            self.steps.append(f'{QueryPlanner._name(side)} is evaluated only in {QueryPlanner._format_ranges(bounds)}, '
+                              f'in which the other side of {op.name()} might be satisfied')
+        else:
+            return
+
+        # The side might be a part of other operators as well, so it's copied rather than changed.
+        setattr(op, side_name, _WithinBounds(op.times, copy.deepcopy(side), bounds))
+
+    def _bounds(self, op: Operator, times: List[range]) -> Optional[List[range]]:
+        bounds = op.time_bounds(self.builder)
+        return SemanticsUtils.intersect_ranges(times, bounds) if bounds is not None else None
+
+    @staticmethod
+    def _describe(op: Operator, indent: int) -> Iterable[str]:
+        bounds = f' within {QueryPlanner._format_ranges(op.bounds)}' if isinstance(op, _WithinBounds) else ''
+        times = QueryPlanner._format_ranges(SemanticsUtils.ranges_of_times(op.times))
+        yield f'{"  " * indent}{QueryPlanner._name(op)} @ {times}{bounds}'
+        try:
+            args = op._get_args()
+        except NotImplementedError:
+            args = []
+
+        for arg in args:
+            if isinstance(arg, Operator):
+                yield from QueryPlanner._describe(arg, indent + 1)
+
+    @staticmethod
+    def _name(op: Operator) -> str:
+        if isinstance(op, Raw):
+            return f'{op.name()}({op.query})'
+
+        if isinstance(op, Const):
+            return f'{op.name()}({op.const!r})'
+
+        return op.name()
+
+    @staticmethod
+    def _format_ranges(ranges: List[range]) -> str:
+        if not ranges:
+            return '[]'
+
+        return '[' + ', '.join(str(r.start) if len(r) == 1 else f'{r.start}-{r.stop - 1}' for r in ranges) + ']'
@@ -0,0 +1,119 @@
+import math
+from bisect import bisect_right
+from typing import *
+
+from archive.archive import Archive
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, Identifier
+from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
+
+# A change of an object: (field, value, type, kind).
+Change = Tuple[Identifier, Any, Type, Archive.Record.StoreKind]
+
+
+class CheckpointObjectBuilder(DiffObjectBuilder):
+    """
+        An object builder that keeps a full state of each object once every K of its changes (a checkpoint),
+        and the changes themselves. The state of an object in some time is built by replaying its changes
+        from the closest checkpoint before that time, so building a state replays no more than K - 1 changes.
+        K is either given or derived from a memory budget for the checkpoints of the whole trace.
+    """
+
+    # An estimate of the memory that a checkpoint takes (in bytes).
+    CHECKPOINT_SIZE = 1024
+    DEFAULT_MEMORY_BUDGET = 64 * 1024 * 1024
+
+    class _ObjectTimeline(object):
+        """
+            The states of an object along the time, with the interface of a RangeDict (as used by DiffObjectBuilder).
+        """
+
+        def __init__(self, max_time: Time, checkpoint_interval: int):
+            self.max_time = max_time
+            self._checkpoint_interval = checkpoint_interval
+            self._times: List[Time] = []
+            self._changes: List[Change] = []
+            self._checkpoints: List[Any] = []
+            self._last: Any = None
+
+        def add(self, t: Time, change: Change, state: Any) -> None:
+            if len(self._times) % self._checkpoint_interval == 0:
+                self._checkpoints.append(state)
+
+            self._times.append(t)
+            self._changes.append(change)
+            self._last = state
+
+        def _state(self, index: int) -> Any:
+            checkpoint = index // self._checkpoint_interval
+            state = self._checkpoints[checkpoint]
+            for i in range(checkpoint * self._checkpoint_interval + 1, index + 1):
+                state = DiffObjectBuilder._update_value(state, *self._changes[i])
+
+            return state
+
+        def __getitem__(self, t: Time) -> Any:
+            if t < 0 or t >= self.max_time:
+                raise ValueError("Key must be within the range [0, max_time)")
+
+            index = bisect_right(self._times, t) - 1
+            return self._state(index) if index >= 0 else None
+
+        def __contains__(self, t: Time) -> bool:
+            return bool(self._times) and self._times[0] <= t < self.max_time
+
+        @property
+        def first_time(self) -> Time:
+            return self._times[0] if self._times else -1
+
+        @property
+        def last_time(self) -> Time:
+            return self._times[-1] if self._times else -1
+
+        def get_last(self) -> Any:
+            return self._last
+
+        def ranges(self) -> List[Tuple[Time, Time, Any]]:
+            ends = self._times[1:] + [self.max_time]
+            return [(start, end, self._state(i)) for i, (start, end) in enumerate(zip(self._times, ends))
+                    if start != end]
+
+        def edges(self) -> List[Tuple[Time, Time]]:
+            return [(start, end) for start, end, _ in self.ranges()]
+
+        @property
+        def first_range_start(self) -> Optional[Time]:
+            return self._times[0] if self._times else None
+
+        def get_range(self, t: Time) -> Optional[Tuple[Time, Time]]:
+            if t < 0 or t >= self.max_time:
+                return None
+
+            i = bisect_right(self._times, t)
+            return self._times[i - 1] if i > 0 else 0, self._times[i] if i < len(self._times) else self.max_time
+
+        def get_closest(self, t: Time) -> Tuple[Optional[Any], Optional[Time]]:
+            if t < 0 or t >= self.max_time or not self._times or self._times[0] > t:
+                return None, None
+
+            return self[self._times[0]], self._times[0]
+
+        def __repr__(self) -> str:
+            return f'{self.__class__.__name__}({dict(zip(self._times, self._changes))})'
+
+    def __init__(self, archive: Archive, should_time_construction: bool = False,
+                 checkpoint_interval: Optional[int] = None, memory_budget: int = DEFAULT_MEMORY_BUDGET,
+                 build_cache_size: Optional[int] = DiffObjectBuilder.DEFAULT_BUILD_CACHE_SIZE):
+        if checkpoint_interval is None:
+            # Spread the checkpoints of all the records of the archive in the memory budget.
+            checkpoint_interval = math.ceil(len(archive.records) * CheckpointObjectBuilder.CHECKPOINT_SIZE /
+                                            memory_budget)
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        super().__init__(archive, should_time_construction, build_cache_size)
+
+    def _new_object_data(self) -> 'CheckpointObjectBuilder._ObjectTimeline':
+        return CheckpointObjectBuilder._ObjectTimeline(self.archive.last_time, self.checkpoint_interval)
+
+    def _add_change(self, object_data: 'CheckpointObjectBuilder._ObjectTimeline', t: Time, field: Identifier,
+                    value: Any, _type: Type, kind: Archive.Record.StoreKind) -> None:
+        change = (field, value, _type, kind)
+        object_data.add(t, change, DiffObjectBuilder._update_value(object_data.get_last(), *change))
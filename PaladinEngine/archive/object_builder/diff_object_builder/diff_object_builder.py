@@ -1,4 +1,4 @@
-import copy
+import math
 import sys
 from abc import ABC
 from enum import Enum
@@ -15,6 +15,8 @@ from builtin_manipulation_calls.builtin_manipulation_calls import BuiltinCollect
     EMPTY_COLLECTION
 from common.common import ISP
 from stubs.stubs import __AS__, __BMFCS__, __FC__
+from utils.lru_cache import LRUCache
+from utils.persistent_map import PersistentMap
 from utils.range_dict import RangeDict
 
 NAMED_COLLECTION_DATA_TYPE = Dict[str, Dict[LineNo, Scope]]
@@ -23,6 +25,10 @@ NAMED_COLLECTION_DATA_TYPE = Dict[str, Dict[LineNo, Scope]]
 class DiffObjectBuilder(ObjectBuilder):
     ObjectEntry = Tuple[Type, Any]
 
+    # The stubs of the records that objects are built from, and the kinds of the records that are named.
+    STUB_NAMES = (__AS__.__name__, __BMFCS__.__name__, __FC__.__name__)
+    NAMED_KINDS = {Archive.Record.StoreKind.VAR, Archive.Record.StoreKind.FUNCTION_CALL}
+
     class _ComparableField(ABC):
         def __init__(self, value: Any):
             self.value = value
@@ -93,15 +99,129 @@ class DiffObjectBuilder(ObjectBuilder):
         def __hash__(self) -> int:
             return hash(hash(self.field_type) + hash(self.field) + hash(self.value_type) + hash(self.value))
 
+    class _ObjectState(Mapping):
+        """
+            The state of an object at some time: a mapping between its fields ((type, field) keys) and their values.
+            A state is created from the previous state of the object by a single change, and shares all the fields
+            that haven't been changed with it, so the memory of an object's states is proportional to its changes.
+            The field that has been changed is presented (wrapped) as a _Field, and function calls are presented
+            only in the state that has been created by them.
+        """
+        # An entry is a (seq, key, value) tuple, where seq is the order of the entry's insertion.
+        Entry = Tuple[int, Tuple[Any, Any], Any]
+
+        __slots__ = ('_entries', '_count', '_next_seq', '_changed', '_function_call')
+
+        def __init__(self, entries: PersistentMap = PersistentMap(), count: int = 0, next_seq: int = 0,
+                     changed: Optional[Tuple[int, Tuple[Any, Any]]] = None,
+                     function_call: Optional['DiffObjectBuilder._ObjectState.Entry'] = None):
+            # A mapping between a field and the entries whose field is equal to it (see: _field_of).
+            self._entries: PersistentMap = entries
+            self._count = count
+            self._next_seq = next_seq
+            # The seq of the changed entry and its (wrapped) key.
+            self._changed = changed
+            self._function_call = function_call
+
+        @staticmethod
+        def _field_of(key: Tuple[Any, Any]) -> Any:
+            _, field = key
+            if isinstance(field, DiffObjectBuilder._Field):
+                return field.value
+
+            if isinstance(field, DiffObjectBuilder._DictKeyResolve):
+                # Dict keys that should be resolved are compared with fields by their values.
+                return field.value
+
+            return field
+
+        @staticmethod
+        def _same_key(k1: Tuple[Any, Any], k2: Tuple[Any, Any]) -> bool:
+            return k1 is k2 or (hash(k1) == hash(k2) and k1 == k2)
+
+        def cleared(self, field: Any) -> 'DiffObjectBuilder._ObjectState':
+            """
+                The state without the changes' marks, the function calls and the entries of a field.
+            """
+            entries, count = self._entries, self._count
+            if field in entries:
+                slot = tuple(e for e in entries[field] if e[1][1] != field)
+                count -= len(entries[field]) - len(slot)
+                entries = entries.set(field, slot) if slot else entries.delete(field)
+
+            return DiffObjectBuilder._ObjectState(entries, count, self._next_seq)
+
+        def with_entry(self, key: Tuple[Any, Any], value: Any,
+                       changed_key: Optional[Tuple[Any, Any]] = None) -> 'DiffObjectBuilder._ObjectState':
+            """
+                A new state with an entry for key (that is presented by changed_key in the new state only).
+            """
+            field = DiffObjectBuilder._ObjectState._field_of(key)
+            slot = self._entries.get(field, ())
+            for i, (s, k, _) in enumerate(slot):
+                if DiffObjectBuilder._ObjectState._same_key(k, key):
+                    # As in a dict, the entry keeps its key and its place.
+                    slot = slot[:i] + ((s, k, value),) + slot[i + 1:]
+                    return DiffObjectBuilder._ObjectState(self._entries.set(field, slot), self._count,
+                                                          self._next_seq + 1)
+
+            entry = (seq := self._next_seq, key, value)
+            return DiffObjectBuilder._ObjectState(self._entries.set(field, slot + (entry,)), self._count + 1, seq + 1,
+                                                  (seq, changed_key) if changed_key is not None else None)
+
+        def with_function_call(self, key: Tuple[Any, Any], value: Any) -> 'DiffObjectBuilder._ObjectState':
+            return DiffObjectBuilder._ObjectState(self._entries, self._count, self._next_seq + 1, None,
+                                                  (self._next_seq, key, value))
+
+        def _sorted_entries(self) -> List['DiffObjectBuilder._ObjectState.Entry']:
+            entries = sorted((e for slot in self._entries.values() for e in slot), key=lambda e: e[0])
+            if self._changed is not None:
+                seq, changed_key = self._changed
+                entries = [(s, changed_key, v) if s == seq else (s, k, v) for s, k, v in entries]
+            if self._function_call is not None:
+                entries.append(self._function_call)
+            return entries
+
+        def __getitem__(self, key: Tuple[Any, Any]) -> Any:
+            same_key = DiffObjectBuilder._ObjectState._same_key
+            if self._function_call is not None and same_key(self._function_call[1], key):
+                return self._function_call[2]
+
+            for _, k, v in self._entries.get(DiffObjectBuilder._ObjectState._field_of(key), ()):
+                if same_key(k, key):
+                    return v
+
+            raise KeyError(key)
+
+        def __iter__(self) -> Iterator[Tuple[Any, Any]]:
+            return (k for _, k, _ in self._sorted_entries())
+
+        def items(self) -> List[Tuple[Tuple[Any, Any], Any]]:
+            return [(k, v) for _, k, v in self._sorted_entries()]
+
+        def __len__(self) -> int:
+            return self._count + (self._function_call is not None)
+
+        def __repr__(self) -> str:
+            return repr(dict(self.items()))
+
     class _Mode(Enum):
         FIRST = 0
         CLOSEST = 1
         EXACT = 2
 
-    def __init__(self, archive: Archive, should_time_construction: bool = False):
+    # The number of built objects that are kept for future references.
+    DEFAULT_BUILD_CACHE_SIZE = 4096
+
+    def __init__(self, archive: Archive, should_time_construction: bool = False,
+                 build_cache_size: Optional[int] = DEFAULT_BUILD_CACHE_SIZE):
         ObjectBuilder.__init__(self, archive, should_time_construction)
         self._data: Dict[ObjectId, RangeDict] = {}
-        self._built_objects: Dict[Tuple[ObjectId, Time], Any] = {}
+        # Built objects, by (object_id, the start of the version of the object), with the range of times in which
+        # the built object (including the objects it refers to) stays the same: (start, end, built object).
+        self.build_cache = LRUCache(build_cache_size)
+        # The work of the builder since it has been taken, when it's tracked (see ObjectBuilder.track_work).
+        self._work: Optional[Dict[str, list]] = None
         self._named_primitives: NAMED_COLLECTION_DATA_TYPE = {}
         self._named_objects: NAMED_COLLECTION_DATA_TYPE = {}
         self._scopes: Dict[LineNo, Scope] = {}
@@ -109,29 +229,51 @@ class DiffObjectBuilder(ObjectBuilder):
         self._construct()
 
     def build(self, item: Identifier, time: Time, _type: Type = Any, line_no: Optional[LineNo] = -1) -> Any:
+        return self._build(item, time, _type, line_no)
+
+    def build_with_validity(self, item: Identifier, time: Time, _type: Type = Any,
+                            line_no: Optional[LineNo] = -1) -> Tuple[Any, Time, Time]:
+        validity = [-math.inf, math.inf]
+        built_object = self._build(item, time, _type, line_no, validity)
+        return built_object, validity[0], validity[1]
+
+    def _build(self, item: Identifier, time: Time, _type: Type = Any, line_no: Optional[LineNo] = -1,
+               validity: Optional[List[Time]] = None) -> Any:
+        """
+            Build item in time. validity, if given, is narrowed to the times in which the built item stays the same.
+        """
         if isinstance(item, str):
             try:
                 object_type, object_id, obj_data = self._get_data_from_named(item, DiffObjectBuilder._Mode.CLOSEST,
-                                                                             time,
-                                                                             line_no)
+                                                                             time, line_no, validity)
                 if ISP(object_type) or object_type is NoneType:
                     return obj_data
             except BaseException as e:
+                DiffObjectBuilder.__narrow(validity, time, time + 1)
                 return None
         else:
             # If the object asked to be built is a primitive, or it's not an object in the data
             # if ISP(_type) or item not in self._data:
-            if ISP(_type) or BuiltinCollectionsUtils.is_builtin_collection(item) or item not in self._data:
+            if ISP(_type) or BuiltinCollectionsUtils.is_builtin_collection(item) or \
+                    (obj_data := self._get_object_data(item)) is None:
                 return item
 
-            object_type, object_id, obj_data = _type, item, self._data[item]
+            object_type, object_id = _type, item
 
-        # If the object has been already built for time, return it.
-        if (object_id, time) in self._built_objects:
-            return self._built_objects[object_id, time]
+        # The object's state doesn't change during its version, so if the object has been already built in its
+        # version (and the objects it refers to haven't changed), return it.
+        version = obj_data.get_range(time)
+        if version is None:
+            version = time, time + 1
+        cache_key = object_id, version[0]
+        if (cached := self.build_cache.get(cache_key)) is not None and cached[0] <= time < cached[1]:
+            DiffObjectBuilder.__narrow(validity, cached[0], cached[1])
+            return cached[2]
 
+        object_validity = list(version)
         object_data = self.__get_latest_object_data(obj_data, time, object_type)
         if not object_data:
+            DiffObjectBuilder.__narrow(validity, *object_validity)
             return None
 
         try:
@@ -141,10 +283,36 @@ class DiffObjectBuilder(ObjectBuilder):
             pass
 
         # Build an object and store it for future references.
-        built_object = self._built_objects[(object_id, time)] = self._build_object(line_no, object_data, object_type,
-                                                                                   time)
+        built_object = self._build_object(line_no, object_data, object_type, time, object_validity)
+        self.build_cache.put(cache_key, (*object_validity, built_object))
+        if self._work is not None:
+            self._work['builds'].append((cache_key, (*object_validity, built_object)))
+        DiffObjectBuilder.__narrow(validity, *object_validity)
         return built_object
 
+    def track_work(self) -> None:
+        if self._work is None:
+            self._work = self._new_work()
+
+    def take_work(self) -> Optional[Dict[str, Any]]:
+        if self._work is None:
+            return None
+
+        work, self._work = self._work, self._new_work()
+        return work
+
+    def adopt_work(self, work: Dict[str, Any]) -> None:
+        for cache_key, cached in work['builds']:
+            self.build_cache.put(cache_key, cached)
+
+    def _new_work(self) -> Dict[str, list]:
+        return {'builds': []}
+
+    @staticmethod
+    def __narrow(validity: Optional[List[Time]], start: Time, end: Time) -> None:
+        if validity is not None:
+            validity[0], validity[1] = max(validity[0], start), min(validity[1], end)
+
     def get_type(self, item: Identifier, time: Time, line_no: Optional[LineNo] = -1) -> Optional[Type]:
         if not isinstance(item, str):
             return None
@@ -152,7 +320,8 @@ class DiffObjectBuilder(ObjectBuilder):
         object_type, _, _ = self._get_data_from_named(item, DiffObjectBuilder._Mode.CLOSEST, time, line_no)
         return object_type
 
-    def _build_object(self, line_no: LineNo, object_data: RangeDict, object_type: Type, time: Time):
+    def _build_object(self, line_no: LineNo, object_data: RangeDict, object_type: Type, time: Time,
+                      validity: Optional[List[Time]] = None):
         evaluated_object = AttributedDict()
         to_evaluate = list(object_data.items())
         while to_evaluate:
@@ -173,19 +342,19 @@ class DiffObjectBuilder(ObjectBuilder):
             elif field_type is DiffObjectBuilder._DictKeyResolve:
                 field_info: DiffObjectBuilder._DictKeyResolve = field
                 # The field is a dict key that should also be resolved (for dict keys that are objects).
-                resolved_key = self.build(field_info.field, time, field_info.field_type, line_no)
-                resolved_value = self.build(field_info.value, time, field_info.value_type, line_no)
+                resolved_key = self._build(field_info.field, time, field_info.field_type, line_no, validity)
+                resolved_value = self._build(field_info.value, time, field_info.value_type, line_no, validity)
                 evaluated_object[resolved_key] = resolved_value
 
             # Handle with postponed operations.
             elif field_type == Postpone:
                 # Re-evaluate object after postponed operation handled.
                 evaluated_object, to_evaluate = self.__build_postponed(evaluated_object, line_no, time, to_evaluate,
-                                                                       value)
+                                                                       value, validity)
                 evaluated_object.clear()
             else:
                 # Build the value (should be an object to build).
-                evaluated_value = self.build(value, time, field_type)
+                evaluated_value = self._build(value, time, field_type, validity=validity)
                 # Add attribute.
                 if isinstance(field, str):
                     setattr(evaluated_object, field, evaluated_value)
@@ -201,21 +370,22 @@ class DiffObjectBuilder(ObjectBuilder):
 
         return evaluated_object
 
-    def __build_postponed(self, evaluated_object, line_no, t, to_evaluate, value):
+    def __build_postponed(self, evaluated_object, line_no, t, to_evaluate, value, validity=None):
         manip_name = value.manip_name if not isinstance(value.manip_name,
                                                         DiffObjectBuilder._Field) else value.manip_name.value
         col_type = value.builtin_type
         arg = value.arg_value
         arg_type = value.arg_type
-        evaluated_arg = self.build(arg, t, arg_type, line_no=line_no) if arg != EMPTY and not ISP(arg_type) else arg
+        evaluated_arg = self._build(arg, t, arg_type, line_no, validity) if arg != EMPTY and not ISP(arg_type) else arg
         to_evaluate = list(
             BuiltinCollectionsUtils.update_dict_object_with_builtin_method(evaluated_object, col_type, manip_name,
                                                                            evaluated_arg).items()) + to_evaluate
         return evaluated_object, to_evaluate
 
     def __get_named_inner_data(self, name: str, mode: 'DiffObjectBuilder._Mode', time: Time = -1,
-                               line_no: Optional[LineNo] = -1, ) -> \
+                               line_no: Optional[LineNo] = -1, validity: Optional[List[Time]] = None) -> \
             Tuple[Union[RangeDict, Tuple[type, RangeDict], None], bool]:
+        self._add_named(name)
         is_primitive = name in self._named_primitives
         line_no_exist = line_no > -1
 
@@ -230,7 +400,9 @@ class DiffObjectBuilder(ObjectBuilder):
             if line_no not in named_collection[name]:
                 return None, is_primitive
 
-            return named_collection[name][line_no].get_data_by_time(time), is_primitive
+            named_data, start, end = named_collection[name][line_no].get_data_and_range_by_time(time)
+            DiffObjectBuilder.__narrow(validity, start, end)
+            return named_data, is_primitive
 
         else:
             match mode:
@@ -238,22 +410,24 @@ class DiffObjectBuilder(ObjectBuilder):
                     return list(named_collection[name].values())[0], is_primitive
 
                 case DiffObjectBuilder._Mode.CLOSEST:
-                    return self._find_closest(named_collection[name], time), is_primitive
+                    return self._find_closest(named_collection[name], time, validity), is_primitive
 
                 case _:
                     return None, is_primitive
 
     def _get_data_from_named(self, name: str, mode: 'DiffObjectBuilder._Mode', time: Time,
-                             line_no: Optional[LineNo] = -1) -> Tuple[
+                             line_no: Optional[LineNo] = -1, validity: Optional[List[Time]] = None) -> Tuple[
         Type, Union[ObjectId, None], Union[RangeDict, Any, None]]:
 
         not_found_ret_value = NoneType, None, None
 
-        named_data, is_primitive = self.__get_named_inner_data(name, mode, time, line_no)
+        named_data, is_primitive = self.__get_named_inner_data(name, mode, time, line_no, validity)
 
         if named_data is None:
             return not_found_ret_value
 
+        DiffObjectBuilder.__narrow(validity, *(named_data.get_range(time) or (time, time + 1)))
+
         if is_primitive:
             # Item is a primitive, return it.
             if time not in named_data:
@@ -283,12 +457,16 @@ class DiffObjectBuilder(ObjectBuilder):
             if object_id is None:
                 return not_found_ret_value
 
-            return named_type, object_id, self._data[object_id]
+            if (object_data := self._get_object_data(object_id)) is None:
+                raise KeyError(object_id)
+
+            return named_type, object_id, object_data
 
-    def _find_closest(self, col, t: Time) -> Optional[RangeDict]:
+    def _find_closest(self, col, t: Time, validity: Optional[List[Time]] = None) -> Optional[RangeDict]:
         closest: Tuple[Time | float, Optional[RangeDict]] = float('inf'), None
         for line_no, scope in col.items():
-            rd = scope.get_data_by_time(t)
+            rd, start, end = scope.get_data_and_range_by_time(t)
+            DiffObjectBuilder.__narrow(validity, start, end)
             if rd is not None:
                 return rd
         else:
@@ -312,33 +490,44 @@ class DiffObjectBuilder(ObjectBuilder):
 
         for rk, rv in sorted(
                 self.archive.flatten_and_filter(
-                    [lambda vv: vv.key.stub_name in {__AS__.__name__, __BMFCS__.__name__, __FC__.__name__},
+                    [lambda vv: vv.key.stub_name in DiffObjectBuilder.STUB_NAMES,
                      lambda vv: '__PALADIN_' not in vv.expression]),
                 key=lambda t: t[1].time):
-            object_data: RangeDict = self.__add_to_data(rk, rv)
-            if rk.kind in {Archive.Record.StoreKind.VAR, Archive.Record.StoreKind.FUNCTION_CALL}:
-                self.__add_to_named(rv, object_data)
+            object_data: RangeDict = self._add_to_data(rk, rv)
+            if rk.kind in DiffObjectBuilder.NAMED_KINDS:
+                self._add_to_named(rv, object_data)
 
         if self._should_time_construction:
             end_time = time()
 
         self._construction_time = end_time - start_time if self._should_time_construction else None
 
-    def __add_to_data(self, rk: Archive.Record.RecordKey, rv: Archive.Record.RecordValue) -> RangeDict:
-        t: Time = rv.time
-        object_id: ObjectId = rk.container_id
-        field: Identifier = rk.field
+    def _get_object_data(self, object_id: ObjectId) -> Optional[RangeDict]:
+        return self._data.get(object_id)
+
+    def _add_named(self, name: str) -> None:
+        """
+            Make sure the data of a name has been added (all names are added by the construction).
+        """
+        pass
 
+    def _add_to_data(self, rk: Archive.Record.RecordKey, rv: Archive.Record.RecordValue) -> RangeDict:
+        object_id: ObjectId = rk.container_id
         if object_id not in self._data:
-            return self.__add_first_value(object_id, t, field, rv.value, rv.rtype, rv.key.kind)
+            self._data[object_id] = self._new_object_data()
 
         object_id_data: RangeDict = self._data[object_id]
-        last_object_value = object_id_data.get_last()
-
-        object_id_data[t] = DiffObjectBuilder.__update_value(last_object_value, field, rv.value, rv.rtype, rv.key.kind)
+        self._add_change(object_id_data, rv.time, rk.field, rv.value, rv.rtype, rk.kind)
 
         return object_id_data
 
+    def _new_object_data(self) -> RangeDict:
+        return RangeDict(self.archive.last_time)
+
+    def _add_change(self, object_data: RangeDict, t: Time, field: Identifier, value: Any, _type: Type,
+                    kind: Archive.Record.StoreKind) -> None:
+        object_data[t] = DiffObjectBuilder._update_value(object_data.get_last(), field, value, _type, kind)
+
     @staticmethod
     def __get_first_time(rd: RangeDict):
         return sorted(reduce(lambda ll, l: ll + l, [[y.start for y in x] for x in rd.ranges()]))[0]
@@ -347,49 +536,40 @@ class DiffObjectBuilder(ObjectBuilder):
     def __get_last_time(rd: RangeDict):
         return sorted(reduce(lambda ll, l: ll + l, [[y.end for y in x] for x in rd.ranges()]), reverse=True)[0]
 
-    def __add_first_value(self, object_id: ObjectId, t: Time, field: str, value: Any, _type: Type,
-                          kind: Archive.Record.StoreKind):
-        self._data[object_id] = (rd := RangeDict(self.archive.last_time))
-        rd[t] = DiffObjectBuilder.__update_value(None, field, value, _type, kind)
-
-        return self._data[object_id]
-
     @staticmethod
     def __is_in_data(data: RangeDict, t: Time, field: str, value: Any) -> bool:
         return field in data and data[t][field] == value
 
     @staticmethod
-    def __update_value(obj: Any, field: Union[str, Any, ObjectId], value: Any, _type: Union[Type, Tuple[Type, Type]],
-                       kind: Archive.Record.StoreKind) -> Any:
+    def _update_value(obj: Optional['DiffObjectBuilder._ObjectState'], field: Union[str, Any, ObjectId], value: Any,
+                       _type: Union[Type, Tuple[Type, Type]],
+                       kind: Archive.Record.StoreKind) -> 'DiffObjectBuilder._ObjectState':
 
-        new_obj = DiffObjectBuilder.__clear_field_changes(obj, field)
+        new_obj = obj.cleared(field) if obj else DiffObjectBuilder._ObjectState()
 
         field = DiffObjectBuilder._Field(field, kind)
 
         match kind:
             case Archive.Record.StoreKind.BUILTIN_MANIP:
-                new_obj = BuiltinCollectionsUtils.create_dict_object_with_postponed_builtin_collection_methods(new_obj,
-                                                                                                               _type,
-                                                                                                               field,
-                                                                                                               value[0],
-                                                                                                               value[1])
-            case Archive.Record.StoreKind.UNAMED_OBJECT:
-                new_obj = {}
+                new_obj = new_obj.with_entry((Postpone, len(new_obj)),
+                                             Postpone(field, _type, value[0], value[1]))
+            case Archive.Record.StoreKind.UNAMED_OBJECT | Archive.Record.StoreKind.NEW_OBJECT:
+                new_obj = DiffObjectBuilder._ObjectState()
             case Archive.Record.StoreKind.DICT_ITEM:
                 key_type, value_type = _type
                 if ISP(key_type):
-                    new_obj[(value_type, field)] = value
+                    new_obj = new_obj.with_entry((value_type, field.value), value, (value_type, field))
                 else:
-                    new_obj[
-                        DiffObjectBuilder._DictKeyResolve, DiffObjectBuilder._DictKeyResolve(key_type, field, _type,
-                                                                                             value)] = None
+                    new_obj = new_obj.with_entry(
+                        (DiffObjectBuilder._DictKeyResolve, DiffObjectBuilder._DictKeyResolve(key_type, field, _type,
+                                                                                              value)), None)
             case Archive.Record.StoreKind.FUNCTION_CALL:
-                new_obj[(DiffObjectBuilder._FunctionCallFieldType(_type), field)] = value
+                new_obj = new_obj.with_function_call((DiffObjectBuilder._FunctionCallFieldType(_type), field), value)
             case _:
-                new_obj[(_type, field)] = value
+                new_obj = new_obj.with_entry((_type, field.value), value, (_type, field))
         return new_obj
 
-    def __add_to_named(self, rv: Archive.Record.RecordValue, object_data: RangeDict):
+    def _add_to_named(self, rv: Archive.Record.RecordValue, object_data: RangeDict):
         is_primitive = ISP(rv.rtype) and rv.rtype != NoneType
         collection = self._named_primitives if is_primitive else self._named_objects
         self.__init_named_collection_for_expression(collection, rv)
@@ -455,7 +635,7 @@ class DiffObjectBuilder(ObjectBuilder):
             rd: RangeDict = named_inner_data
         else:
             is_primitive = False
-            rd: RangeDict = self._data[item] if item in self._data else []
+            rd: RangeDict = self._get_object_data(item) or []
 
         if rd is None or rd == []:
             return []
@@ -471,7 +651,7 @@ class DiffObjectBuilder(ObjectBuilder):
                 types = [value[0]]
                 fields = [value[1]]
                 values = [fields[0].value]
-            elif isinstance(value, dict):
+            elif isinstance(value, Mapping):
                 types = list(map(lambda k: k[0], value.keys()))
                 fields = list(map(lambda k: k[1], value.keys()))
                 values = value.values()
@@ -488,13 +668,13 @@ class DiffObjectBuilder(ObjectBuilder):
         return change_times
 
     def get_bmfcs_change_time(self, item: Identifier, line_no: LineNo = -1) -> Iterable[Time]:
-        if isinstance(item, str) or item not in self._data:
+        if isinstance(item, str) or (rd := self._get_object_data(item)) is None:
             return []
 
-        rd: RangeDict = self._data[item]
         pass
 
     def get_line_no_by_name_and_container_id(self, name: str, container_id: ContainerId = -1) -> LineNo:
+        self._add_named(name)
         if name in self._named_primitives:
             col = self._named_primitives
         elif name in self._named_objects:
@@ -516,39 +696,6 @@ class DiffObjectBuilder(ObjectBuilder):
 
         return line_nos_of_container_id[0]
 
-    @staticmethod
-    def __clear_field_changes(obj: Dict, new_field: str):
-        if not obj:
-            return {}
-
-        cleaned_obj = {}
-        for k, v in obj.items():
-            match k:
-                case Postpone():
-                    cleaned_postponed: Postpone = copy.copy(k)
-                    cleaned_postponed.manip_name = k.manip_name.value
-                    cleaned_obj[cleaned_postponed] = v
-                case DiffObjectBuilder._DictKeyResolve():
-                    cleaned_dict_key_resolved: DiffObjectBuilder._DictKeyResolve = copy.copy(k)
-                    cleaned_dict_key_resolved.field = k.field.value
-                    cleaned_obj[cleaned_dict_key_resolved] = v
-                case _:
-                    _type, field = k
-                    if isinstance(field, DiffObjectBuilder._Field):
-                        field = field.value
-
-                    if isinstance(_type, DiffObjectBuilder._FunctionCallFieldType):
-                        # Clear function calls from the last value as function has a return value once,
-                        # and it doesn't exist afterward (i.e. do not copy to new cleaned_object).
-                        continue
-
-                    if field == new_field:
-                        continue
-
-                    cleaned_obj[(_type, field)] = v
-
-        return cleaned_obj
-
     def __get_or_add_scope(self, rv: Archive.Record.RecordValue, named_collection: NAMED_COLLECTION_DATA_TYPE) -> Scope:
         if rv.line_no not in self._scopes:
             self._scopes[rv.line_no] = Scope(rv.line_no)
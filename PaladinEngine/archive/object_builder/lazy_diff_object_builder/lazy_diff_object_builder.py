@@ -0,0 +1,109 @@
+from threading import RLock
+from typing import *
+
+from archive.archive import Archive
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import ObjectId, ContainerId, LineNo
+from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
+from utils.range_dict import RangeDict
+
+
+class LazyDiffObjectBuilder(DiffObjectBuilder):
+    """
+        A DiffObjectBuilder that is not constructed up front.
+        The data of an object (or a name) is constructed from its records when it is first asked for, and kept for
+        the next queries, so the construction is spread over the objects and names that are actually queried.
+        Asking for the scopes of lines (or containers) constructs all the names, since any of them may be in a scope.
+    """
+
+    def __init__(self, archive: Archive, should_time_construction: bool = False,
+                 build_cache_size: Optional[int] = DiffObjectBuilder.DEFAULT_BUILD_CACHE_SIZE):
+        self._added_object_ids: Set[ObjectId] = set()
+        self._added_names: Set[str] = set()
+        self._added_all_names = False
+        self._var_names: Optional[List[str]] = None
+        # Queries may be evaluated in parallel (by threads), and adding a name adds the objects of its containers.
+        self._lock = RLock()
+        super().__init__(archive, should_time_construction, build_cache_size)
+
+    def _construct(self):
+        self._construction_time = 0 if self._should_time_construction else None
+
+    @staticmethod
+    def _sorted_by_time(records: List[Tuple[Archive.Record.RecordKey, Archive.Record.RecordValue]]) -> \
+            List[Tuple[Archive.Record.RecordKey, Archive.Record.RecordValue]]:
+        return sorted(filter(lambda r: '__PALADIN_' not in r[1].expression, records), key=lambda r: r[1].time)
+
+    def _get_object_data(self, object_id: ObjectId) -> Optional[RangeDict]:
+        if object_id not in self._added_object_ids:
+            with self._lock:
+                if object_id not in self._added_object_ids:
+                    for rk, rv in self._sorted_by_time(
+                            self.archive.get_by_container_id_and_stubs(object_id, *DiffObjectBuilder.STUB_NAMES)):
+                        self._add_to_data(rk, rv)
+                    self._added_object_ids.add(object_id)
+                    if self._work is not None:
+                        self._work['objects'].append(object_id)
+
+        return super()._get_object_data(object_id)
+
+    def _add_named(self, name: str) -> None:
+        if name in self._added_names:
+            return
+
+        with self._lock:
+            if name in self._added_names:
+                return
+
+            for rk, rv in self._sorted_by_time(
+                    self.archive.get_by_expression_and_stubs(name, *DiffObjectBuilder.STUB_NAMES)):
+                if rk.kind in DiffObjectBuilder.NAMED_KINDS:
+                    self._add_to_named(rv, self._get_object_data(rk.container_id))
+            self._added_names.add(name)
+
+    def _add_all_named(self) -> None:
+        if self._added_all_names:
+            return
+
+        with self._lock:
+            for name in self.get_var_names():
+                self._add_named(name)
+            self._added_all_names = True
+
+    def prepare(self, names: Iterable[str]) -> None:
+        for name in names:
+            self._add_named(name)
+
+    def take_work(self) -> Optional[Dict[str, Any]]:
+        work = super().take_work()
+        if work is not None:
+            work['objects'] = {object_id: self._data.get(object_id) for object_id in work['objects']}
+
+        return work
+
+    def adopt_work(self, work: Dict[str, Any]) -> None:
+        super().adopt_work(work)
+        with self._lock:
+            for object_id, object_data in work['objects'].items():
+                if object_id not in self._added_object_ids:
+                    if object_data is not None:
+                        self._data[object_id] = object_data
+                    self._added_object_ids.add(object_id)
+
+    def _new_work(self) -> Dict[str, list]:
+        return {**super()._new_work(), 'objects': []}
+
+    def get_var_names(self) -> Iterable[str]:
+        if self._var_names is None:
+            self._var_names = list({rv.expression for rk, rv in self._sorted_by_time(
+                self.archive.flatten_and_filter([lambda vv: vv.key.stub_name in DiffObjectBuilder.STUB_NAMES,
+                                                 lambda vv: vv.key.kind in DiffObjectBuilder.NAMED_KINDS]))})
+
+        return self._var_names
+
+    def get_container_ids_by_line_no(self, line_no: LineNo) -> Iterable[ContainerId]:
+        self._add_all_named()
+        return super().get_container_ids_by_line_no(line_no)
+
+    def get_line_nos_by_container_ids(self, container_ids: Set[ContainerId]) -> Iterable[LineNo]:
+        self._add_all_named()
+        return super().get_line_nos_by_container_ids(container_ids)
@@ -37,7 +37,7 @@ class NaiveObjectBuilder(ObjectBuilder):
             ([Archive.Filters.LINE_NO_FILTER(line_no)] if line_no > -1 else [])), key=lambda r: r[1].time)
 
         object_data = AttributedDict()
-        for rk, rv in records:
+        for rk, rv in Archive.of_last_object(records):
             match rk.kind:
                 case Archive.Record.StoreKind.DICT_ITEM:
                     field_type, value_type = rv.rtype
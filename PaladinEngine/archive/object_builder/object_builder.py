@@ -16,6 +16,13 @@ class ObjectBuilder(ABC):
     def build(self, item: Identifier, t: Time, _type: Type = Any, line_no: Optional[LineNo] = -1) -> Any:
         raise NotImplementedError()
 
+    def build_with_validity(self, item: Identifier, time: Time, _type: Type = Any,
+                            line_no: Optional[LineNo] = -1) -> Tuple[Any, Time, Time]:
+        """
+            Build item in time, with the range of times [start, end) in which the built item stays the same.
+        """
+        return self.build(item, time, _type, line_no), time, time + 1
+
     @abstractmethod
     def get_type(self, item: Identifier, time: Time, line_no: Optional[LineNo] = -1) -> Optional[Type]:
         raise NotImplementedError()
@@ -23,6 +30,12 @@ class ObjectBuilder(ABC):
     def find_events(self, line_no: Time = -1, time_range: Iterable[Time] = None):
         return self.archive.find_events(line_no, time_range)
 
+    def find_event_times(self, line_no: LineNo) -> List[range]:
+        return self.archive.find_event_times(line_no)
+
+    def get_print_times(self, output: str) -> List[range]:
+        return self.archive.get_print_times(output)
+
     def get_loop_iterations(self, line_no: LineNo):
         return self.archive.get_loop_iterations(line_no)
 
@@ -48,12 +61,40 @@ class ObjectBuilder(ABC):
         return self.archive.get_function_entries(func_name, line_no, entrances=entrances, exits=exits,
                                                  ass_and_bmfcs_only=ass_and_bmfcs_only)
 
+    def get_function_times(self, func_name: str, line_no: LineNo) -> List[range]:
+        return self.archive.get_function_times(func_name, line_no)
+
     def get_function_line_nos(self, func_name: str):
         return self.archive.get_function_line_nos(func_name)
 
     def get_call_chain(self, include_builtins=True) -> Dict[Time, Tuple[str, str]]:
         return self.archive.get_call_chain(include_builtins)
 
+    def prepare(self, names: Iterable[str]) -> None:
+        """
+            Construct the data of names up front, for a builder that constructs it when it's first asked for (e.g., before
+            forked workers share the builder, rather than each of them constructing it).
+        """
+        pass
+
+    def track_work(self) -> None:
+        """
+            Keep the work of the builder from now on (e.g., in a forked worker), for another copy of the builder to adopt
+            it (see take_work).
+        """
+        pass
+
+    def take_work(self) -> Any:
+        """
+            The work of the builder since it has been tracked or last taken (None if it isn't tracked): e.g., the objects
+            that it has constructed and built, which another copy of the builder adopts (see adopt_work) rather than
+            doing it again.
+        """
+        return None
+
+    def adopt_work(self, work: Any) -> None:
+        pass
+
     @property
     def construction_time(self):
         return 0
@@ -27,11 +27,11 @@ class RecursiveObjectBuilder(ObjectBuilder):
         return rv.time <= time if time != -1 else True
 
     def get_relevant_records(self, object_id: int, time: int) -> List[Tuple[Rk, Rv]]:
-        return sorted(self.archive.flatten_and_filter([lambda vv: vv.key.container_id == object_id,
+        return Archive.of_last_object(sorted(self.archive.flatten_and_filter([lambda vv: vv.key.container_id == object_id,
                                                        lambda vv: vv.key.stub_name in {'__AS__', '__BMFCS__'},
                                                        lambda vv: RecursiveObjectBuilder.time_filter(vv, time),
                                                        # lambda vv: vv not in self.used_records
-                                                       ]), key=lambda t: t[1].time)
+                                                       ]), key=lambda t: t[1].time))
 
     def _build(self, object_id: int, rtype: type = Any, time: int = -1) -> Any:
         try:
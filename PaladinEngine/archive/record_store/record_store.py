@@ -0,0 +1,433 @@
+from array import array
+from bisect import bisect_left
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Tuple, Optional, Sequence
+
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time
+
+# Tags of the value slot column.
+# An inline value is an int that is kept in the slot itself, anything else is kept in the objects side table and the
+# slot keeps its index.
+_INLINE = 0
+_BOXED = 1
+
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+
+
+class Interner(object):
+    """
+        Maps (hashable) objects to dense int ids and back.
+    """
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._ids: Dict[Tuple[type, Any], int] = {}
+
+    def intern(self, value: Any) -> int:
+        # The type is a part of the key, so equal objects of different types (e.g.: 1, 1.0 and True) won't collide.
+        try:
+            lookup = type(value), value
+            _id = self._ids.get(lookup)
+            if _id is None:
+                _id = self._ids[lookup] = len(self.values)
+                self.values.append(value)
+            return _id
+
+        except TypeError:
+            # Unhashable, cannot be shared.
+            self.values.append(value)
+            return len(self.values) - 1
+
+    def extend(self, values: Iterable[Any]) -> None:
+        """
+            Add values by the order of their ids (e.g.: of a table that has been interned elsewhere), even if they are
+            equal to values that have already been added.
+        """
+        for value in values:
+            _id = len(self.values)
+            self.values.append(value)
+            try:
+                self._ids.setdefault((type(value), value), _id)
+
+            except TypeError:
+                pass
+
+    def id_of(self, value: Any) -> Optional[int]:
+        try:
+            return self._ids.get((type(value), value))
+
+        except TypeError:
+            return None
+
+    def __getitem__(self, _id: int) -> Any:
+        return self.values[_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class RecordValueView(object):
+    """
+        A read-only view of a single record of a RecordStore.
+        Behaves like Archive.Record.RecordValue without holding a copy of the record.
+    """
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: 'RecordStore', index: int):
+        self._store = store
+        self._index = index
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def key(self):
+        return self._store.keys[self._store.key_ids[self._index]]
+
+    @property
+    def rtype(self) -> type:
+        return self._store.interned[self._store.rtype_ids[self._index]]
+
+    @property
+    def value(self) -> object:
+        return self._store.value_at(self._index)
+
+    @property
+    def expression(self) -> str:
+        return self._store.interned[self._store.expression_ids[self._index]]
+
+    @property
+    def line_no(self) -> int:
+        return self._store.line_nos[self._index]
+
+    @property
+    def time(self) -> Time:
+        return self._store.times[self._index]
+
+    @property
+    def extra(self) -> str:
+        return self._store.interned[self._store.extra_ids[self._index]]
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, RecordValueView) and o._store is self._store and o._index == self._index
+
+    def __hash__(self) -> int:
+        return hash(self._index)
+
+    def __str__(self) -> str:
+        rtype = self.rtype
+        rtype_name = rtype.__name__ if isinstance(rtype, type) else str(rtype)
+        return f'({self.time}): {self.expression}({rtype_name}) = {self._stringify_value(self.value)} ' \
+               f'[line {self.line_no}] {f"extra: {self.extra}" if self.extra else ""}'
+
+    def _stringify_value(self, value):
+        if type(value) == list:
+            return str([self._stringify_value(i) for i in value])
+
+        if type(value) == tuple:
+            return str((self._stringify_value(i) for i in value))
+
+        return str(value)
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class RecordStore(object):
+    """
+        An append-only, columnar store of the archive's records.
+
+        Every record is kept as one row of parallel typed arrays (time, container id, field, stub name, kind, type,
+        value, expression, line no and extra).
+        Strings and other repeating objects (fields, stub names, expressions, types and extras) are interned and only
+        their ids are kept in the columns.
+        Values that are ints (mostly object ids) are kept inline, any other value is kept in a side table.
+
+        The store also maintains secondary indexes (by stub name, line no, container id and value) as records are
+        appended. Every index maps to the (ascending) row numbers of the matching records, so as long as records are
+        stored in time order, every index is sorted by time as well.
+    """
+
+    # Names and typecodes of the columns of the store.
+    COLUMNS = (('times', 'q'), ('container_ids', 'q'), ('field_ids', 'q'), ('stub_ids', 'q'), ('kinds', 'b'),
+               ('rtype_ids', 'q'), ('value_tags', 'b'), ('value_slots', 'q'), ('expression_ids', 'q'),
+               ('line_nos', 'q'), ('extra_ids', 'q'), ('key_ids', 'q'))
+
+    # Names of the columns of the keys table.
+    KEY_COLUMNS = ('key_container_ids', 'key_field_ids', 'key_stub_ids', 'key_kinds')
+
+    def __init__(self, key_factory: Callable[[int, Any, str, Any], Any]):
+        self._key_factory = key_factory
+
+        # Columns.
+        self.times: array = array('q')
+        self.container_ids: array = array('q')
+        self.field_ids: array = array('q')
+        self.stub_ids: array = array('q')
+        self.kinds: array = array('b')
+        self.rtype_ids: array = array('q')
+        self.value_tags: array = array('b')
+        self.value_slots: array = array('q')
+        self.expression_ids: array = array('q')
+        self.line_nos: array = array('q')
+        self.extra_ids: array = array('q')
+        self.key_ids: array = array('q')
+
+        # Side tables.
+        self.interned: Interner = Interner()
+        self.objects: List[object] = []
+
+        # Keys.
+        self.keys: List[Any] = []
+        self.key_container_ids: array = array('q')
+        self.key_field_ids: array = array('q')
+        self.key_stub_ids: array = array('q')
+        self.key_kinds: array = array('q')
+        self._key_ids: Dict[Tuple[int, int, int, int], int] = {}
+        self._records_by_key: List[array] = []
+
+        # Indexes.
+        self.times_sorted: bool = True
+        self._rows_by_stub: Dict[int, array] = {}
+        self._rows_by_line_no: Dict[int, array] = {}
+        self._rows_by_container_id: Dict[int, array] = {}
+        self._rows_by_value: Dict[Any, array] = {}
+        self._rows_of_unhashable_values: array = array('q')
+
+        # Built on its first use (see rows_by_expression).
+        self._rows_by_expression: Dict[int, array] = {}
+        self._expression_indexed_rows: int = 0
+
+    def append(self, container_id: int, field: Any, stub_name: str, kind: Any, rtype: type, value: object,
+               expression: str, line_no: int, time: Time, extra: Any) -> int:
+        interned = self.interned
+        field_id = interned.intern(field)
+        stub_id = interned.intern(stub_name)
+
+        key_lookup = container_id, field_id, stub_id, kind.value
+        key_id = self._key_ids.get(key_lookup)
+        if key_id is None:
+            key_id = self._key_ids[key_lookup] = len(self.keys)
+            self.keys.append(self._key_factory(container_id, field, stub_name, kind))
+            self.key_container_ids.append(container_id)
+            self.key_field_ids.append(field_id)
+            self.key_stub_ids.append(stub_id)
+            self.key_kinds.append(kind.value)
+            self._records_by_key.append(array('q'))
+
+        index = len(self.times)
+        if index > 0 and time < self.times[-1]:
+            self.times_sorted = False
+
+        self.times.append(time)
+        self.container_ids.append(container_id)
+        self.field_ids.append(field_id)
+        self.stub_ids.append(stub_id)
+        self.kinds.append(kind.value)
+        self.rtype_ids.append(interned.intern(rtype))
+        if type(value) is int and _INT64_MIN <= value <= _INT64_MAX:
+            self.value_tags.append(_INLINE)
+            self.value_slots.append(value)
+        else:
+            self.value_tags.append(_BOXED)
+            self.value_slots.append(len(self.objects))
+            self.objects.append(value)
+        self.expression_ids.append(interned.intern(expression))
+        self.line_nos.append(line_no)
+        self.extra_ids.append(interned.intern(extra))
+        self.key_ids.append(key_id)
+        self._records_by_key[key_id].append(index)
+
+        self._index(self._rows_by_stub, stub_id, index)
+        self._index(self._rows_by_line_no, line_no, index)
+        self._index(self._rows_by_container_id, container_id, index)
+        try:
+            self._index(self._rows_by_value, value, index)
+        except TypeError:
+            self._rows_of_unhashable_values.append(index)
+
+        return index
+
+    @staticmethod
+    def _index(index: Dict[Any, array], key: Any, row: int) -> None:
+        rows = index.get(key)
+        if rows is None:
+            rows = index[key] = array('q')
+
+        rows.append(row)
+
+    def value_at(self, index: int) -> object:
+        slot = self.value_slots[index]
+        return slot if self.value_tags[index] == _INLINE else self.objects[slot]
+
+    def rows_by_stub(self, *stub_names: str) -> Sequence[int]:
+        stub_ids = [self.interned.id_of(stub_name) for stub_name in stub_names]
+        indexes = [self._rows_by_stub[stub_id] for stub_id in stub_ids if stub_id in self._rows_by_stub]
+        if len(indexes) == 1:
+            return indexes[0]
+
+        return sorted(chain.from_iterable(indexes))
+
+    def rows_by_line_no(self, line_no: int) -> Sequence[int]:
+        return self._rows_by_line_no.get(line_no, ())
+
+    def rows_by_container_id(self, container_id: int) -> Sequence[int]:
+        return self._rows_by_container_id.get(container_id, ())
+
+    def rows_by_value(self, value: Any) -> Sequence[int]:
+        """
+            Find the records whose value equals (==) to a value.
+        """
+        try:
+            rows = self._rows_by_value.get(value, ())
+
+        except TypeError:
+            rows = ()
+
+        if not self._rows_of_unhashable_values:
+            return rows
+
+        return sorted(chain(rows, (i for i in self._rows_of_unhashable_values if self.value_at(i) == value)))
+
+    def rows_by_expression(self, expression: str) -> Sequence[int]:
+        """
+            Find the records of an expression.
+            Unlike the other indexes, this index is not maintained as records are appended, but built on its first use
+            (and extended with the records that have been appended since, on the next uses).
+        """
+        expression_ids = self.expression_ids
+        for row in range(self._expression_indexed_rows, len(expression_ids)):
+            self._index(self._rows_by_expression, expression_ids[row], row)
+        self._expression_indexed_rows = len(expression_ids)
+
+        return self._rows_by_expression.get(self.interned.id_of(expression), ())
+
+    def with_stubs(self, rows: Iterable[int], *stub_names: str) -> List[int]:
+        stub_ids = {self.interned.id_of(stub_name) for stub_name in stub_names}
+        return [i for i in rows if self.stub_ids[i] in stub_ids]
+
+    def without_stubs(self, rows: Iterable[int], *stub_names: str) -> List[int]:
+        stub_ids = {self.interned.id_of(stub_name) for stub_name in stub_names}
+        return [i for i in rows if self.stub_ids[i] not in stub_ids]
+
+    def has_value(self, value: Any) -> bool:
+        return len(self.rows_by_value(value)) > 0
+
+    def rows_in_time_range(self, rows: Optional[Sequence[int]], start: Time, stop: Optional[Time] = None) -> \
+            Sequence[int]:
+        """
+            Narrow rows to the records that were stored in [start, stop).
+        :param rows: Ascending row numbers, or None for all records.
+        :param start: The first time of the range.
+        :param stop: The end of the range (exclusive), or None for an open range.
+        :return: The rows of records in the range, by the same order.
+        """
+        times = self.times
+        if rows is None:
+            rows = range(len(times))
+
+        if not self.times_sorted:
+            return [i for i in rows if start <= times[i] and (stop is None or times[i] < stop)]
+
+        key = times.__getitem__
+        lo = bisect_left(rows, start, key=key)
+        hi = len(rows) if stop is None else bisect_left(rows, stop, lo, key=key)
+        return rows[lo:hi]
+
+    def time_ranges(self, rows: Iterable[int]) -> List[range]:
+        """
+            The times of the records of rows, as sorted, disjoint ranges.
+        :param rows: Ascending row numbers (so their times are ascending as well, as long as records are stored in time
+                     order).
+        """
+        times = self.times
+        row_times = (times[i] for i in rows) if self.times_sorted else sorted(times[i] for i in rows)
+
+        ranges = []
+        start = stop = None
+        for t in row_times:
+            if stop is not None and t <= stop:
+                stop = max(stop, t + 1)
+                continue
+
+            if stop is not None:
+                ranges.append(range(start, stop))
+            start, stop = t, t + 1
+
+        if stop is not None:
+            ranges.append(range(start, stop))
+
+        return ranges
+
+    def ordered(self, rows: Iterable[int]) -> List[int]:
+        """
+            Order rows by the order of iteration of the store (grouped by keys).
+        """
+        key_ids = self.key_ids
+        return sorted(rows, key=lambda i: (key_ids[i], i))
+
+    def grouped(self, rows: Iterable[int]) -> Dict[Any, List[RecordValueView]]:
+        """
+            Group all the records of the keys of rows, by the order of iteration of the store.
+        """
+        return {self.keys[key_id]: self.views(self._records_by_key[key_id])
+                for key_id in sorted({self.key_ids[i] for i in rows})}
+
+    def take_segment(self, start: int, objects_start: int) -> Tuple[Dict[str, array], List[object]]:
+        """
+            Copy the records that have been stored since some record (e.g.: to write them to a trace).
+        :param start: The index of the first record.
+        :param objects_start: The index (in the objects side table) of the first value of these records.
+        :return: The columns of the records and their (non-int) values.
+        """
+        return {name: getattr(self, name)[start:] for name, _ in RecordStore.COLUMNS}, self.objects[objects_start:]
+
+    def view(self, index: int) -> RecordValueView:
+        return RecordValueView(self, index)
+
+    def views(self, indices: Iterable[int]) -> List[RecordValueView]:
+        return [RecordValueView(self, i) for i in indices]
+
+    def key_of(self, index: int) -> Any:
+        return self.keys[self.key_ids[index]]
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def __iter__(self) -> Iterator[RecordValueView]:
+        """
+            Iterate over all records, grouped by their keys (by the order the keys were first stored).
+            Records of the same key are iterated by the order they have been stored.
+        """
+        return (RecordValueView(self, i) for indices in self._records_by_key for i in indices)
+
+    def in_store_order(self) -> Iterator[RecordValueView]:
+        """
+            Iterate over all records by the order they have been stored.
+        """
+        return (RecordValueView(self, i) for i in range(len(self.times)))
+
+    def __contains__(self, key: Any) -> bool:
+        return self.records_of(key) is not None
+
+    def records_of(self, key: Any):
+        """
+            Find the indices of the records of a key.
+        :param key: A record key.
+        :return: The indices of the records that were stored with that key, by order, or None if there are none.
+        """
+        interned = self.interned
+        key_id = self._key_ids.get(
+            (key.container_id, interned.id_of(key.field), interned.id_of(key.stub_name), key.kind.value))
+        return None if key_id is None else self._records_by_key[key_id]
+
+    def items(self) -> Iterator[Tuple[Any, List[RecordValueView]]]:
+        """
+            Iterate over the records grouped by their keys, by the order the keys were first stored.
+        """
+        return ((k, self.views(indices)) for k, indices in zip(self.keys, self._records_by_key))
+
+    def grouped_indices(self) -> Iterator[Tuple[Any, array]]:
+        return zip(self.keys, self._records_by_key)
@@ -0,0 +1,740 @@
+"""
+    :file: trace_file.py
+    :brief: A versioned, binary on-disk format of the archive's records, reopened with mmap.
+"""
+import builtins
+import importlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+import threading
+import types
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from queue import Queue
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time
+from archive.record_store.record_store import RecordStore, Interner, RecordValueView, _INLINE, _BOXED, \
+    _INT64_MIN, _INT64_MAX
+from builtin_manipulation_calls.builtin_manipulation_calls import EMPTY, EMPTY_COLLECTION
+
+# The layout of a trace file:
+#
+#   HEADER  | magic, version, byte order, segment size, footer offset
+#   SEGMENT | segment header, intern table delta, keys table delta, value heap delta, event columns
+#   ...
+#   SEGMENT
+#   INDEXES | rows of the secondary indexes
+#   FOOTER  | a directory of all segments and indexes
+#
+# Segments are written while the program runs, every one of them holds the records that were stored since the
+# previous one, along with the interned objects, keys and (non-int) values that first appeared in them.
+# The event columns are fixed-width arrays, so the reader maps them as is, without parsing.
+# The indexes and the footer are written when the trace is closed, and the footer's offset is patched into the header.
+# Until then, the trace is written to a '.part' file next to it.
+# The intern table, the value heap and the footer hold only plain values (see encode), written with marshal, so
+# loading a trace never runs code from it.
+
+MAGIC = b'PLDNTRCE'
+VERSION = 2
+DEFAULT_SEGMENT_SIZE = 1 << 16
+
+_HEADER = struct.Struct('<8sHHIQQ')
+_SEGMENT_HEADER = struct.Struct('<4sIIII4x')
+_SEGMENT_TAG = b'SEGM'
+_LENGTH = struct.Struct('<Q')
+_BYTE_ORDERS = {'little': 1, 'big': 2}
+_ALIGNMENT = 8
+
+# The number of segments that may wait for a background writer (beyond that, recording waits for it).
+_QUEUED_SEGMENTS = 2
+
+_INDEXES = ('_rows_by_stub', '_rows_by_line_no', '_rows_by_container_id', '_rows_by_value')
+
+_FOOTER_KEYS = {'segments', 'rows', 'interned', 'keys', 'objects', 'last_time', 'times_sorted', 'indexes',
+                'records_by_key', 'rows_of_unhashable_values', 'stored_object_ids'}
+
+# A region of an array in the file: (offset, typecode, length).
+Region = Tuple[int, str, int]
+
+
+class TraceFormatError(ValueError):
+    pass
+
+
+def _array(view: memoryview, region: Region) -> memoryview:
+    offset, typecode, length = region
+    itemsize = array(typecode).itemsize
+    return view[offset:offset + length * itemsize].cast(typecode)
+
+
+class _Encoded(object):
+    """
+        Tags of encoded objects.
+        Objects are encoded into plain values before they are written, so types and sentinels can be restored without
+        importing the traced program.
+    """
+    PLAIN = 0
+    TYPE = 1
+    TUPLE = 2
+    SENTINEL = 3
+    REPR = 4
+
+
+_SENTINELS = {'EMPTY': EMPTY, 'EMPTY_COLLECTION': EMPTY_COLLECTION}
+_SENTINEL_NAMES = {id(v): k for k, v in _SENTINELS.items()}
+_PLAIN_TYPES = (int, float, str, bool, complex, bytes, type(None))
+_KNOWN_TYPES = {(t.__module__, t.__qualname__): t for t in [*vars(builtins).values(), *vars(types).values()] if
+                isinstance(t, type)}
+_STAND_IN_TYPES: Dict[Tuple[str, str], type] = {}
+
+# The types of the values that are written to a trace.
+_WRITTEN_TYPES = (*_PLAIN_TYPES, tuple, list, dict)
+
+
+def _dumps(o: object) -> bytes:
+    return marshal.dumps(o)
+
+
+def _loads(blob: bytes) -> Any:
+    try:
+        o = marshal.loads(blob)
+    except (EOFError, ValueError, TypeError) as e:
+        raise TraceFormatError(f'Malformed trace data: {e}') from None
+
+    _check_plain(o)
+    return o
+
+
+def _check_plain(o: object) -> None:
+    """
+        Raises a TraceFormatError unless o is made only of the values that are written to a trace (e.g., marshal also
+        loads code objects).
+    """
+    stack = [o]
+    while stack:
+        o = stack.pop()
+        if type(o) not in _WRITTEN_TYPES:
+            raise TraceFormatError(f'Unexpected {type(o).__name__} in the trace')
+
+        if type(o) is dict:
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif type(o) in (tuple, list):
+            stack.extend(o)
+
+
+def encode(o: object) -> Tuple:
+    if o is EMPTY or o is EMPTY_COLLECTION:
+        return _Encoded.SENTINEL, _SENTINEL_NAMES[id(o)]
+
+    if isinstance(o, type):
+        return _Encoded.TYPE, o.__module__, o.__qualname__
+
+    if type(o) is tuple:
+        return _Encoded.TUPLE, tuple(encode(x) for x in o)
+
+    if type(o) in _PLAIN_TYPES:
+        return _Encoded.PLAIN, o
+
+    return _Encoded.REPR, repr(o)
+
+
+def decode(e: Tuple) -> object:
+    if type(e) is not tuple or not e:
+        raise TraceFormatError(f'Malformed encoded object {e!r}')
+
+    tag = e[0]
+    if tag == _Encoded.PLAIN and len(e) == 2 and type(e[1]) in _PLAIN_TYPES:
+        return e[1]
+
+    if tag == _Encoded.TUPLE and len(e) == 2 and type(e[1]) is tuple:
+        return tuple(decode(x) for x in e[1])
+
+    if tag == _Encoded.TYPE and len(e) == 3 and type(e[1]) is str and type(e[2]) is str:
+        return _resolve_type(e[1], e[2])
+
+    if tag == _Encoded.SENTINEL and len(e) == 2 and e[1] in _SENTINELS:
+        return _SENTINELS[e[1]]
+
+    if tag == _Encoded.REPR and len(e) == 2 and type(e[1]) is str:
+        return e[1]
+
+    raise TraceFormatError(f'Malformed encoded object {e!r}')
+
+
+def _resolve_type(module: str, qualname: str) -> type:
+    if (module, qualname) in _KNOWN_TYPES:
+        return _KNOWN_TYPES[(module, qualname)]
+
+    # Types of the traced program (that lives in __main__) can't be imported, so they are replaced by stand-ins
+    # that only carry their names.
+    if module != '__main__':
+        try:
+            t = importlib.import_module(module)
+            for part in qualname.split('.'):
+                t = getattr(t, part)
+            if isinstance(t, type):
+                return t
+        except (ImportError, AttributeError):
+            pass
+
+    if (module, qualname) not in _STAND_IN_TYPES:
+        _STAND_IN_TYPES[(module, qualname)] = type(qualname.split('.')[-1], (object,),
+                                                   {'__module__': module, '__qualname__': qualname})
+    return _STAND_IN_TYPES[(module, qualname)]
+
+
+@dataclass
+class _Segment(object):
+    """
+        The records of a segment, along with the interned objects, keys and values that first appeared in them.
+    """
+    rows: Tuple[int, int]
+    columns: Dict[str, Sequence[int]]
+    interned: List[Any]
+    keys: Dict[str, array]
+    objects_start: int
+    objects: List[object]
+
+
+class _IndexBuilder(object):
+    """
+        Builds the secondary indexes of the trace from the segments that have been written.
+    """
+
+    def __init__(self):
+        self.indexes: Dict[str, Dict[Any, array]] = {name: {} for name in _INDEXES}
+        self.rows_of_unhashable_values: array = array('q')
+        self.records_by_key: List[array] = []
+        self.times_sorted: bool = True
+        self.last_time: Optional[int] = None
+
+    @classmethod
+    def of_trace(cls, mm: mmap.mmap, segments: List[Dict[str, Any]], objects: int) -> '_IndexBuilder':
+        view = memoryview(mm)
+        heap = _MappedHeap(mm, [(start, _array(view, offsets), blob_offset) for s in segments for
+                                (start, offsets, blob_offset) in [s['objects']]], objects)
+        builder = cls()
+        for s in segments:
+            builder.add({name: _array(view, region) for name, region in s['columns'].items()}, heap, *s['rows'])
+        return builder
+
+    def add(self, columns: Dict[str, Sequence[int]], heap: Sequence[object], start: int, stop: int) -> None:
+        by_stub, by_line_no, by_container_id, by_value = (self.indexes[name] for name in _INDEXES)
+        records_by_key = self.records_by_key
+        times, stub_ids, line_nos, container_ids, value_tags, value_slots, key_ids = \
+            (columns[name] for name in ('times', 'stub_ids', 'line_nos', 'container_ids', 'value_tags',
+                                        'value_slots', 'key_ids'))
+        for j, i in enumerate(range(start, stop)):
+            time = times[j]
+            if self.last_time is not None and time < self.last_time:
+                self.times_sorted = False
+            self.last_time = time
+
+            RecordStore._index(by_stub, stub_ids[j], i)
+            RecordStore._index(by_line_no, line_nos[j], i)
+            RecordStore._index(by_container_id, container_ids[j], i)
+            try:
+                RecordStore._index(by_value, value_slots[j] if value_tags[j] == _INLINE else heap[value_slots[j]], i)
+            except TypeError:
+                self.rows_of_unhashable_values.append(i)
+
+            key_id = key_ids[j]
+            while len(records_by_key) <= key_id:
+                records_by_key.append(array('q'))
+            records_by_key[key_id].append(i)
+
+
+class TraceWriter(object):
+    """
+        Writes the records of a RecordStore to a trace file, segment by segment, as they are stored.
+        A background writer writes the segments from a thread of its own, while the program keeps running.
+    """
+
+    def __init__(self, path: Union[str, Path], segment_size: int = DEFAULT_SEGMENT_SIZE, background: bool = False):
+        self.path: Path = Path(path)
+        self.segment_size: int = segment_size
+        self.written_rows: int = 0
+        self._written_interned: int = 0
+        self._written_keys: int = 0
+        self._written_objects: int = 0
+        self._segments: List[Dict[str, Any]] = []
+        self._part_path: Path = self.path.with_name(f'{self.path.name}.part')
+        self._fo = open(self._part_path, 'wb+')
+        self._fo.write(_HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS[sys.byteorder], segment_size, 0, 0))
+
+        self._queue: Optional[Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._error: Optional[BaseException] = None
+        if background:
+            self._queue = Queue(_QUEUED_SEGMENTS)
+            self._thread = threading.Thread(target=self._run, name=f'TraceWriter({self.path.name})', daemon=True)
+            self._thread.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._fo.closed
+
+    def on_append(self, store: RecordStore) -> None:
+        if len(store) - self.written_rows >= self.segment_size:
+            self.write_segment(store)
+
+    def write_segment(self, store: RecordStore) -> None:
+        """
+            Write the records that have been stored since the last segment.
+        """
+        start = self.written_rows
+        columns, objects = store.take_segment(start, self._written_objects)
+        segment = _Segment((start, len(store)), columns, store.interned.values[self._written_interned:],
+                           {name: getattr(store, name)[self._written_keys:] for name in RecordStore.KEY_COLUMNS},
+                           self._written_objects, objects)
+
+        self.written_rows = len(store)
+        self._written_interned += len(segment.interned)
+        self._written_keys = len(store.keys)
+        self._written_objects += len(objects)
+
+        if self._queue is None:
+            self._write(segment)
+            return
+
+        if self._error is not None:
+            raise self._error
+
+        self._queue.put(segment)
+
+    def close(self, store: RecordStore, last_time: int, stored_object_ids: Iterable[int]) -> None:
+        if self.closed:
+            return
+
+        if len(store) > self.written_rows or self.written_rows == 0:
+            self.write_segment(store)
+
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            if self._error is not None:
+                self._fo.close()
+                raise self._error
+
+        builder = self._build_indexes()
+        indexes = {}
+        for name, index in builder.indexes.items():
+            keys = list(index.keys())
+            indexes[name] = ([encode(k) for k in keys], *self._write_groups(index[k] for k in keys))
+
+        footer = {
+            'segments': self._segments,
+            'rows': self.written_rows,
+            'interned': self._written_interned,
+            'keys': self._written_keys,
+            'objects': self._written_objects,
+            'last_time': last_time,
+            'times_sorted': builder.times_sorted,
+            'indexes': indexes,
+            'records_by_key': self._write_groups(builder.records_by_key),
+            'rows_of_unhashable_values': self._write_array(builder.rows_of_unhashable_values),
+            'stored_object_ids': self._write_array(array('q', sorted(stored_object_ids)))
+        }
+
+        footer_offset = self._write_blob(_dumps(footer))[0]
+        self._fo.seek(0)
+        self._fo.write(_HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS[sys.byteorder], self.segment_size, footer_offset,
+                                    0))
+        self._fo.close()
+
+        # Replace (rather than overwrite) a previous trace, so archives that map it remain valid.
+        os.replace(self._part_path, self.path)
+
+    def _run(self) -> None:
+        while (segment := self._queue.get()) is not None:
+            # After a failure, the rest of the segments are dropped (the error is raised to the recording thread).
+            if self._error is not None:
+                continue
+
+            try:
+                self._write(segment)
+            except BaseException as e:
+                self._error = e
+
+    def _write(self, segment: _Segment) -> None:
+        self._fo.write(_SEGMENT_HEADER.pack(_SEGMENT_TAG, segment.rows[1] - segment.rows[0], len(segment.interned),
+                                            len(segment.keys['key_kinds']), len(segment.objects)))
+        self._segments.append({
+            'rows': segment.rows,
+            'interned': self._write_blob(_dumps([encode(v) for v in segment.interned])),
+            'keys': {name: self._write_array(a) for name, a in segment.keys.items()},
+            'objects': (segment.objects_start, *self._write_heap([_dumps(encode(o)) for o in segment.objects])),
+            'columns': {name: self._write_array(segment.columns[name]) for name, _ in RecordStore.COLUMNS}
+        })
+
+    def _build_indexes(self) -> _IndexBuilder:
+        self._fo.flush()
+        mm = mmap.mmap(self._fo.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return _IndexBuilder.of_trace(mm, self._segments, self._written_objects)
+        finally:
+            mm.close()
+
+    def _align(self) -> int:
+        offset = self._fo.tell()
+        if offset % _ALIGNMENT:
+            self._fo.write(b'\0' * (_ALIGNMENT - offset % _ALIGNMENT))
+        return self._fo.tell()
+
+    def _write_blob(self, blob: bytes) -> Tuple[int, int]:
+        offset = self._align()
+        self._fo.write(_LENGTH.pack(len(blob)))
+        self._fo.write(blob)
+        return offset, len(blob)
+
+    def _write_array(self, a: array) -> Region:
+        offset = self._align()
+        a.tofile(self._fo)
+        return offset, a.typecode, len(a)
+
+    def _write_heap(self, blobs: List[bytes]) -> Tuple[Region, int]:
+        offsets = array('q', [0])
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+
+        offsets_region = self._write_array(offsets)
+        blob_offset = self._align()
+        for blob in blobs:
+            self._fo.write(blob)
+        return offsets_region, blob_offset
+
+    def _write_groups(self, groups: Iterable[array]) -> Tuple[Region, Region]:
+        starts = array('q', [0])
+        rows = array('q')
+        for group in groups:
+            rows.extend(group)
+            starts.append(len(rows))
+        return self._write_array(starts), self._write_array(rows)
+
+
+class _SegmentedColumn(Sequence):
+    """
+        A column that is split between the segments of the trace (all of them, but the last, of the same size).
+    """
+
+    def __init__(self, parts: List[memoryview], segment_size: int):
+        self._parts = parts
+        self._segment_size = segment_size
+        self._length = sum(len(p) for p in parts)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._length))]
+
+        if i < 0:
+            i += self._length
+
+        segment, offset = divmod(i, self._segment_size)
+        return self._parts[segment][offset]
+
+
+class _MappedHeap(Sequence):
+    """
+        The (non-int) values of the trace, decoded on access.
+    """
+
+    def __init__(self, mm: mmap.mmap, segments: List[Tuple[int, memoryview, int]], length: int):
+        self._mm = mm
+        self._starts = [start for start, _, _ in segments]
+        self._segments = segments
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i: int) -> object:
+        start, offsets, blob_offset = self._segments[bisect_right(self._starts, i) - 1]
+        i -= start
+        return decode(_loads(self._mm[blob_offset + offsets[i]:blob_offset + offsets[i + 1]]))
+
+
+class _MappedGroups(Sequence):
+    """
+        Groups of rows, by a dense id (e.g.: the records of every key).
+    """
+
+    def __init__(self, starts: memoryview, rows: memoryview):
+        self._starts = starts
+        self._rows = rows
+
+    def __len__(self) -> int:
+        return len(self._starts) - 1
+
+    def __getitem__(self, i: int) -> memoryview:
+        return self._rows[self._starts[i]:self._starts[i + 1]]
+
+
+class _MappedIndex(object):
+    """
+        A secondary index of the trace, mapping keys to rows.
+    """
+
+    def __init__(self, keys: List[Any], groups: _MappedGroups):
+        self._positions = {k: i for i, k in enumerate(keys)}
+        self._groups = groups
+
+    def get(self, key: Any, default: Any = None):
+        i = self._positions.get(key)
+        return default if i is None else self._groups[i]
+
+    def __getitem__(self, key: Any) -> memoryview:
+        return self._groups[self._positions[key]]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._positions
+
+
+class _SortedIds(object):
+    def __init__(self, ids: memoryview):
+        self._ids = ids
+
+    def __contains__(self, i: int) -> bool:
+        j = bisect_left(self._ids, i)
+        return j < len(self._ids) and self._ids[j] == i
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class _MappedKeys(Sequence):
+    """
+        The keys of the trace, created on first access.
+    """
+
+    def __init__(self, store: 'MappedRecordStore', key_factory: Callable, kind_factory: Callable[[int], Any]):
+        self._store = store
+        self._key_factory = key_factory
+        self._kind_factory = kind_factory
+        self._keys: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._store.key_container_ids)
+
+    def __getitem__(self, i: int) -> Any:
+        key = self._keys.get(i)
+        if key is None:
+            s = self._store
+            key = self._keys[i] = self._key_factory(s.key_container_ids[i], s.interned[s.key_field_ids[i]],
+                                                    s.interned[s.key_stub_ids[i]], self._kind_factory(s.key_kinds[i]))
+        return key
+
+
+class MappedRecordStore(RecordStore):
+    """
+        A read-only RecordStore over a trace file.
+        The columns, the secondary indexes and the value heap are memory mapped, only the intern table and the keys
+        of the indexes are loaded into memory.
+    """
+
+    def __init__(self, path: Union[str, Path], key_factory: Callable[[int, Any, str, Any], Any],
+                 kind_factory: Callable[[int], Any]):
+        # The store is loaded from the trace, so the constructor of RecordStore (that creates empty tables) is not
+        # called.
+        # noinspection PyMissingConstructor
+        self.path: Path = Path(path)
+        self._key_factory = key_factory
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+
+        magic, version, byte_order, segment_size, footer_offset, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise TraceFormatError(f'{self.path} is not a trace file')
+        if version != VERSION:
+            raise TraceFormatError(f'Unsupported trace version {version} (expected {VERSION})')
+        if byte_order != _BYTE_ORDERS[sys.byteorder]:
+            raise TraceFormatError(f'The trace was written on a machine with a different byte order')
+        if footer_offset == 0:
+            raise TraceFormatError(f'The trace {self.path} has not been closed')
+
+        footer = _loads(self._blob(footer_offset))
+        if type(footer) is not dict or not _FOOTER_KEYS <= footer.keys():
+            raise TraceFormatError(f'The footer of the trace {self.path} is malformed')
+        segments = footer['segments']
+
+        # Columns.
+        for name, _ in RecordStore.COLUMNS:
+            setattr(self, name, self._column([s['columns'][name] for s in segments], segment_size))
+
+        # Side tables.
+        self.interned = Interner()
+        for s in segments:
+            self.interned.extend(decode(e) for e in _loads(self._blob(s['interned'][0])))
+        self.objects = _MappedHeap(self._mm, [(start, self._array(offsets), blob_offset) for s in segments for
+                                              (start, offsets, blob_offset) in [s['objects']]], footer['objects'])
+
+        # Keys.
+        for name in RecordStore.KEY_COLUMNS:
+            setattr(self, name, self._column([s['keys'][name] for s in segments], None))
+        self.keys = _MappedKeys(self, key_factory, kind_factory)
+        self._key_ids = None
+        self._records_by_key = _MappedGroups(*map(self._array, footer['records_by_key']))
+
+        # Indexes.
+        self.times_sorted = footer['times_sorted']
+        for name, (keys, starts, rows) in footer['indexes'].items():
+            setattr(self, name, _MappedIndex([decode(k) for k in keys], _MappedGroups(self._array(starts),
+                                                                                       self._array(rows))))
+        self._rows_of_unhashable_values = self._array(footer['rows_of_unhashable_values'])
+        self._rows_by_expression = {}
+        self._expression_indexed_rows = 0
+
+        self.last_time: int = footer['last_time']
+        self.stored_object_ids = _SortedIds(self._array(footer['stored_object_ids']))
+
+    def _blob(self, offset: int) -> bytes:
+        length, = _LENGTH.unpack_from(self._mm, offset)
+        return self._mm[offset + _LENGTH.size:offset + _LENGTH.size + length]
+
+    def _array(self, region: Region) -> memoryview:
+        return _array(self._view, region)
+
+    def _column(self, regions: List[Region], segment_size: Optional[int]) -> Sequence[int]:
+        parts = [self._array(r) for r in regions]
+        if len(parts) == 1:
+            return parts[0]
+
+        if segment_size is None:
+            # Parts of different sizes (e.g.: the keys table), concatenate them.
+            return array(regions[0][1], (x for p in parts for x in p))
+
+        return _SegmentedColumn(parts, segment_size)
+
+    def append(self, *args, **kwargs) -> int:
+        raise TypeError(f'{MappedRecordStore.__name__} is read only')
+
+    def records_of(self, key: Any):
+        if self._key_ids is None:
+            self._key_ids = {(c, f, s, k): i for i, (c, f, s, k) in
+                             enumerate(zip(self.key_container_ids, self.key_field_ids, self.key_stub_ids,
+                                           self.key_kinds))}
+        return super().records_of(key)
+
+
+class _Rows(object):
+    """
+        The records that a SpillingRecordStore has not handed to its writer yet.
+        Has the columns of a RecordStore (by the same names), so records can be viewed with a RecordValueView.
+    """
+
+    def __init__(self, store: 'SpillingRecordStore', start: int, objects_start: int):
+        for name, typecode in RecordStore.COLUMNS:
+            setattr(self, name, array(typecode))
+        self.objects: List[object] = []
+        self.start: int = start
+        self.objects_start: int = objects_start
+        self.keys: List[Any] = store.keys
+        self.interned: Interner = store.interned
+
+    def value_at(self, index: int) -> object:
+        slot = self.value_slots[index]
+        return slot if self.value_tags[index] == _INLINE else self.objects[slot - self.objects_start]
+
+
+class SpillingRecordStore(RecordStore):
+    """
+        A write-only RecordStore that keeps only the records that have not been written to a trace yet.
+        Every segment is taken by a TraceWriter and dropped from memory, so recording a long program takes the memory
+        of a segment (and of the intern and keys tables) rather than of all of its records.
+        The records are queried by reopening the trace (see MappedRecordStore).
+    """
+
+    def __init__(self, key_factory: Callable[[int, Any, str, Any], Any]):
+        # Only the side tables and the keys are kept, the columns (and the indexes) are kept by the trace.
+        # noinspection PyMissingConstructor
+        self._key_factory = key_factory
+
+        # Side tables.
+        self.interned: Interner = Interner()
+
+        # Keys.
+        self.keys: List[Any] = []
+        self.key_container_ids: array = array('q')
+        self.key_field_ids: array = array('q')
+        self.key_stub_ids: array = array('q')
+        self.key_kinds: array = array('q')
+        self._key_ids: Dict[Tuple[int, int, int, int], int] = {}
+
+        self._rows: _Rows = _Rows(self, 0, 0)
+
+        # The last records that have been taken, records are taken right after they are appended so they are still
+        # viewed by who appended them.
+        self._taken_rows: Optional[_Rows] = None
+
+    def append(self, container_id: int, field: Any, stub_name: str, kind: Any, rtype: type, value: object,
+               expression: str, line_no: int, time: Time, extra: Any) -> int:
+        interned = self.interned
+        field_id = interned.intern(field)
+        stub_id = interned.intern(stub_name)
+
+        key_lookup = container_id, field_id, stub_id, kind.value
+        key_id = self._key_ids.get(key_lookup)
+        if key_id is None:
+            key_id = self._key_ids[key_lookup] = len(self.keys)
+            self.keys.append(self._key_factory(container_id, field, stub_name, kind))
+            self.key_container_ids.append(container_id)
+            self.key_field_ids.append(field_id)
+            self.key_stub_ids.append(stub_id)
+            self.key_kinds.append(kind.value)
+
+        rows = self._rows
+        index = rows.start + len(rows.times)
+        rows.times.append(time)
+        rows.container_ids.append(container_id)
+        rows.field_ids.append(field_id)
+        rows.stub_ids.append(stub_id)
+        rows.kinds.append(kind.value)
+        rows.rtype_ids.append(interned.intern(rtype))
+        if type(value) is int and _INT64_MIN <= value <= _INT64_MAX:
+            rows.value_tags.append(_INLINE)
+            rows.value_slots.append(value)
+        else:
+            rows.value_tags.append(_BOXED)
+            rows.value_slots.append(rows.objects_start + len(rows.objects))
+            rows.objects.append(value)
+        rows.expression_ids.append(interned.intern(expression))
+        rows.line_nos.append(line_no)
+        rows.extra_ids.append(interned.intern(extra))
+        rows.key_ids.append(key_id)
+
+        return index
+
+    def take_segment(self, start: int, objects_start: int) -> Tuple[Dict[str, array], List[object]]:
+        rows = self._rows
+        if start != rows.start or objects_start != rows.objects_start:
+            raise ValueError(f'Records before {rows.start} have already been taken')
+
+        self._rows = _Rows(self, len(self), rows.objects_start + len(rows.objects))
+        self._taken_rows = rows
+        return {name: getattr(rows, name) for name, _ in RecordStore.COLUMNS}, rows.objects
+
+    def view(self, index: int) -> RecordValueView:
+        """
+            View a record that has just been appended (either not taken yet, or taken by the last segment).
+            The view remains valid after its record is taken.
+        """
+        rows = self._rows
+        if index < rows.start:
+            rows = self._taken_rows
+            if rows is None or index < rows.start:
+                raise IndexError(f'Record {index} has already been taken')
+
+        return RecordValueView(rows, index - rows.start)
+
+    def __len__(self) -> int:
+        return self._rows.start + len(self._rows.times)
@@ -1,6 +1,9 @@
 import ast
+from types import CodeType
 from typing import *
 
+from utils.lru_cache import LRUCache
+
 LiteralTypes = [int, float, str, bool, complex]
 AnyLiteralType = NewType('AnyLiteralType', Union[int, float, str, bool, complex])
 
@@ -25,6 +28,23 @@ def str2ast(s: str):
     return ast.parse(s).body[0]
 
 
+# The compiled expressions, by their text (see compile_expression).
+_COMPILED_EXPRESSIONS = LRUCache(4096)
+
+
+def compile_expression(s: str) -> CodeType:
+    """
+        The code of expression s (for eval), which is compiled once for each expression.
+    """
+    code = _COMPILED_EXPRESSIONS.get(s)
+    if code is None:
+        # eval strips the spaces and tabs around expressions that are given as text.
+        code = compile(s.strip(' \t'), '<string>', 'eval')
+        _COMPILED_EXPRESSIONS.put(s, code)
+
+    return code
+
+
 def is_of(s: str, t: Type) -> bool:
     parsed = str2ast(s)
     return type(parsed) is ast.Expr and isinstance(parsed.value, t)
@@ -83,8 +103,8 @@ def is_tuple(s: str) -> bool:
     return len(split_tuple(s)) > 1
 
 
-def split_tuple(s: str) -> List[str]:
-    node = ast.parse(s).body[0]
+def split_tuple(s: Union[str, ast.AST]) -> List[str]:
+    node = ast.parse(s).body[0] if isinstance(s, str) else s
     if not isinstance(node, ast.Expr):
         return []
 
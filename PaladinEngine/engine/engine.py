@@ -123,10 +123,13 @@ class PaLaDiNEngine(object):
         archive: Archive
         thrown_exception: Optional['PaLaDiNEngine.PaladinRunExceptionData']
 
-    def __init__(self, source_path: Union[str, Path], timeout: int = -1, record: bool = True):
+    def __init__(self, source_path: Union[str, Path], timeout: int = -1, record: bool = True,
+                 trace_path: Optional[Union[str, Path]] = None, spill: bool = False):
         self.source_path: Path = source_path if isinstance(source_path, Path) else Path(source_path)
         self.file_name: str = self.source_path.name
         self.timeout: int = timeout
+        self.trace_path: Optional[Path] = Path(trace_path) if trace_path is not None else None
+        self.spill: bool = spill
         self.output_capture: Optional[StringIO] = StringIO() if record else None
         with open(source_path, 'r') as f:
             self.source_code: str = f.read()
@@ -232,6 +235,8 @@ class PaLaDiNEngine(object):
                 signal.alarm(self.timeout)
 
             archive.reset()
+            if self.trace_path is not None:
+                archive.record_to(self.trace_path, spill=self.spill)
 
             if self.output_capture is not None:
                 self.output_capture = StringIO()
@@ -250,9 +255,18 @@ class PaLaDiNEngine(object):
                         e.line_no if isinstance(e, PaladinTimeoutError) else -1)
         finally:
             output = self.output_capture.getvalue() if self.output_capture is not None else ''
+            archive.close_trace()
 
         self._run_data = PaLaDiNEngine.PaladinRunData(output, archive, thrown_exception)
 
+    def load_trace(self, trace_path: Union[str, Path]):
+        """
+            Load the run data from a trace file (that has been written by a previous run), instead of executing.
+        :param trace_path: The path of the trace file.
+        :return:
+        """
+        self._run_data = PaLaDiNEngine.PaladinRunData('', Archive.from_trace(trace_path), None)
+
     def update_source_code(self, updated_source_code: str):
         with open(self.source_path, 'w') as f:
             f.write(updated_source_code)
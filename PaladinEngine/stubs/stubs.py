@@ -45,6 +45,10 @@ def __AC__(obj: object, attr: str, expr: str, locals: dict, globals: dict, line_
 
 
 def __ARG__(func_name: str, frame, line_no: int, **kwargs):
+    if func_name.split('.')[-1] == '__init__' and kwargs:
+        # The first arg is the object that is initialized.
+        archive.init_object(next(iter(kwargs.values())))
+
     time = -1
     for arg, value in kwargs.items():
         rv = archive.store_new \
@@ -72,16 +76,20 @@ def __AS__(expression: str, target: str, locals: dict, globals: dict, frame, lin
 def __BMFCS__(func_stub_wrapper, caller: object, caller_str: str, func_name: str, line_no: int, frame,
               locals, globals, arg: Optional[object] = EMPTY):
     if BuiltinCollectionsUtils.is_builtin_collection_method(caller):
-        rv = archive.store_new \
-            .key(id(caller), func_name, __BMFCS__.__name__, Archive.Record.StoreKind.BUILTIN_MANIP) \
-            .value(type(caller), (type(arg), (POID(arg) if arg != EMPTY else EMPTY)), caller_str, line_no)
+        time = -1
 
-        # Store args that are temporary objects.
+        # Store args that are temporary objects (before they are referred by the manipulation).
         # E.g.: l.add(Animal(...))
-        if not ISP(type(arg)) and not id(arg) in [id(x) for x in {**locals, **globals}.values()] and arg != EMPTY:
-            __store(id(frame), '', line_no, id(arg), arg, locals, globals, __BMFCS__, rv.time,
+        if archive.should_record and not ISP(type(arg)) and \
+                not id(arg) in [id(x) for x in {**locals, **globals}.values()] and arg != EMPTY:
+            time = archive.time
+            __store(id(frame), '', line_no, id(arg), arg, locals, globals, __BMFCS__, time,
                     Archive.Record.StoreKind.UNAMED_OBJECT)
 
+        archive.store_new \
+            .key(id(caller), func_name, __BMFCS__.__name__, Archive.Record.StoreKind.BUILTIN_MANIP) \
+            .value(type(caller), (type(arg), (POID(arg) if arg != EMPTY else EMPTY)), caller_str, line_no, time)
+
     return func_stub_wrapper
 
 
@@ -93,6 +101,7 @@ def __BREAK__(line_no: int, frame):
 
 
 def __DEF__(func_name: str, line_no: int, frame):
+    archive.new_frame(frame)
     archive.store_new \
         .key(id(frame), func_name, __DEF__.__name__) \
         .value(type(lambda _: _), func_name, func_name, line_no)
@@ -340,14 +349,13 @@ def __store(container_id, field, line_no, target, value, locals, globals,
     stored_objects = set()
 
     value_to_store = POID(value)
-    value_exists = archive.exists(value_to_store)
+    value_exists = archive.is_stored_object(value)
 
-    rv = archive.store_new \
-        .key(container_id, field, stub.__name__, kind) \
-        .value(type(value), value_to_store, str(target), line_no, extra=extra)
-
-    if _time is not None:
-        rv.time = _time
+    time = -1 if _time is None else _time
+    if archive.should_record:
+        # The record takes its own tick of the archive's clock, even if it is stored with the given time.
+        tick = archive.time
+        time = tick if _time is None else _time
 
     def _store_inner(v: object) -> None:
         if id(v) in stored_objects:
@@ -358,16 +366,19 @@ def __store(container_id, field, line_no, target, value, locals, globals,
         if ISP(type(v)) or v is None or issubclass(type(v), type):
             return None
 
+        # Before v is referred by the records of its container (see Archive.new_object).
+        archive.new_object(v, line_no, time)
+
         if type(v) in [list, tuple, set, deque]:
-            return _store_lists_tuples_deques_and_sets(v)
+            _store_lists_tuples_deques_and_sets(v)
 
-        if issubclass(type(v), dict):
-            return _store_dicts(id(v), v)
+        elif issubclass(type(v), dict):
+            _store_dicts(id(v), v)
 
-        if not hasattr(v, '__dict__'):
-            return None
+        elif hasattr(v, '__dict__'):
+            _store_dicts(id(v), v.__dict__)
 
-        return _store_dicts(id(v), v.__dict__)
+        archive.remember(v)
 
     def _store_lists_tuples_deques_and_sets(v: Union[List, Tuple, Set]):
 
@@ -375,24 +386,28 @@ def __store(container_id, field, line_no, target, value, locals, globals,
             # Empty collection.
             archive.store_new \
                 .key(id(v), '', __AS__.__name__, Archive.Record.StoreKind.kind_by_type(type(v))) \
-                .value(NoneType, EMPTY_COLLECTION, '', line_no, time=rv.time)
+                .value(NoneType, EMPTY_COLLECTION, '', line_no, time=time)
             return
 
         for index, item in enumerate(v):
+            _store_inner(item)
+
             archive.store_new \
                 .key(id(v), index, __AS__.__name__, Archive.Record.StoreKind.kind_by_type(type(v))) \
-                .value(type(item), POID(item), f'{type(v)}[{index}]', line_no, time=rv.time)
-
-            _store_inner(item)
+                .value(type(item), POID(item), f'{type(v)}[{index}]', line_no, time=time)
 
     def _store_dicts(d_id: int, d: Dict):
         for k, v in d.items():
-            archive.store_new \
-                .key(d_id, POID(k), __AS__.__name__, Archive.Record.StoreKind.DICT_ITEM) \
-                .value((type(k), type(v)), POID(v), f'{id(d)}[{POID(k)}] = {POID(v)}', line_no, time=rv.time)
-
             _store_inner(k)
             _store_inner(v)
 
+            archive.store_new \
+                .key(d_id, POID(k), __AS__.__name__, Archive.Record.StoreKind.DICT_ITEM) \
+                .value((type(k), type(v)), POID(v), f'{id(d)}[{POID(k)}] = {POID(v)}', line_no, time=time)
+
     if not ISP(type(value)) and not id(value) in {id(x) for x in stored_objects} and (kind == Archive.Record.StoreKind.FUNCTION_CALL or not value_exists):
         _store_inner(value)
+
+    archive.store_new \
+        .key(container_id, field, stub.__name__, kind) \
+        .value(type(value), value_to_store, str(target), line_no, time=time, extra=extra)
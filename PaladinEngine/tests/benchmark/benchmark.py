@@ -12,6 +12,7 @@ from time import time
 from typing import List, Optional, Tuple, Callable, Iterable, Type
 
 from archive.archive_evaluator.paladin_native_parser import PaladinNativeParser
+from archive.object_builder.checkpoint_object_builder.checkpoint_object_builder import CheckpointObjectBuilder
 from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
 from archive.object_builder.naive_object_builder.naive_object_builder import NaiveObjectBuilder
 from engine.engine import PaLaDiNEngine
@@ -47,8 +48,10 @@ class Benchmarker(ABC):
     def benchmark_tests(self) -> Iterable[Callable]:
         return [self.source_line_count, self.instrument, self.clean, self.pdb, self.pdb_cond,
                 self.paladin, self.log_queries_count,
-                self.log_construction_diff, self.log_diff_size, self.log_query_diff, self.log_construction_recursive,
-                self.log_query_recursive]
+                self.log_construction_diff, self.log_diff_size, self.log_query_diff, self.log_build_cache_hit_rate,
+                self.log_construction_recursive,
+                self.log_query_recursive, self.log_construction_checkpoint, self.log_checkpoint_size,
+                self.log_query_checkpoint]
 
     def benchmark(self, progs: List[str | Path]):
         try:
@@ -136,10 +139,24 @@ class Benchmarker(ABC):
     def log_diff_size(self):
         return self.parser.builder.size
 
+    def log_build_cache_hit_rate(self):
+        return self.parser.builder.build_cache.hit_rate
+
     @TimedTest
     def log_query_recursive(self):
         return self._query()
 
+    @TimedTest
+    def log_construction_checkpoint(self):
+        return self._log_construction(CheckpointObjectBuilder)
+
+    def log_checkpoint_size(self):
+        return self.parser.builder.size
+
+    @TimedTest
+    def log_query_checkpoint(self):
+        return self._query()
+
     def _log_construction(self, object_builder_type: Type):
         self.parser = PaladinNativeParser(self.engine.run_data.archive, object_builder_type,
                                           should_time_builder_construction=True, parallel=False)
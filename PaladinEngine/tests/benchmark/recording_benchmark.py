@@ -0,0 +1,127 @@
+import argparse
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from time import time
+from typing import List, Tuple
+
+from archive.archive import Archive
+from engine.engine import PaLaDiNEngine
+
+SIZES = [500, 1000, 2000, 4000]
+REPEAT_COUNT = 3
+STORE_COUNT = 100000
+
+# The allowed growth of the recording time per record between the smallest and the largest program.
+# A linear recording should stay around 1.0, a quadratic one would grow with the ratio between the sizes.
+MAX_GROWTH = 2.0
+
+PROGRAM_TEMPLATE = '''
+class Node(object):
+    def __init__(self, value):
+        self.value = value
+        self.next = None
+
+
+def main():
+    head = None
+    total = 0
+    for i in range({size}):
+        node = Node(i)
+        node.next = head
+        head = node
+        total = total + i
+
+
+if __name__ == '__main__':
+    main()
+'''
+
+
+class RecordingBenchmarker(object):
+    """
+        Measures the time it takes to record programs with a growing number of assignments.
+    """
+
+    def __init__(self, sizes: List[int], repeat_count: int = REPEAT_COUNT):
+        self.sizes = sizes
+        self.repeat_count = repeat_count
+
+    def benchmark(self) -> List[Tuple[int, int, float]]:
+        results = []
+        with tempfile.TemporaryDirectory() as d:
+            for size in self.sizes:
+                prog = Path(d).joinpath(f'recording_{size}.py')
+                prog.write_text(PROGRAM_TEMPLATE.format(size=size))
+                results.append((size, *self._measure(PaLaDiNEngine(prog))))
+
+        return results
+
+    def _measure(self, engine: PaLaDiNEngine) -> Tuple[int, float]:
+        best_time = None
+        for _ in range(self.repeat_count):
+            start_time = time()
+            with redirect_stdout(StringIO()):
+                engine.execute_with_paladin()
+            end_time = time()
+            best_time = end_time - start_time if best_time is None else min(best_time, end_time - start_time)
+
+        return len(engine.run_data.archive.records), best_time
+
+    def store_overhead(self, count: int = STORE_COUNT) -> float:
+        """
+            The time (in seconds) it takes a stub to store a single record in the archive.
+        """
+        best_time = None
+        for _ in range(self.repeat_count):
+            archive = Archive()
+            start_time = time()
+            for i in range(count):
+                archive.store_new.key(i, 'value', '__AS__').value(int, i, 'node.value', 1)
+            end_time = time()
+            best_time = end_time - start_time if best_time is None else min(best_time, end_time - start_time)
+
+        return best_time / count
+
+    @staticmethod
+    def growth(results: List[Tuple[int, int, float]]) -> float:
+        """
+            The ratio between the recording time per record of the largest and the smallest program.
+        """
+        _, first_records, first_time = results[0]
+        _, last_records, last_time = results[-1]
+        return (last_time / last_records) / (first_time / first_records)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-s', '--sizes', type=int, nargs='+', help='Loop sizes of the recorded programs',
+                        default=SIZES)
+    parser.add_argument('-r', '--repeat', type=int, help='Repeat count of every measurement', default=REPEAT_COUNT)
+    args = parser.parse_args()
+
+    return args
+
+
+def main():
+    args = parse_args()
+    b = RecordingBenchmarker(sorted(args.sizes), args.repeat)
+    results = b.benchmark()
+
+    print(f'{"size":>10}{"records":>10}{"time[s]":>12}{"us/record":>12}')
+    for size, records, t in results:
+        print(f'{size:>10}{records:>10}{t:>12.3f}{10 ** 6 * t / records:>12.2f}')
+
+    print(f'Store overhead: {10 ** 6 * b.store_overhead():.2f} us/record')
+
+    growth = b.growth(results)
+    print(f'Growth of the recording time per record: {growth:.2f}')
+    if growth > MAX_GROWTH:
+        print(f'Recording is not linear (growth > {MAX_GROWTH}).')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+import random
+import unittest
+from collections import OrderedDict
+from functools import reduce
+from typing import List
+
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult, EvalResultEntry, \
+    EvalResultPair, Replacement
+
+
+def _group_by_scan(entries: List[EvalResultEntry], keys) -> dict:
+    """
+        The previous (per time) implementation of EvalResult.group, as a reference.
+    """
+    create_results_dict = lambda e: {k: e[k].value if e[k] else None for k in keys}
+    res = {}
+    rng = []
+    vals = None
+    for e in sorted(entries, key=lambda e: e.time):
+        if not vals:
+            vals = create_results_dict(e)
+            rng.append(e.time)
+            continue
+
+        new_vals = create_results_dict(e)
+        if new_vals == vals:
+            rng.append(e.time)
+            continue
+
+        res[str((min(rng), max(rng)))] = vals
+        vals = new_vals
+        rng = [e.time]
+
+    if rng and vals:
+        res[str((min(rng), max(rng)))] = vals
+
+    return {k: v for k, v in res.items() if not all([vv is None for vv in v.values()])}
+
+
+def _join_by_scan(r1: EvalResult, r2: EvalResult) -> EvalResult:
+    """
+        The previous (per time) implementation of EvalResult.join, as a reference.
+    """
+    if not r1:
+        return r2
+
+    if not r2:
+        return r1
+
+    r1_time_mapped = {e.time: e for e in r1}
+    r2_time_mapped = {e.time: e for e in r2}
+    results = []
+    for t in sorted({*r1_time_mapped, *r2_time_mapped}):
+        if t in r1_time_mapped and t in r2_time_mapped:
+            results.append(EvalResultEntry.join(r1_time_mapped[t], r2_time_mapped[t]))
+        elif t not in r2_time_mapped:
+            results.append(r1_time_mapped[t].extend_with_empty_keys(r2.all_keys()))
+        else:
+            results.append(r2_time_mapped[t].extend_with_empty_keys(r1.all_keys()))
+
+    return EvalResult(results)
+
+
+class TestEvalResult(unittest.TestCase):
+    MAX_TIME = 40
+
+    @staticmethod
+    def _random_entries(rnd: random.Random) -> List[EvalResultEntry]:
+        keys = rnd.sample(['x', 'y', 'z'], rnd.randint(1, 2))
+        times = sorted(rnd.sample(range(TestEvalResult.MAX_TIME), rnd.randint(0, TestEvalResult.MAX_TIME)))
+        entries = []
+        value = 0
+        for t in times:
+            if rnd.random() < 0.3:
+                value = rnd.choice([None, False, 0, 1, 2])
+            entries.append(EvalResultEntry(t, [EvalResultPair(k, value) for k in keys], []))
+        return entries
+
+    @staticmethod
+    def _items(entries) -> list:
+        return [(e.time, e.items) for e in entries]
+
+    def test_against_entries(self):
+        for seed in range(300):
+            rnd = random.Random(seed)
+            entries = self._random_entries(rnd)
+            result = EvalResult(reversed(entries))
+            by_time = {e.time: e for e in entries}
+            msg = f'seed={seed}'
+
+            self.assertEqual(self._items(entries), self._items(result), msg=msg)
+            self.assertEqual(len(entries), len(result), msg=msg)
+            self.assertLessEqual(len(list(result.runs())), len(entries), msg=msg)
+            self.assertEqual([e.time for e in entries], result.times(), msg=msg)
+            self.assertEqual(_group_by_scan(entries, result.all_keys()), result.group(), msg=msg)
+            self.assertEqual([e.time for e in entries if e.satisfies()], result.satisfaction_times(), msg=msg)
+            self.assertEqual(self._items(EvalResult(EvalResult(entries))), self._items(entries), msg=msg)
+
+            for t in range(-1, self.MAX_TIME + 1):
+                expected = by_time[t].items if t in by_time else [(k, None) for k in result.all_keys()]
+                self.assertEqual(expected, result[t].items, msg=f'{msg}, t={t}')
+
+                # The latest entry stays the same until the change time.
+                latest, change_time = result.latest(t)
+                previous = [e for e in entries if e.time <= t]
+                self.assertEqual(previous[-1].items if previous else None, latest.items if latest else None,
+                                 msg=f'{msg}, t={t}')
+                for tt in range(t, min(change_time, self.MAX_TIME + 1)):
+                    later, _ = result.latest(tt)
+                    self.assertEqual(latest.items if latest else None, later.items if later else None,
+                                     msg=f'{msg}, t={t}, tt={tt}')
+
+    def test_runs_of_operators(self):
+        for seed in range(300):
+            rnd = random.Random(seed)
+            r1, r2 = EvalResult(self._random_entries(rnd)), EvalResult(self._random_entries(rnd))
+            msg = f'seed={seed}'
+
+            self.assertEqual([(e1.time, e1.items, e2.items) for e1, e2 in zip(r1, r2)],
+                             [(t, e1.items, e2.items) for start, end, e1, e2 in EvalResult.zip_runs(r1, r2)
+                              for t in range(start, end) if e1.time == start], msg=msg)
+            self.assertEqual(min(len(r1), len(r2)), sum(end - start for start, end, _, _ in EvalResult.zip_runs(r1, r2)),
+                             msg=msg)
+
+            times = sorted(rnd.sample(range(self.MAX_TIME), rnd.randint(0, self.MAX_TIME)))
+            segments = list(EvalResult.segments(times, r1, r2))
+            self.assertEqual(times, [t for start, end in segments for t in range(start, end)], msg=msg)
+            for start, end in segments:
+                for t in range(start, end):
+                    self.assertEqual((r1[start].items, r2[start].items), (r1[t].items, r2[t].items),
+                                     msg=f'{msg}, t={t}')
+
+    def test_join_all(self):
+        for seed in range(300):
+            rnd = random.Random(seed)
+            results = [EvalResult(self._random_entries(rnd)) for _ in range(rnd.randint(0, 4))]
+            if rnd.random() < 0.5:
+                results.insert(0, EvalResult.empty(range(5, 30)))
+
+            expected = reduce(_join_by_scan, results, EvalResult())
+            joined = EvalResult.join_all(results)
+            self.assertEqual([(e.time, e.items) for e in expected], [(e.time, e.items) for e in joined],
+                             msg=f'seed={seed}')
+            self.assertEqual(list(expected.all_keys()), list(joined.all_keys()), msg=f'seed={seed}')
+
+    def test_hash(self):
+        # Equal results (that are made separately) have equal hashes.
+        for seed in range(100):
+            entries = self._random_entries(random.Random(seed))
+            r1, r2 = EvalResult(entries), EvalResult(list(entries))
+            self.assertEqual(r1, r2)
+            self.assertEqual(hash(r1), hash(r2), msg=f'seed={seed}')
+
+    def test_sliced(self):
+        for seed in range(300):
+            rnd = random.Random(seed)
+            entries = self._random_entries(rnd)
+            start, end = sorted(rnd.sample(range(-1, self.MAX_TIME + 2), 2))
+            self.assertEqual(self._items(e for e in entries if start <= e.time < end),
+                             self._items(EvalResult(entries).sliced(start, end)), msg=f'seed={seed}')
+
+    def test_satisfaction_ranges(self):
+        for seed in range(300):
+            rnd = random.Random(seed)
+            entries = self._random_entries(rnd)
+            result = EvalResult(entries)
+            by_time = {e.time: e for e in entries}
+            for all_times in [None, sorted(rnd.sample(range(self.MAX_TIME), rnd.randint(0, self.MAX_TIME))),
+                              range(5, 30)]:
+                times = [e.time for e in entries] if all_times is None else all_times
+                satisfied = [t for t in times if t in by_time and by_time[t].satisfies()]
+                # Consecutive times of all_times are in the same range.
+                expected = []
+                for t in satisfied:
+                    if expected and expected[-1][-1] == t - 1:
+                        expected[-1].append(t)
+                    else:
+                        expected.append([t])
+
+                self.assertEqual([range(r[0], r[-1] + 1) for r in expected], result.satisfaction_ranges(all_times),
+                                 msg=f'seed={seed}, all_times={all_times}')
+
+    def test_sparse_and_dense_times(self):
+        for times in [[5, 1000, 1001, 5000], [*range(3, 100), *range(120, 200)]]:
+            result = EvalResult(EvalResultEntry(t, [EvalResultPair('x', t)], []) for t in times)
+            for t in range(-1, max(times) + 2):
+                self.assertEqual([('x', t if t in times else None)], result[t].items, msg=f't={t}')
+
+    def test_const(self):
+        times = [*range(3, 8), 10, *range(12, 20)]
+        const = EvalResult.create_const(times, 'c', 5)
+        self.assertEqual(3, len(list(const.runs())))
+        self.assertEqual([(t, [('c', 5)]) for t in times], self._items(const))
+        self.assertEqual({'(3, 19)': {'c': 5}}, const.group())
+        self.assertEqual(OrderedDict.fromkeys(['c']).keys(), const.all_keys())
+
+
+class TestEvalResultEntry(unittest.TestCase):
+    def test_access(self):
+        e = EvalResultEntry(3, [EvalResultPair('x@7', 1), EvalResultPair('y', None), EvalResultPair('x@7', 2)])
+        self.assertEqual(['x@7', 'y'], e.keys)
+        self.assertEqual([('x@7', 1), ('y', None), ('x@7', 2)], e.items)
+        self.assertEqual(EvalResultPair('x@7', 1), e['x@7'])
+        self.assertIsNone(e['z'])
+        # The attributes are of the last values.
+        self.assertEqual((2, 2, None), (e.x, e.x_7, e.y))
+        self.assertEqual({'x_7': 2, 'x': 2, 'y': None}, e.as_dict())
+        self.assertIn('x', e)
+        with self.assertRaises(AttributeError):
+            _ = e.z
+
+        self.assertFalse(e.satisfies())
+        self.assertFalse(EvalResultEntry.empty(3))
+        self.assertIs(e.schema, EvalResultEntry(4, e.evaled_results).schema)
+        self.assertEqual(e, e.at(5))
+
+    def test_join(self):
+        e1 = EvalResultEntry(1, [EvalResultPair('a', 1), EvalResultPair('b', None), EvalResultPair('c', 3)])
+        e2 = EvalResultEntry(1, [EvalResultPair('c', 4), EvalResultPair('d', 5), EvalResultPair('b', 6)])
+        self.assertEqual([('a', 1), ('d', 5), ('b', 6), ('c', 3)], EvalResultEntry.join(e1, e2).items)
+        self.assertEqual([('d', 5), ('a', 1), ('c', 4), ('b', 6)], EvalResultEntry.join(e2, e1).items)
+        self.assertEqual([('b', None), ('c', 3), ('e', None), ('a', 1)], e1.extend_with_empty_keys(['e', 'a']).items)
+        self.assertEqual([], EvalResultEntry.join(e1, e2.at(2)).items)
+
+    def test_rename_key(self):
+        rep = [Replacement('x', 1, 0)]
+        result = EvalResult([EvalResultEntry(t, [EvalResultPair('op_x', t // 2), EvalResultPair('y', 0)], rep)
+                             for t in range(6)])
+        entries = list(result)
+        result.rename_key('x', 'op_x')
+        self.assertEqual([(t, [('y', 0), ('x', t // 2)]) for t in range(6)], [(e.time, e.items) for e in result])
+        self.assertEqual(['y', 'x'], list(result.all_keys()))
+        self.assertTrue(all(e.replacements is rep for e in result))
+        # Entries taken before renaming stay the same.
+        self.assertEqual(['op_x', 'y'], entries[0].keys)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import math
+import random
+import unittest
+
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Scope
+from utils.range_dict import RangeDict
+
+
+def _closest_by_scan(scope: Scope, time: int):
+    """
+        The previous (linear) implementation of Scope.get_data_by_time, as a reference.
+    """
+    proximity_list = filter(lambda i: i[0] is not None,
+                            [(rd.get_closest(time)[1], rd) for rd in scope.data.values()])
+    min_diff = math.inf
+    closest = None
+    for t, data in proximity_list:
+        diff = abs(t - time)
+        if diff < min_diff:
+            closest = data
+            min_diff = diff
+
+    return closest
+
+
+class TestScope(unittest.TestCase):
+    MAX_TIME = 60
+
+    def test_against_scan(self):
+        for seed in range(200):
+            rnd = random.Random(seed)
+            scope = Scope(1)
+            for container_id in range(rnd.randint(0, 12)):
+                rd = RangeDict(self.MAX_TIME)
+                # Containers (e.g.: frames of recursive calls) may start at the same time.
+                for t in sorted(rnd.sample(range(self.MAX_TIME), rnd.randint(0, 4))):
+                    rd[t] = rnd.choice([None, container_id])
+                scope.add_data(container_id, rd)
+
+                for time in range(-1, self.MAX_TIME + 1):
+                    self.assertIs(_closest_by_scan(scope, time), scope.get_data_by_time(time),
+                                  msg=f'seed={seed}, time={time}')
+
+                    # The data that is found stays the same in the whole range.
+                    data, start, end = scope.get_data_and_range_by_time(time)
+                    self.assertTrue(start <= time < end)
+                    for t in range(max(start, -1), min(end, self.MAX_TIME + 1)):
+                        self.assertIs(data, scope.get_data_by_time(t), msg=f'seed={seed}, time={time}, t={t}')
+
+
+if __name__ == '__main__':
+    unittest.main()
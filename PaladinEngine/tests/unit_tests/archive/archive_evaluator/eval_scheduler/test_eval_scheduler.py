@@ -0,0 +1,110 @@
+import os
+import threading
+import unittest
+
+from archive.archive import Archive
+from archive.archive_evaluator.eval_scheduler import EvalScheduler
+
+
+class _Builder(object):
+    """
+        Keeps the items it has built as its work (see ObjectBuilder.take_work).
+    """
+
+    def __init__(self):
+        self.archive = Archive()
+        self.work = None
+        self.adopted = []
+
+    def build(self, item):
+        if self.work is not None:
+            self.work.append(item)
+        return item
+
+    def track_work(self):
+        if self.work is None:
+            self.work = []
+
+    def take_work(self):
+        work, self.work = self.work, []
+        return work
+
+    def adopt_work(self, work):
+        self.adopted.extend(work)
+
+
+class TestEvalScheduler(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheduler = EvalScheduler(2, min_parallel_size=0)
+        if not self.scheduler.is_parallel:
+            self.skipTest('Forking processes is not supported')
+
+    def test_map(self):
+        # The function refers to an object that can't be pickled, which the workers share by forking.
+        lock = threading.Lock()
+        results = self.scheduler.map(lambda i: (i * i, os.getpid(), lock.locked()), range(10))
+        self.assertEqual([i * i for i in range(10)], [r for r, _, _ in results])
+        self.assertNotIn(os.getpid(), {pid for _, pid, _ in results})
+
+    def test_map_chunks(self):
+        # The chunks are smaller than a worker's share, for the workers to share the work.
+        results = self.scheduler.map_chunks(lambda chunk: [(t, chunk[0], os.getpid()) for t in chunk], range(16))
+        self.assertEqual([(t, t - t % 2) for t in range(16)], [(t, first) for t, first, _ in results])
+        self.assertNotIn(os.getpid(), {pid for _, _, pid in results})
+        self.assertEqual((8, 1, 0), (self.scheduler.metrics.tasks, self.scheduler.metrics.forked_maps,
+                                     self.scheduler.metrics.serial_maps))
+        self.assertGreater(self.scheduler.metrics.queue_wait, 0)
+
+    def test_serial(self):
+        for scheduler, items in [(EvalScheduler(2, min_parallel_size=100), range(10)), (self.scheduler, [1]),
+                                 (EvalScheduler(1, min_parallel_size=0), range(10))]:
+            self.assertEqual({os.getpid()}, set(scheduler.map(lambda _: os.getpid(), items)))
+            self.assertEqual((0, 1), (scheduler.metrics.tasks, scheduler.metrics.serial_maps))
+
+        # No workers are forked by a process with other threads.
+        event = threading.Event()
+        thread = threading.Thread(target=event.wait)
+        thread.start()
+        scheduler = EvalScheduler(2, min_parallel_size=0)
+        try:
+            self.assertEqual({os.getpid()}, set(scheduler.map(lambda _: os.getpid(), range(10))))
+        finally:
+            event.set()
+            thread.join()
+        self.assertEqual((0, 1), (scheduler.metrics.tasks, scheduler.metrics.serial_maps))
+
+        # A nested map runs in the worker of the outer map.
+        results = self.scheduler.map(lambda _: (os.getpid(), self.scheduler.map(lambda _: os.getpid(), range(3))),
+                                     range(2))
+        self.assertTrue(all({pid} == set(inner) for pid, inner in results))
+
+    def test_metrics_of_threads(self):
+        # Each thread has metrics of its own.
+        scheduler = EvalScheduler(1)
+        thread_metrics = []
+        thread = threading.Thread(target=lambda: (scheduler.map(abs, range(3)),
+                                                  thread_metrics.append(scheduler.metrics)))
+        thread.start()
+        thread.join()
+        self.assertEqual(1, thread_metrics[0].serial_maps)
+        self.assertEqual(0, scheduler.metrics.serial_maps)
+
+    def test_results_that_cannot_be_sent(self):
+        results = self.scheduler.map(lambda i: lambda: i, range(4))
+        self.assertEqual(list(range(4)), [r() for r in results])
+        self.assertEqual(4, self.scheduler.metrics.fallbacks)
+
+        with self.assertRaises(ZeroDivisionError):
+            self.scheduler.map(lambda i: 1 / i, range(-2, 2))
+
+    def test_builder_work(self):
+        # The work of the builder in the workers is kept by the builder of the calling process.
+        builder = _Builder()
+        scheduler = EvalScheduler(2, min_parallel_size=0, builder=builder)
+        self.assertEqual([i * 2 for i in range(6)], scheduler.map(lambda i: builder.build(i) * 2, range(6)))
+        self.assertEqual(list(range(6)), sorted(builder.adopted))
+        self.assertIsNone(builder.work)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,11 +4,14 @@ from abc import ABC
 from itertools import chain
 from pathlib import Path
 from typing import Tuple, Any, Iterator, Optional
+from unittest.mock import patch
 
 import pytest
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time
+from archive.archive_evaluator.paladin_dsl_semantics import Changed
 from archive.archive_evaluator.paladin_native_parser import PaladinNativeParser
+from archive.archive_evaluator.query_planner import QueryPlanner
 from tests.test_common.test_common import TestCommon, SKIP_VALUE
 from tests.unit_tests.archive.object_builder.test_object_builder import TestBasic4
 
@@ -85,6 +88,127 @@ class TestBasic4Parser(TestPaladinNativeParser):
                                         chain.from_iterable((value, None) for value in [x * x for x in range(1, 11)])))
 
 
+class TestResultsCache(TestPaladinNativeParser):
+    QUERIES = ['Where(r0.rt._x, Changed(r0.rt._x))', 'Union(r0.rt._x, Where(r0.rt._x, r0.rt._x > 1))',
+               'Let(x:=r0.rt._x, x + 1)', 'r0.rt._x + p0._x']
+
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('basic2')
+
+    def _parse(self, parser: PaladinNativeParser, query: str) -> str:
+        return parser.parse(query, self._times().start, self._times().stop)
+
+    def test_same_results(self):
+        uncached_parser = PaladinNativeParser(self.archive, parallel=True, results_cache_size=0)
+        for query in self.QUERIES:
+            expected = self._parse(uncached_parser, query)
+            self.assertEqual(expected, self._parse(self.paladin_native_parser, query), msg=query)
+            # The second time is served from the cache.
+            self.assertEqual(expected, self._parse(self.paladin_native_parser, query), msg=query)
+
+        self.assertGreater(self.paladin_native_parser.results_cache.hits, 0)
+        self.assertIsNone(uncached_parser.results_cache)
+
+    def test_repeated_sub_query(self):
+        # Changed (and its arg) is evaluated once: the Changeds are evaluated only in Union (see QueryPlanner), and the
+        # second is served from the cache.
+        self._parse(self.paladin_native_parser, 'Union(Changed(r0.rt._x), Changed(r0.rt._x))')
+        results_cache = self.paladin_native_parser.results_cache
+        self.assertEqual(4, len(results_cache))
+        self.assertEqual(1, results_cache.hits)
+
+    def test_sub_ranges_of_pointwise_queries(self):
+        parser = self.paladin_native_parser
+        start, end = self._times().start, self._times().stop
+        for query in self.QUERIES:
+            # Where narrows the times of its selector by the condition (see Where), so it isn't pointwise.
+            self.assertEqual('Where' not in query, parser.is_pointwise(query), msg=query)
+            if not parser.is_pointwise(query):
+                continue
+
+            results = parser.evaluate(query, start, end)
+            for sub_start, sub_end in [(start, end), (start + 2, end - 3), (end - 1, end)]:
+                self.assertEqual(parser.parse(query, sub_start, sub_end),
+                                 parser.to_json(results.sliced(sub_start, sub_end + 1), range(sub_start, sub_end + 1)),
+                                 msg=f'{query}, {sub_start}, {sub_end}')
+
+    def test_normalize(self):
+        normalize = PaladinNativeParser.normalize
+        self.assertEqual(normalize('Let(x := r0.rt._x, x + 1)'), normalize(' Let(x:=r0.rt._x,  x+1)'))
+        self.assertNotEqual(normalize('r0@12'), normalize('r0@13'))
+        self.assertEqual('Let(x:=', normalize('Let(x:='))
+
+    def test_cleared_by_user_aux(self):
+        self._parse(self.paladin_native_parser, self.QUERIES[0])
+        self.assertGreater(len(self.paladin_native_parser.results_cache), 0)
+        self.paladin_native_parser.add_user_aux('def f(x):\n    return x\n')
+        self.assertEqual(0, len(self.paladin_native_parser.results_cache))
+
+
+class TestParallelParser(TestPaladinNativeParser):
+    QUERIES = [*TestResultsCache.QUERIES, 'Union(r0.rt._x, p0._x, r0.rt._x > 1)', 'And(r0.rt._x > 1, p0._x)']
+
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('basic2')
+
+    def test_same_results(self):
+        serial_parser = PaladinNativeParser(self.archive, parallel=False, results_cache_size=0)
+        parallel_parser = PaladinNativeParser(self.archive, parallel=2, results_cache_size=0)
+        if not parallel_parser.scheduler.is_parallel:
+            self.skipTest('Forking processes is not supported')
+
+        # Evaluate even the smallest ranges in the workers.
+        parallel_parser.scheduler.min_parallel_size = 0
+        start, end = self._times().start, self._times().stop
+        for query in self.QUERIES:
+            self.assertEqual(serial_parser.parse(query, start, end), parallel_parser.parse(query, start, end),
+                             msg=query)
+            self.assertGreater(parallel_parser.metrics.tasks, 0, msg=query)
+            self.assertGreater(parallel_parser.metrics.wall_time, 0, msg=query)
+            self.assertEqual(0, serial_parser.metrics.tasks, msg=query)
+
+
+class TestQueryPlanner(TestPaladinNativeParser):
+    # Line 50 is "print(r0)", in the loop of line 48.
+    QUERIES = ['And(LineHit(50), r0.rt._x > 1)', 'Where(r0.rt._x, And(LineHit(50), r0.rt._x > 0))',
+               'And(r0.rt._x > 0, InTimeRange(3, 10))', 'And(And(LineHit(50), r0.rt._x > 0), p0._x == 1)',
+               'And(Range(LineHit(45), LineHit(52)), r0.rt._x)', 'And(InFunction(setX), p0._x)',
+               'And(LineHit(50), Changed(r0.rt._x))', 'And(InTime(1000), Changed(r0.rt._x))',
+               'Or(LineHit(50), r0.rt._x > 3)']
+
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('basic2')
+
+    def test_same_results(self):
+        parser = PaladinNativeParser(self.archive, parallel=False, results_cache_size=0)
+        for start, end in [(self._times().start, self._times().stop), (5, self._times().stop - 3)]:
+            for query in self.QUERIES:
+                planned = parser.parse(query, start, end)
+                with patch.object(QueryPlanner, 'plan'):
+                    self.assertEqual(parser.parse(query, start, end), planned, msg=f'{query} in {start, end}')
+
+    def test_explain(self):
+        plan = self.paladin_native_parser.explain('Where(r0.rt._x, And(LineHit(50), r0.rt._x > 0))', 0, 204)
+        self.assertIn('Raw(r0.rt._x > 0) is evaluated only in [100, 125, 150, 175]', plan)
+        self.assertIn('Raw(r0.rt._x > 0) @ [100, 125, 150, 175]', plan)
+        # The inner operators are evaluated only in Where.
+        self.assertIn('LineHit(50) is evaluated only as a part of the operators it is in', plan)
+        self.assertNotIn('= LineHit(50)', plan)
+
+    def test_short_circuit(self):
+        with patch.object(Changed, 'eval', side_effect=AssertionError('Changed has been evaluated')):
+            for query in ['And(InTime(1000), Changed(r0.rt._x))', 'And(r0.rt._x == 100, Changed(r0.rt._x))']:
+                results = self.paladin_native_parser.parse(query, self._times().start, self._times().stop,
+                                                           jsonify=False)
+                self.assertEqual([False], list({e.values[0] for e in results}), msg=query)
+
+        self.assertIn('Changed is not evaluated',
+                      self.paladin_native_parser.explain('And(InTime(1000), Changed(r0.rt._x))', 0, 204))
+
+
 class TestKruskalLetAndAux(TestPaladinNativeParser):
 
     @classmethod
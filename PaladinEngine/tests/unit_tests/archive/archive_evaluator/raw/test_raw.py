@@ -3,9 +3,15 @@ from abc import ABC
 from itertools import chain
 from pathlib import Path
 from typing import Any, Optional, Iterator, Tuple
+from unittest.mock import patch
 
-from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, Identifier
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, Identifier, EvalResult
 from archive.archive_evaluator.paladin_dsl_semantics import Raw, Operator
+from archive.archive_evaluator.paladin_dsl_semantics import raw
+from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
+from archive.object_builder.object_builder import ObjectBuilder
+from ast_common import ast_common
+from ast_common.ast_common import compile_expression
 from tests.test_common.test_common import SKIP_VALUE
 from tests.unit_tests.archive.object_builder.test_object_builder import TestCaterpillar
 from tests.test_common.test_object_builder.test_object_builder import TestObjectBuilder
@@ -49,5 +55,100 @@ class TestCaterpillarRaw(TestRaw, TestCaterpillar):
     program_path = TestCaterpillar.program_path
 
 
+class _PerTimeObjectBuilder(DiffObjectBuilder):
+    """
+        A builder that doesn't tell the ranges in which the objects it builds stay the same, so a query is evaluated
+        in every time.
+    """
+    build_with_validity = ObjectBuilder.build_with_validity
+
+
+class TestRawUnchangedRanges(TestRaw):
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('basic2')
+
+    def test_same_results(self):
+        per_time_builder = _PerTimeObjectBuilder(self.archive)
+        for query, line_no in [('r0', -1), ('p0', -1), ('r0.rt._x + p0._x', -1), ('(r0.lb, r0.rt._y)', -1),
+                               ('self._x', 12), ('r0', 44)]:
+            for parallel in [False, True]:
+                expected = Raw(query, line_no, self._times(), parallel).eval(per_time_builder)
+                actual = Raw(query, line_no, self._times(), parallel).eval(self.object_builder)
+                self.assertEqual([(e.time, repr(e.values)) for e in expected],
+                                 [(e.time, repr(e.values)) for e in actual], msg=f'{query}@{line_no}')
+
+    def test_evaluated_once_per_range(self):
+        builds = []
+        build_with_validity = self.object_builder.build_with_validity
+        self.object_builder.build_with_validity = lambda *args, **kwargs: builds.append(args[1]) or \
+                                                                          build_with_validity(*args, **kwargs)
+        result = Raw('r0', -1, self._times(), parallel=False).eval(self.object_builder)
+
+        self.assertEqual(len(self._times()), len(result))
+        # r0 (with its points) has 13 different values, including its (undefined) values before and after the run.
+        self.assertEqual(13, len(builds))
+
+    def test_aux_called_in_every_time(self):
+        # User aux functions might not be pure, so they are called in every time (whether or not by the query).
+        for query in ['count(0)', 'list(map(count, [0]))[0]']:
+            calls = []
+            user_aux = {'count': lambda o: calls.append(o) or len(calls)}
+            result = Raw(query, -1, self._times(), parallel=False).eval(self.object_builder, user_aux=user_aux)
+            self.assertEqual(len(self._times()), len(calls), msg=query)
+            self.assertEqual(list(range(1, len(calls) + 1)), [e.values[0] for e in result], msg=query)
+
+    def test_impure_builtins_called_in_every_time(self):
+        # The query is evaluated in every time, each making a run of its own.
+        for query in ['print(r0)', 'list(map(print, [r0]))', 'next(iter([r0]))']:
+            with patch('builtins.print'):
+                result = Raw(query, -1, self._times(), parallel=False).eval(self.object_builder)
+            self.assertEqual(len(self._times()), len(list(result.runs())), msg=query)
+
+        result = Raw('len([r0])', -1, self._times(), parallel=False).eval(self.object_builder)
+        self.assertLess(len(list(result.runs())), len(self._times()))
+
+    def test_parsed_once(self):
+        raw_op = Raw('r0.rt._x + len([p._x for p in [p0]])', -1, self._times())
+        self.assertEqual({'r0', 'len', 'p', 'p0'}, raw_op._referred_names())
+        with patch.object(raw, 'str2ast', wraps=raw.str2ast) as str2ast:
+            raw_op._referred_names()
+            raw_op._results_key(None)
+        str2ast.assert_not_called()
+
+    def test_results_key_of_query_locals(self):
+        # The results of a query local are keyed by their identity, not by their (equal) values.
+        raw_op = Raw('x + 1', -1, self._times())
+        x = Raw('r0.rt._x', -1, self._times()).eval(self.object_builder)
+        self.assertEqual(raw_op._results_key({'x': x}), raw_op._results_key({'x': x}))
+        self.assertNotEqual(raw_op._results_key({'x': x}), raw_op._results_key({'x': EvalResult(x)}))
+
+    def test_compiled_once(self):
+        query = 'r0.rt._x * 3 + p0._x'
+        ast_common._COMPILED_EXPRESSIONS.clear()
+        with patch('ast_common.ast_common.compile', wraps=compile, create=True) as compile_mock:
+            Raw(query, -1, self._times(), parallel=False).eval(self.object_builder)
+            self.assertEqual(1, [c.args[0] for c in compile_mock.call_args_list].count(query))
+
+            # Evaluated again, the query isn't compiled again.
+            Raw(query, -1, self._times(), parallel=False).eval(self.object_builder)
+            self.assertEqual(1, [c.args[0] for c in compile_mock.call_args_list].count(query))
+
+        self.assertIs(compile_expression(query), compile_expression(query))
+
+    def test_values_keep_their_globals(self):
+        expected = Raw('r0.rt._x', -1, self._times()).eval(self.object_builder)
+        lambdas = Raw('lambda: r0.rt._x', -1, self._times()).eval(self.object_builder)
+
+        def call(f):
+            try:
+                return f()
+            except (NameError, AttributeError):
+                # r0 isn't defined yet.
+                return None
+
+        self.assertEqual([e.values[0] for e in expected], [call(e.values[0]) for e in lambdas])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,9 +1,13 @@
 from abc import ABC
+from pathlib import Path
 from typing import Iterable
 
 from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import Time, EvalResult
-from archive.archive_evaluator.paladin_dsl_semantics import TimeOperator
+from archive.archive_evaluator.paladin_dsl_semantics import TimeOperator, LineHit, InFunction, WhenPrinted, Next, \
+    Last, Raw
+from archive.archive_evaluator.paladin_dsl_semantics.changed_into import ChangedInto
 from tests.test_common.test_common import TestCommon
+from tests.test_common.test_object_builder.test_object_builder import TestObjectBuilder
 
 
 class TestTimeOperator(TestCommon, ABC):
@@ -11,3 +15,37 @@ class TestTimeOperator(TestCommon, ABC):
     def _test_times(self, r: EvalResult, true_times: Iterable[Time]):
         for e in r:
             self.assertEqual(getattr(e, TimeOperator.TIME_KEY), e.time in true_times)
+
+
+class TestBasic2TimeOperators(TestObjectBuilder, TestTimeOperator):
+
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('basic2')
+
+    def _test_runs(self, r: EvalResult, true_times: Iterable[Time]):
+        self._test_times(r, true_times)
+        self.assertEqual(list(self.times()), r.times())
+        # A run for each range of times that the operator is satisfied in (or not).
+        self.assertLessEqual(len(list(r.runs())), 2 * len(list(true_times)) + 1)
+
+    def test_line_hit(self):
+        for line_no in [44, 49, 50, 999]:
+            events = {e.time for _, e in self.object_builder.find_events(line_no)}
+            self._test_runs(LineHit(self.times(), line_no).eval(self.object_builder), events)
+
+    def test_in_function(self):
+        for func_name in ['setX', '__init__', 'getX']:
+            entries = {e.time for _, e in self.object_builder.get_function_entries(func_name, -1)}
+            self._test_runs(InFunction(self.times(), func_name).eval(self.object_builder), entries)
+
+    def test_when_printed(self):
+        self._test_runs(WhenPrinted(self.times(), '(lb: (1,2), rt: (3,4))').eval(self.object_builder), [52, 175])
+
+    def test_next_and_last(self):
+        self._test_runs(Next(self.times(), LineHit(self.times(), 50)).eval(self.object_builder), [125, 150, 175])
+        self._test_runs(Last(self.times(), LineHit(self.times(), 50)).eval(self.object_builder), [175])
+
+    def test_changed_into(self):
+        self._test_runs(ChangedInto(self.times(), Raw('p0._x', -1, self.times()), 9).eval(self.object_builder),
+                        [185])
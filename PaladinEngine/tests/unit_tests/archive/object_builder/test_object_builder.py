@@ -5,7 +5,9 @@ from itertools import chain
 from pathlib import Path
 
 from common.attributed_dict import AttributedDict
+from archive.object_builder.checkpoint_object_builder.checkpoint_object_builder import CheckpointObjectBuilder
 from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
+from archive.object_builder.lazy_diff_object_builder.lazy_diff_object_builder import LazyDiffObjectBuilder
 from archive.object_builder.naive_object_builder.naive_object_builder import NaiveObjectBuilder
 from tests.test_common.test_common import SKIP_VALUE
 from tests.test_common.test_object_builder.test_object_builder import TestObjectBuilder
@@ -19,6 +21,15 @@ def setUpNaive(self):
     self.object_builder = NaiveObjectBuilder(self.archive)
 
 
+def setUpCheckpoint(self):
+    # A small checkpoint interval, so most states are replayed from a checkpoint.
+    self.object_builder = CheckpointObjectBuilder(self.archive, checkpoint_interval=3)
+
+
+def setUpLazy(self):
+    self.object_builder = LazyDiffObjectBuilder(self.archive)
+
+
 class TestNestedObjectBuild(TestObjectBuilder, ABC):
     @classmethod
     def program_path(cls) -> Path:
@@ -59,6 +70,14 @@ class TestNestedObjectBuildNaive(TestNestedObjectBuild):
     setUp = setUpNaive
 
 
+class TestNestedObjectBuildCheckpoint(TestNestedObjectBuild):
+    setUp = setUpCheckpoint
+
+
+class TestNestedObjectBuildLazy(TestNestedObjectBuild):
+    setUp = setUpLazy
+
+
 class TestBuiltinCollections(TestObjectBuilder, ABC):
 
     @classmethod
@@ -102,6 +121,14 @@ class TestBuiltinCollectionsNaive(TestBuiltinCollections):
     setUp = setUpNaive
 
 
+class TestBuiltinCollectionsCheckpoint(TestBuiltinCollections):
+    setUp = setUpCheckpoint
+
+
+class TestBuiltinCollectionsLazy(TestBuiltinCollections):
+    setUp = setUpLazy
+
+
 class TestGraph(TestObjectBuilder, ABC):
 
     @classmethod
@@ -132,6 +159,14 @@ class TestGraphNaive(TestGraph):
     setUp = setUpNaive
 
 
+class TestGraphCheckpoint(TestGraph):
+    setUp = setUpCheckpoint
+
+
+class TestGraphLazy(TestGraph):
+    setUp = setUpLazy
+
+
 class TestBasic4(TestObjectBuilder, ABC):
 
     @classmethod
@@ -153,6 +188,14 @@ class TestBasic4Naive(TestBasic4):
     setUp = setUpNaive
 
 
+class TestBasic4Checkpoint(TestBasic4):
+    setUp = setUpCheckpoint
+
+
+class TestBasic4Lazy(TestBasic4):
+    setUp = setUpLazy
+
+
 class TestCaterpillar(TestObjectBuilder, ABC):
     @classmethod
     def program_path(cls) -> Path:
@@ -165,3 +208,62 @@ class TestCaterpillar(TestObjectBuilder, ABC):
 
 class TestCaterpillarNaive(TestCaterpillar):
     setUp = setUpNaive
+
+
+class TestCaterpillarCheckpoint(TestCaterpillar):
+    setUp = setUpCheckpoint
+
+
+class TestCaterpillarLazy(TestCaterpillar):
+    setUp = setUpLazy
+
+
+class TestBuildCache(TestObjectBuilder):
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('basic2')
+
+    def test_same_builds(self):
+        uncached = DiffObjectBuilder(self.archive, build_cache_size=0)
+        for object_builder in [self.object_builder, DiffObjectBuilder(self.archive, build_cache_size=1)]:
+            for name in uncached.get_var_names():
+                for time in range(self.archive.last_time + 1):
+                    # r0 is also changed by changing its rt (r0.rt.setX(...)), that is built (and cached) separately.
+                    self.assertEqual(repr(uncached.build(name, time)), repr(object_builder.build(name, time)),
+                                     msg=f'name={name}, time={time}')
+
+    def test_unchanged_versions(self):
+        for time in range(self.archive.last_time):
+            self.object_builder.build('r0', time)
+
+        # The times in which r0 (and its points) has not changed share the same built objects.
+        self.assertGreater(self.object_builder.build_cache.hits, 0)
+        self.assertLess(len(self.object_builder.build_cache), self.archive.last_time)
+        self.assertIs(self.object_builder.build('r0', self.archive.last_time - 2),
+                      self.object_builder.build('r0', self.archive.last_time - 1))
+
+
+class TestLazyScopes(TestObjectBuilder):
+    @classmethod
+    def program_path(cls) -> Path:
+        return cls.example('caterpillar')
+
+    def test_same_scopes(self):
+        # Every query is asked of a fresh builder, so it doesn't depend on the names that have been queried before.
+        records = list(self.archive.records.in_store_order())
+        line_nos = sorted({rv.line_no for rv in records})
+        container_ids = {rv.key.container_id for rv in records}
+        self.assertEqual(sorted(self.object_builder.get_var_names()),
+                         sorted(LazyDiffObjectBuilder(self.archive).get_var_names()))
+        for line_no in line_nos:
+            self.assertEqual(self.object_builder.get_container_ids_by_line_no(line_no),
+                             LazyDiffObjectBuilder(self.archive).get_container_ids_by_line_no(line_no),
+                             msg=f'line_no={line_no}')
+        self.assertEqual(self.object_builder.get_line_nos_by_container_ids(container_ids),
+                         LazyDiffObjectBuilder(self.archive).get_line_nos_by_container_ids(container_ids))
+        for name in self.object_builder.get_var_names():
+            for container_id in container_ids:
+                self.assertEqual(self.object_builder.get_line_no_by_name_and_container_id(name, container_id),
+                                 LazyDiffObjectBuilder(self.archive).get_line_no_by_name_and_container_id(name,
+                                                                                                         container_id),
+                                 msg=f'name={name}, container_id={container_id}')
@@ -0,0 +1,80 @@
+import unittest
+import weakref
+
+from archive.archive import Archive
+
+
+class _Object(object):
+    pass
+
+
+class TestReusedObjectIds(unittest.TestCase):
+    def setUp(self) -> None:
+        self.archive = Archive()
+
+    def _store(self, container_id: int, field: str, value: object) -> int:
+        rv = self.archive.store_new \
+            .key(container_id, field, '__AS__', Archive.Record.StoreKind.OBJ_ITEM) \
+            .value(type(value), value if type(value) is int else id(value), field, 1)
+        return rv.key.container_id
+
+    def test_objects_are_not_kept_alive(self):
+        o = _Object()
+        ref = weakref.ref(o)
+        self.archive.init_object(o)
+        self._store(id(o), 'x', 1)
+
+        del o
+        self.assertIsNone(ref())
+
+    def test_dead_object_id(self):
+        o = _Object()
+        object_id = id(o)
+        self.archive.init_object(o)
+        self.assertEqual(self._store(object_id, 'x', 1), object_id)
+
+        del o
+        for _ in range(100):
+            other = _Object()
+            if id(other) == object_id:
+                break
+        else:
+            self.skipTest('The id of the dead object is not reused')
+
+        self.archive.init_object(other)
+        container_id = self._store(id(other), 'x', 2)
+        self.assertNotEqual(container_id, object_id)
+        self.assertEqual(self._values(object_id, 'x'), [1])
+        self.assertEqual(self._values(container_id, 'x'), [2])
+
+        # The object is the same one from now on.
+        self.archive.init_object(other)
+        self.assertEqual(self._store(id(other), 'y', 3), container_id)
+
+    def test_changed_contents(self):
+        l = [1, 2]
+        self._store(1, 'l', l)
+        self.archive.remember(l)
+        self.assertTrue(self.archive.is_stored_object(l))
+
+        l.append(3)
+        self.assertFalse(self.archive.is_stored_object(l))
+
+        self._store(id(l), 'x', 1)
+        self.archive.new_object(l, 1, self.archive.time)
+        kinds = [rv.key.kind for rv in self.archive.records.in_store_order()]
+        self.assertEqual(kinds.count(Archive.Record.StoreKind.NEW_OBJECT), 1)
+
+    def _values(self, container_id: int, field: str) -> list:
+        key = Archive.Record.RecordKey(container_id, field, '__AS__', Archive.Record.StoreKind.OBJ_ITEM)
+        return [rv.value for rv in self.archive.retrieve(key)]
+
+
+class TestRetrieveValue(unittest.TestCase):
+    def test_container_that_is_not_stored(self):
+        # A container whose fields are stored, but that is not itself the value of any record (e.g., a frame).
+        archive = Archive()
+        container_id = 1000
+        archive.store_new.key(container_id, 'x', '__AS__', Archive.Record.StoreKind.OBJ_ITEM).value(int, 1, 'x', 1)
+        self.assertFalse(archive.is_stored(container_id))
+        self.assertEqual(archive.retrieve_value(container_id, object), {'x': 1})
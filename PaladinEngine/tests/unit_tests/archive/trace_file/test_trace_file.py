@@ -0,0 +1,129 @@
+import marshal
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from archive.archive import Archive
+from archive.object_builder.diff_object_builder.diff_object_builder import DiffObjectBuilder
+from archive.object_builder.lazy_diff_object_builder.lazy_diff_object_builder import LazyDiffObjectBuilder
+from archive.trace_file.trace_file import TraceFormatError, SpillingRecordStore, MAGIC, VERSION, _HEADER, \
+    _LENGTH, _BYTE_ORDERS
+from engine.engine import PaLaDiNEngine
+from tests.test_common.test_common import TestCommon
+
+
+class TestTraceFile(unittest.TestCase):
+    SEGMENT_SIZE = 32
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.trace_path = Path(cls.tmp_dir.name).joinpath('basic2.trace')
+        engine = PaLaDiNEngine(TestCommon.example('basic2'))
+        engine.execute_with_paladin()
+        cls.archive = engine.run_data.archive
+
+        # Write the trace of the recorded archive, in small segments.
+        cls.archive.record_to(cls.trace_path, cls.SEGMENT_SIZE)
+        cls.archive.close_trace()
+        cls.loaded = Archive.from_trace(cls.trace_path)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp_dir.cleanup()
+
+    @staticmethod
+    def _flatten(archive: Archive):
+        return [(k.container_id, k.field, k.stub_name, k.kind, repr(v.value), v.expression, v.line_no, v.time,
+                 v.extra) for k, vv in archive.records.items() for v in vv]
+
+    def test_records(self):
+        self.assertGreater(len(self.archive.records), self.SEGMENT_SIZE)
+        self.assertEqual(self._flatten(self.archive), self._flatten(self.loaded))
+        self.assertEqual(self.archive.last_time, self.loaded.last_time)
+
+    def test_queries(self):
+        for line_no in {v.line_no for v in self.archive.records.in_store_order()}:
+            self.assertEqual({k: [v.time for v in vv] for k, vv in self.archive.get_by_line_no(line_no).items()},
+                             {k: [v.time for v in vv] for k, vv in self.loaded.get_by_line_no(line_no).items()})
+
+    def test_lazy_object_builder(self):
+        expected, actual = DiffObjectBuilder(self.archive), LazyDiffObjectBuilder(self.loaded)
+        for name in ['r0', 'p0']:
+            for time in range(self.archive.last_time + 1):
+                self.assertEqual(repr(expected.build(name, time)), repr(actual.build(name, time)),
+                                 msg=f'name={name}, time={time}')
+        self.assertEqual(sorted(expected.get_var_names()), sorted(actual.get_var_names()))
+
+    def test_read_only(self):
+        with self.assertRaises(TypeError):
+            self.loaded.records.append(0, 'x', '', Archive.Record.StoreKind.VAR, int, 0, 'x', 0, 0, '')
+
+    def test_not_a_trace(self):
+        path = Path(self.tmp_dir.name).joinpath('not_a_trace')
+        path.write_bytes(b'\0' * 64)
+        with self.assertRaises(TraceFormatError):
+            Archive.from_trace(path)
+
+    def test_code_in_trace(self):
+        # The footer of the trace is a code object rather than plain values.
+        blob = marshal.dumps(compile('open("x", "w")', '<trace>', 'exec'))
+        path = Path(self.tmp_dir.name).joinpath('code.trace')
+        header = _HEADER.pack(MAGIC, VERSION, _BYTE_ORDERS[sys.byteorder], self.SEGMENT_SIZE, _HEADER.size, 0)
+        path.write_bytes(header + _LENGTH.pack(len(blob)) + blob)
+        with self.assertRaises(TraceFormatError):
+            Archive.from_trace(path)
+
+
+class TestSpilledTrace(unittest.TestCase):
+    SEGMENT_SIZE = 32
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+
+        # The engines share the same archive, so the records of the spilled run are kept before running again.
+        engine = PaLaDiNEngine(TestCommon.example('basic2'), trace_path=Path(cls.tmp_dir.name).joinpath('run.trace'),
+                               spill=True)
+        engine.execute_with_paladin()
+        cls.executed_records = engine.run_data.archive.records
+
+        engine = PaLaDiNEngine(TestCommon.example('basic2'))
+        engine.execute_with_paladin()
+        cls.archive = engine.run_data.archive
+
+        # Spill the same records in small segments.
+        cls.spilled = Archive()
+        cls.spilled.record_to(Path(cls.tmp_dir.name).joinpath('basic2.trace'), cls.SEGMENT_SIZE, spill=True)
+        for rv in cls.archive.records.in_store_order():
+            k = rv.key
+            cls.spilled.store_new.key(k.container_id, k.field, k.stub_name, k.kind) \
+                .value(rv.rtype, rv.value, rv.expression, rv.line_no, rv.time, rv.extra)
+        cls.spilled._time = cls.archive.last_time
+        cls.spilled.close_trace()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.tmp_dir.cleanup()
+
+    def test_records(self):
+        self.assertNotIsInstance(self.spilled.records, SpillingRecordStore)
+        self.assertEqual(TestTraceFile._flatten(self.archive), TestTraceFile._flatten(self.spilled))
+        self.assertEqual(self.archive.last_time, self.spilled.last_time)
+
+    def test_executed(self):
+        # The contents that are stored anew (see Archive.new_object) depend on the ids that python reuses in each run.
+        self.assertEqual(self._records_count(self.archive.records), self._records_count(self.executed_records))
+
+    @staticmethod
+    def _records_count(records) -> int:
+        return sum(1 for rv in records.in_store_order() if rv.key.kind != Archive.Record.StoreKind.NEW_OBJECT)
+
+    def test_object_builder(self):
+        expected, actual = DiffObjectBuilder(self.archive), DiffObjectBuilder(self.spilled)
+        for time in range(self.archive.last_time + 1):
+            self.assertEqual(repr(expected.build('p0', time)), repr(actual.build('p0', time)), msg=f'time={time}')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from utils.lru_cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(1, cache.get('a'))
+        # 'b' is now the least recently used.
+        cache.put('c', 3)
+        self.assertNotIn('b', cache)
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(2, len(cache))
+
+    def test_counters(self):
+        cache = LRUCache(1)
+        self.assertIsNone(cache.get('a'))
+        cache.put('a', None)
+        self.assertIsNone(cache.get('a', 'default'))
+        self.assertEqual('default', cache.get('b', 'default'))
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+        self.assertAlmostEqual(1 / 3, cache.hit_rate)
+
+        cache.clear()
+        self.assertEqual((0, 0, 0), (cache.hits, cache.misses, len(cache)))
+
+    def test_sizes(self):
+        unbounded = LRUCache()
+        for i in range(1000):
+            unbounded.put(i, i)
+        self.assertEqual(1000, len(unbounded))
+
+        disabled = LRUCache(0)
+        disabled.put('a', 1)
+        self.assertEqual(0, len(disabled))
+
+        with self.assertRaises(ValueError):
+            LRUCache(-1)
+
+    def test_weights(self):
+        cache = LRUCache(max_weight=10, weigh=len)
+        cache.put('a', 'xxxx')
+        cache.put('b', 'xxxx')
+        self.assertEqual(8, cache.weight)
+        cache.get('a')
+        # 'b' is the least recently used, and is evicted to make room.
+        cache.put('c', 'xxx')
+        self.assertEqual((['a', 'c'], 7), (list(cache.keys()), cache.weight))
+
+        # Replacing a value replaces its weight.
+        cache.put('a', 'x')
+        self.assertEqual(4, cache.weight)
+
+        # A value that is heavier than the cap isn't kept, and doesn't evict the others.
+        cache.put('d', 'x' * 11)
+        self.assertEqual((['c', 'a'], 4), (list(cache.keys()), cache.weight))
+
+        self.assertEqual('x', cache.pop('a'))
+        self.assertEqual(3, cache.weight)
+        cache.clear()
+        self.assertEqual((0, 0), (len(cache), cache.weight))
+
+        with self.assertRaises(ValueError):
+            LRUCache(max_weight=10)
+
+
+if __name__ == '__main__':
+    unittest.main()
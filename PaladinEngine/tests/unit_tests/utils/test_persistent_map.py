@@ -0,0 +1,63 @@
+import random
+import unittest
+
+from utils.persistent_map import PersistentMap
+
+
+class _Colliding(object):
+    """
+        A key whose hash collides with the hashes of other keys.
+    """
+
+    def __init__(self, value: int, h: int):
+        self.value = value
+        self.h = h
+
+    def __hash__(self):
+        return self.h
+
+    def __eq__(self, other):
+        return isinstance(other, _Colliding) and self.value == other.value
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.value})'
+
+
+class TestPersistentMap(unittest.TestCase):
+    def test_set_and_delete(self):
+        m0 = PersistentMap()
+        m1 = m0.set('a', 1)
+        m2 = m1.set('b', 2)
+        m3 = m2.delete('a')
+
+        self.assertEqual({}, dict(m0))
+        self.assertEqual({'a': 1}, dict(m1))
+        self.assertEqual({'a': 1, 'b': 2}, dict(m2))
+        self.assertEqual({'b': 2}, dict(m3))
+        self.assertIs(m3, m3.delete('a'))
+        self.assertIs(m2, m2.set('b', 2))
+        self.assertNotIn('a', m3)
+        self.assertRaises(KeyError, lambda: m3['a'])
+
+    def test_versions_against_dicts(self):
+        rnd = random.Random(0)
+        keys = list(range(300)) + [_Colliding(i, i % 3) for i in range(30)] + [_Colliding(i, 1 << 40) for i in range(5)]
+        versions, m, d = [], PersistentMap(), {}
+        for i in range(3000):
+            key = rnd.choice(keys)
+            if rnd.random() < 0.3:
+                m, _ = m.delete(key), d.pop(key, None)
+            else:
+                m, d[key] = m.set(key, i), i
+            versions.append((m, dict(d)))
+
+        # Older versions are not affected by the later changes.
+        for m, d in versions:
+            self.assertEqual(len(d), len(m))
+            self.assertEqual(d, dict(m.items()))
+            for key in keys:
+                self.assertEqual(d.get(key), m.get(key))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache(object):
+    """
+        A mapping of a bounded size, that evicts its least recently used entry when it's full.
+        Counts its hits and misses (a None max_size makes it unbounded).
+        Given weigh, the total weight of the values (e.g., their size in bytes) is bounded by max_weight as well.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, max_weight: Optional[int] = None,
+                 weigh: Optional[Callable[[Any], int]] = None):
+        if max_size is not None and max_size < 0:
+            raise ValueError("max_size must not be negative")
+
+        if max_weight is not None and (max_weight < 0 or weigh is None):
+            raise ValueError("max_weight must not be negative, and requires weigh")
+
+        self.max_size = max_size
+        self.max_weight = max_weight
+        self._weigh = weigh
+        self._entries: OrderedDict = OrderedDict()
+        self._weights: dict = {}
+        self.weight = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self._entries.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+
+        try:
+            self._entries.move_to_end(key)
+        except KeyError:
+            # The entry has been evicted meanwhile (by another thread).
+            pass
+
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.max_size == 0:
+            return
+
+        weight = self._weigh(value) if self._weigh else 0
+        if self.max_weight is not None and weight > self.max_weight:
+            # Would evict everything else, and wouldn't fit anyway.
+            self.pop(key)
+            return
+
+        self.pop(key)
+        self._entries[key] = value
+        self._weights[key] = weight
+        self.weight += weight
+        while self.max_size is not None and len(self._entries) > self.max_size or \
+                self.max_weight is not None and self.weight > self.max_weight:
+            self.pop(next(iter(self._entries)))
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self._entries.pop(key, _MISSING)
+        if value is _MISSING:
+            return default
+
+        self.weight -= self._weights.pop(key, 0)
+        return value
+
+    def keys(self):
+        return self._entries.keys()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._weights.clear()
+        self.weight = 0
+        self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(max_size={self.max_size}, size={len(self)}, weight={self.weight}, ' \
+               f'hits={self.hits}, misses={self.misses})'
@@ -0,0 +1,208 @@
+from typing import Any, Hashable, Iterator, Mapping, Optional, Tuple, Union
+
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+# A leaf is a (hash, key, value) tuple.
+_Leaf = Tuple[int, Hashable, Any]
+
+
+def _hash(key: Hashable) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _same_key(leaf: _Leaf, h: int, key: Hashable) -> bool:
+    return leaf[0] == h and (leaf[1] is key or leaf[1] == key)
+
+
+class _CollisionNode(object):
+    """
+        Leaves whose keys have the same (full) hash.
+    """
+    __slots__ = ('hash', 'leaves')
+
+    def __init__(self, h: int, leaves: Tuple[_Leaf, ...]):
+        self.hash = h
+        self.leaves = leaves
+
+    def find(self, h: int, shift: int, key: Hashable, default: Any) -> Any:
+        for leaf in self.leaves:
+            if _same_key(leaf, h, key):
+                return leaf[2]
+        return default
+
+    def assoc(self, h: int, shift: int, key: Hashable, value: Any) -> Tuple['_Entry', bool]:
+        if h != self.hash:
+            return _merge(self.hash, self, (h, key, value), shift), True
+
+        for i, leaf in enumerate(self.leaves):
+            if _same_key(leaf, h, key):
+                if leaf[2] is value:
+                    return self, False
+                return _CollisionNode(h, self.leaves[:i] + ((h, key, value),) + self.leaves[i + 1:]), False
+
+        return _CollisionNode(h, self.leaves + ((h, key, value),)), True
+
+    def without(self, h: int, shift: int, key: Hashable) -> Optional['_Entry']:
+        for i, leaf in enumerate(self.leaves):
+            if _same_key(leaf, h, key):
+                leaves = self.leaves[:i] + self.leaves[i + 1:]
+                return leaves[0] if len(leaves) == 1 else _CollisionNode(h, leaves)
+        return self
+
+    def __iter__(self) -> Iterator[_Leaf]:
+        return iter(self.leaves)
+
+
+class _BitmapNode(object):
+    """
+        A node of the trie, that holds up to 2 ** _BITS entries (leaves or sub nodes), indexed by a bitmap.
+    """
+    __slots__ = ('bitmap', 'entries')
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def find(self, h: int, shift: int, key: Hashable, default: Any) -> Any:
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return default
+
+        entry = self.entries[(self.bitmap & (bit - 1)).bit_count()]
+        if type(entry) is tuple:
+            return entry[2] if _same_key(entry, h, key) else default
+
+        return entry.find(h, shift + _BITS, key, default)
+
+    def assoc(self, h: int, shift: int, key: Hashable, value: Any) -> Tuple['_BitmapNode', bool]:
+        bit = 1 << ((h >> shift) & _MASK)
+        index = (self.bitmap & (bit - 1)).bit_count()
+        if not self.bitmap & bit:
+            return _BitmapNode(self.bitmap | bit,
+                               self.entries[:index] + ((h, key, value),) + self.entries[index:]), True
+
+        entry = self.entries[index]
+        if type(entry) is tuple:
+            if _same_key(entry, h, key):
+                if entry[2] is value:
+                    return self, False
+                new_entry, added = (h, key, value), False
+            else:
+                new_entry, added = _merge(entry[0], entry, (h, key, value), shift + _BITS), True
+        else:
+            new_entry, added = entry.assoc(h, shift + _BITS, key, value)
+            if new_entry is entry:
+                return self, False
+
+        return _BitmapNode(self.bitmap, self.entries[:index] + (new_entry,) + self.entries[index + 1:]), added
+
+    def without(self, h: int, shift: int, key: Hashable) -> Optional['_Entry']:
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return self
+
+        index = (self.bitmap & (bit - 1)).bit_count()
+        entry = self.entries[index]
+        if type(entry) is tuple:
+            if not _same_key(entry, h, key):
+                return self
+            new_entry = None
+        else:
+            new_entry = entry.without(h, shift + _BITS, key)
+            if new_entry is entry:
+                return self
+
+        if new_entry is not None:
+            return _BitmapNode(self.bitmap, self.entries[:index] + (new_entry,) + self.entries[index + 1:])
+
+        entries = self.entries[:index] + self.entries[index + 1:]
+        if shift > 0 and len(entries) == 1 and type(entries[0]) is tuple:
+            # Collapse a node that holds a single leaf into the leaf.
+            return entries[0]
+
+        return _BitmapNode(self.bitmap ^ bit, entries) if entries else None
+
+    def __iter__(self) -> Iterator[_Leaf]:
+        for entry in self.entries:
+            if type(entry) is tuple:
+                yield entry
+            else:
+                yield from entry
+
+
+_Entry = Union[_Leaf, _BitmapNode, _CollisionNode]
+
+
+def _merge(h1: int, entry1: _Entry, leaf2: _Leaf, shift: int) -> _Entry:
+    h2 = leaf2[0]
+    if h1 == h2:
+        leaves = entry1.leaves if isinstance(entry1, _CollisionNode) else (entry1,)
+        return _CollisionNode(h1, leaves + (leaf2,))
+
+    i1, i2 = (h1 >> shift) & _MASK, (h2 >> shift) & _MASK
+    if i1 == i2:
+        return _BitmapNode(1 << i1, (_merge(h1, entry1, leaf2, shift + _BITS),))
+
+    return _BitmapNode((1 << i1) | (1 << i2), (entry1, leaf2) if i1 < i2 else (leaf2, entry1))
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
+_MISSING = object()
+
+
+class PersistentMap(Mapping):
+    """
+        An immutable mapping (a hash array mapped trie).
+        Setting or deleting a key creates a new map that shares all the other entries with this one,
+        so keeping many versions of a map costs memory proportional to the changes between them.
+    """
+    __slots__ = ('_root', '_len')
+
+    def __init__(self, _root: _BitmapNode = _EMPTY_NODE, _len: int = 0):
+        self._root = _root
+        self._len = _len
+
+    def set(self, key: Hashable, value: Any) -> 'PersistentMap':
+        root, added = self._root.assoc(_hash(key), 0, key, value)
+        if root is self._root:
+            return self
+
+        return PersistentMap(root, self._len + added)
+
+    def delete(self, key: Hashable) -> 'PersistentMap':
+        root = self._root.without(_hash(key), 0, key)
+        if root is self._root:
+            return self
+
+        return PersistentMap(root if root is not None else _EMPTY_NODE, self._len - 1)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self._root.find(_hash(key), 0, key, default)
+
+    def __getitem__(self, key: Hashable) -> Any:
+        value = self._root.find(_hash(key), 0, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._root.find(_hash(key), 0, key, _MISSING) is not _MISSING
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return (leaf[1] for leaf in self._root)
+
+    def items(self) -> Iterator[Tuple[Hashable, Any]]:
+        return ((leaf[1], leaf[2]) for leaf in self._root)
+
+    def values(self) -> Iterator[Any]:
+        return (leaf[2] for leaf in self._root)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({dict(self.items())})'
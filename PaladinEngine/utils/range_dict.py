@@ -1,36 +1,67 @@
+from bisect import bisect_left, bisect_right
 from typing import Optional, Tuple, Any
 
 
 class RangeDict:
+    """
+        A mapping from times in [0, max_time) to values.
+        The values are kept as parallel sorted lists of changes: the time of a change, its value and the last time it
+        has been assigned to (a change of a range assignment is assigned to all the times of the range). The value of
+        a change holds from its time until the next change.
+        Changes in increasing times (as the archive's records are stored) are appended in O(1), and lookups are
+        binary searches over the changes' times.
+        A None value is a gap: its times are not in the dict (unless it's the value of the last change).
+    """
+
     def __init__(self, max_time):
         self.max_time = max_time
-        self.data = {}
+        self.times = []
+        self.values = []
+        self.ends = []
         self.last_inserted_time = -1
         self.last_inserted_value = None
         self.first_inserted_time = -1
-        self.ranges_cache = []  # Cache for storing ranges
-        self.edges_cache = None  # Cache for storing edges
+        self.ranges_cache = None  # Cache for storing ranges
+
+    def _assign(self, start, end, value):
+        times, values, ends = self.times, self.values, self.ends
+        if not times or start > ends[-1]:
+            times.append(start)
+            values.append(value)
+            ends.append(end)
+            return
+
+        lo, hi = bisect_left(times, start), bisect_right(times, end)
+        new_times, new_values, new_ends = [start], [value], [end]
+        if hi > 0 and ends[hi - 1] > end:
+            # The change that has been assigned after end keeps its value from end + 1.
+            new_times.append(end + 1)
+            new_values.append(values[hi - 1])
+            new_ends.append(ends[hi - 1])
+        if lo > 0 and ends[lo - 1] >= start:
+            ends[lo - 1] = start - 1
+
+        times[lo:hi] = new_times
+        values[lo:hi] = new_values
+        ends[lo:hi] = new_ends
 
     def __setitem__(self, key, value):
         if isinstance(key, int):
             if key < 0 or key > self.max_time:
                 raise ValueError("Key must be within the range [0, max_time]")
-            self.data[key] = value
+            self._assign(key, key, value)
             self.last_inserted_time = key
             self.last_inserted_value = value
             self.ranges_cache = None  # Invalidate ranges cache
-            self.edges_cache = None  # Invalidate edges cache
             self.first_inserted_time = self.first_inserted_time if self.first_inserted_time == -1 else key
         elif isinstance(key, tuple) and len(key) == 2 and isinstance(key[0], int) and isinstance(key[1], int):
             start, end = key
             if start < 0 or end > self.max_time or start > end:
                 raise ValueError("Invalid range")
-            for t in range(start, end + 1):
-                self.data[t] = value
+            self._assign(start, end, value)
             self.last_inserted_time = end
             self.last_inserted_value = value
             self.ranges_cache = None  # Invalidate ranges cache
-            self.edges_cache = None  # Invalidate edges cache
             self.first_inserted_time = self.first_inserted_time if self.first_inserted_time == -1 else key[0]
         else:
             raise TypeError("Key must be either an integer or a tuple of two integers")
@@ -40,44 +71,30 @@ class RangeDict:
             if key < 0 or key >= self.max_time:
                 raise ValueError("Key must be within the range [0, max_time)")
 
-            ranges = self.ranges()
-            # Binary search to find the range containing the key
-            left, right = 0, len(ranges) - 1
-            while left <= right:
-                mid = (left + right) // 2
-                start, stop, val = ranges[mid]
-                if start <= key < stop:
-                    return val
-                elif key < start:
-                    right = mid - 1
-                else:
-                    left = mid + 1
-
-            return None
+            i = bisect_right(self.times, key) - 1
+            return self.values[i] if i >= 0 else None
 
         elif isinstance(key, tuple) and len(key) == 2 and isinstance(key[0], int) and isinstance(key[1], int):
             start, end = key
             if start < 0 or end > self.max_time or start > end:
                 raise ValueError("Invalid range")
 
-            result = {}
-            # Iterate through the ranges and check for intersections
-            for (range_start, range_stop), value in self.ranges():
-                intersection_start = max(start, range_start)
-                intersection_stop = min(end, range_stop)
-                if intersection_start < intersection_stop:
-                    result.update({t: value for t in range(intersection_start, intersection_stop)})
-
-            return result
+            return {t: self[t] for t in range(start, end) if t in self}
 
         else:
             raise TypeError("Key must be either an integer or a tuple of two integers")
 
     def __contains__(self, key):
         if isinstance(key, int):
-            if key < 0 or key > self.max_time:
+            if key < 0 or key >= self.max_time:
                 return False
-            return any(start <= key < end for start, end, _ in self.ranges())
+
+            i = bisect_right(self.times, key) - 1
+            if i < 0:
+                return False
+
+            # The last range starts at the last time that has been assigned.
+            return self.values[i] is not None or (i == len(self.times) - 1 and key >= self.ends[i])
         else:
             raise TypeError("Key must be an integer")
 
@@ -96,39 +113,60 @@ class RangeDict:
         if self.ranges_cache is not None:
             return self.ranges_cache
 
-        ranges = []
-        start_time = 0
-        prev_value = None
-        for t in sorted(self.data.keys()):
-            if prev_value is not None:
-                ranges.append((start_time, t, prev_value))
-            start_time = t
-            prev_value = self.data[t]
-        ranges.append((start_time, self.max_time, prev_value))
+        times, values = self.times, self.values
+        ranges = [(times[i], times[i + 1], values[i]) for i in range(len(times) - 1) if values[i] is not None]
+        if times:
+            ranges.append((self._last_range_start(), self.max_time, values[-1]))
         self.ranges_cache = ranges
         return ranges
 
+    def _last_range_start(self):
+        return self.times[-1] if self.values[-1] is not None else self.ends[-1]
+
     def __repr__(self):
-        return repr(self.data)
+        return repr(dict(zip(self.times, self.values)))
 
     def edges(self):
-        if self.ranges_cache is not None:
-            return [(start, end) for start, end, _ in self.ranges()]
-        else:
-            return [(start, end) for start, end, _ in self.ranges()]
+        return [(start, end) for start, end, _ in self.ranges()]
+
+    def _first_range(self) -> Optional[Tuple[int, Any]]:
+        if not self.times:
+            return None
+
+        values = self.values
+        first = next((i for i in range(len(values) - 1) if values[i] is not None), None)
+        if first is None:
+            return self._last_range_start(), values[-1]
+
+        return self.times[first], values[first]
+
+    @property
+    def first_range_start(self) -> Optional[int]:
+        first_range = self._first_range()
+        return first_range[0] if first_range is not None else None
+
+    def get_range(self, t) -> Optional[Tuple[int, int]]:
+        """
+            The range [start, end) of the times that have the value of t (None if t is out of [0, max_time)).
+        """
+        if t < 0 or t >= self.max_time:
+            return None
+
+        times = self.times
+        i = bisect_right(times, t)
+        return times[i - 1] if i > 0 else 0, times[i] if i < len(times) else self.max_time
 
     def get_closest(self, t) -> Tuple[Optional[Any], Optional[int]]:
         if t < 0 or t >= self.max_time:
             return None, None
 
-        closest_time = None
-        closest_value = None
-        for start, end, value in self.ranges():
-            if start <= t and (closest_time is None or start < closest_time):
-                closest_time = start
-                closest_value = value
+        # The closest range is the first one, if it has started by t.
+        first_range = self._first_range()
+        if first_range is None or first_range[0] > t:
+            return None, None
 
-        return closest_value, closest_time
+        start, value = first_range
+        return value, start
 
 
 if __name__ == '__main__':
@@ -23,6 +23,12 @@ def parse_args():
                                help='Should print PaLaDiNized code to the screen')
     details_group.add_argument('--output-file', type=str, default='', help='Output file path of the PaLaDiNized code')
     details_group.add_argument('--csv', default='', type=str, help='Should output archive results to a csv file')
+    details_group.add_argument('--trace', default='', type=str, help='Write the records of the run to a trace file')
+    details_group.add_argument('--spill', default=False, action='store_true',
+                               help='Spill the records to the trace file (of --trace) during the run, '
+                                    'instead of keeping them in memory')
+    details_group.add_argument('--from-trace', default='', type=str, dest='from_trace',
+                               help='Load the records from a trace file (of a previous run) instead of running')
     details_group.add_argument('--run-debug-server', default=True, dest='run_debug_server', action='store',
                                help='Should run PaLaDiN-Debug server')
     details_group.add_argument('-p', '--port', default=9999, type=int,
@@ -54,7 +60,8 @@ def main():
     if args.defaults:
         args = fill_defaults(args)
 
-        engine = PaLaDiNEngine(args.input_file, args.timeout, record=args.run)
+        engine = PaLaDiNEngine(args.input_file, args.timeout, record=args.run, trace_path=args.trace or None,
+                               spill=args.spill)
 
         if args.print_code:
             print(engine.paladinized_code)
@@ -64,7 +71,10 @@ def main():
 
         # noinspection PyBroadException
         try:
-            if args.run:
+            if args.from_trace != '':
+                engine.load_trace(args.from_trace)
+
+            elif args.run:
                 engine.execute_with_paladin()
 
         except BaseException:
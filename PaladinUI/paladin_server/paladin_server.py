@@ -1,5 +1,6 @@
 import json
 import sys
+import traceback
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -11,9 +12,13 @@ from flask_cors import CORS
 
 from PaladinEngine.engine.engine import PaLaDiNEngine
 from archive.archive_evaluator.archive_evaluator import ArchiveEvaluator
+from archive.archive_evaluator.archive_evaluator_types.archive_evaluator_types import EvalResult
+from archive.archive_evaluator.eval_scheduler import EvalMetrics
 from archive.archive_evaluator.paladin_dsl_semantics import Operator
 from archive.archive_evaluator.paladin_native_parser import PaladinNativeParser
+from archive.object_builder.lazy_diff_object_builder.lazy_diff_object_builder import LazyDiffObjectBuilder
 from common.common import ISP
+from utils.lru_cache import LRUCache
 
 NAME = 'PaLaDiN - Time-travel Debugging with Semantic Queries'
 HERE = Path(__file__).parent
@@ -30,6 +35,7 @@ RUN_DATA: Optional[PaLaDiNEngine.PaladinRunData] = None
 EVALUATOR: Optional[ArchiveEvaluator] = None
 PARSER: Optional[PaladinNativeParser] = None
 RECORDER: Optional['PaladinServer.Recorder'] = None
+QUERY_CACHE: Optional['PaladinServer.QueryCache'] = None
 
 
 class PaladinServer(FlaskView):
@@ -58,9 +64,10 @@ class PaladinServer(FlaskView):
             self.program_name = program_name
             self.data = {'program': self.program_name, 'queries': [], 'runs': []}
 
-        def record_query(self, query: str, result: str, **kwargs):
+        def record_query(self, query: str, result: str, metrics: Optional[Dict] = None, **kwargs):
             self.data['queries'].append(
-                {'time': self.time, 'request': {'query': query, **kwargs}, 'response': json.loads(result)})
+                {'time': self.time, 'request': {'query': query, **kwargs}, 'response': json.loads(result),
+                 'metrics': metrics})
 
         def record_run(self):
             self.data['runs'].append({'time': self.time})
@@ -73,10 +80,76 @@ class PaladinServer(FlaskView):
         def time(self):
             return datetime.now().strftime('%H:%M:%S')
 
+    class QueryCache(object):
+        """
+            The (JSON) results of queries by their normalized text, time range and the generation of the archive, which
+            advances whenever the run, its source code or the aux file change.
+            The results of a pointwise query (see PaladinNativeParser.is_pointwise) are kept as well, so a query in a
+            sub range of a cached one is answered by slicing them.
+            The cache is bounded by the total size of the JSONs and of the kept results.
+        """
+        DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+        def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+            self.generation = 0
+            self._cache = LRUCache(max_weight=max_bytes, weigh=PaladinServer.QueryCache._weigh)
+
+        def invalidate(self):
+            self.generation += 1
+            self._cache.clear()
+
+        def query(self, parser: PaladinNativeParser, query: str, start_time: int, end_time: int) -> \
+                Tuple[str, Optional[EvalMetrics]]:
+            """
+                The JSON of the results of query, and the metrics of evaluating it (None if it has been answered from
+                the cache).
+            """
+            # The generation is taken once, so results of an archive that has been replaced meanwhile aren't cached
+            # for the new one.
+            generation = self.generation
+            normalized = parser.normalize(query)
+            key = normalized, start_time, end_time, generation
+            times = range(start_time, end_time + 1)
+            metrics = None
+            if (cached := self._cache.get(key)) is not None:
+                return cached[0], metrics
+
+            if (wider := self._find_wider(normalized, start_time, end_time, generation)) is not None:
+                _, _, results = wider
+                results = results.sliced(start_time, end_time + 1) if results is not None else None
+                pointwise = True
+            else:
+                try:
+                    results = parser.evaluate(query, start_time, end_time)
+                except Exception as e:
+                    traceback.print_exc()
+                    return parser.error_json(e), parser.metrics
+                metrics = parser.metrics
+                pointwise = parser.is_pointwise(query)
+
+            result = parser.to_json(results, times)
+            self._cache.put(key, (result, pointwise, results if pointwise else None))
+            return result, metrics
+
+        def _find_wider(self, normalized: str, start_time: int, end_time: int, generation: int) -> Optional[Tuple]:
+            for key in list(self._cache.keys()):
+                query, start, end, gen = key
+                if query == normalized and gen == generation and start <= start_time and end_time <= end:
+                    if (cached := self._cache.get(key)) is not None and cached[1]:
+                        return cached
+
+            return None
+
+        @staticmethod
+        def _weigh(value: Tuple[str, bool, Optional[EvalResult]]) -> int:
+            result, _, results = value
+            return len(result) + (results.size_in_memory() if results is not None else 0)
+
     @classmethod
     def create(cls, engine: PaLaDiNEngine) -> 'PaladinServer':
-        global ENGINE, RUN_DATA, EVALUATOR, PARSER, RECORDER
+        global ENGINE, RUN_DATA, EVALUATOR, PARSER, RECORDER, QUERY_CACHE
         server = PaladinServer()
+        QUERY_CACHE = PaladinServer.QueryCache()
         server._reset(engine)
         RECORDER = PaladinServer.Recorder(
             engine.source_path.parent.joinpath(Path(engine.source_path.name + '_session')).with_suffix('.json'),
@@ -95,7 +168,10 @@ class PaladinServer(FlaskView):
         RUN_DATA = engine.run_data
         RUN_DATA.archive.global_map = ENGINE.global_map
         EVALUATOR = ArchiveEvaluator(RUN_DATA.archive)
-        PARSER = PaladinNativeParser(RUN_DATA.archive, parallel=True)
+        # The builder is constructed lazily, so a rerun doesn't wait for the construction of the whole run.
+        # The requests are handled by threads, so queries aren't evaluated by forked workers (see EvalScheduler).
+        PARSER = PaladinNativeParser(RUN_DATA.archive, object_builder_type=LazyDiffObjectBuilder, parallel=False)
+        QUERY_CACHE.invalidate()
         # PARSER = PaladinNativeParser(RUN_DATA.archive, object_builder_type=RecursiveObjectBuilder)
         # PARSER = PaladinNativeParser(RUN_DATA.archive, object_builder_type=NaiveObjectBuilder)
 
@@ -160,6 +236,7 @@ class PaladinServer(FlaskView):
     @route('/upload/source_code', methods=['POST'])
     def upload_source_code(self):
         ENGINE.update_source_code(request.get_data(as_text=True))
+        QUERY_CACHE.invalidate()
         return PaladinServer.create_response({})
 
     @route('/debug_info/thrown_exception')
@@ -239,20 +316,32 @@ class PaladinServer(FlaskView):
 
     @route('/debug_info/query/<string:select_query>/<int:start_time>/<int:end_time>')
     def query(self, select_query: str, start_time: int, end_time: int):
-        result = PARSER.parse(select_query.replace('<br>', '\n'), start_time, end_time)
-        self.record(select_query, result, **{'start_time': start_time, 'end_time': end_time})
+        result, metrics = QUERY_CACHE.query(PARSER, select_query.replace('<br>', '\n'), start_time, end_time)
+        self.record(select_query, result, metrics.as_dict() if metrics else None,
+                    **{'start_time': start_time, 'end_time': end_time})
         return PaladinServer.create_response(result)
 
+    @route('/debug_info/explain/<string:select_query>/<int:start_time>/<int:end_time>')
+    def explain(self, select_query: str, start_time: int, end_time: int):
+        try:
+            plan = PARSER.explain(select_query.replace('<br>', '\n'), start_time, end_time)
+        except Exception as e:
+            return PaladinServer.create_response(PaladinNativeParser.error_json(e))
+
+        return PaladinServer.create_response(plan)
+
     @route('/uploader', methods=['GET', 'POST'])
     def upload_file(self):
         if request.method == 'POST':
             f = request.data
             PARSER.add_user_aux(f)
+            QUERY_CACHE.invalidate()
             return PaladinServer.create_response({})
 
     @route('/reset_aux_file')
     def reset_aux_file(self):
         PARSER.remove_user_aux()
+        QUERY_CACHE.invalidate()
         return PaladinServer.create_response({})
 
     @route('/debug_info/docs')
@@ -331,9 +420,9 @@ class PaladinServer(FlaskView):
     def _run_time_window():
         return {'TIME_WINDOW': (0, RUN_DATA.archive.last_time)}
 
-    def record(self, _request: str, response: str, **kwargs):
+    def record(self, _request: str, response: str, metrics: Optional[Dict] = None, **kwargs):
         global RECORDER
-        RECORDER.record_query(_request, response, **kwargs)
+        RECORDER.record_query(_request, response, metrics, **kwargs)
 
     def finalize(self):
         global RECORDER